@@ -1,26 +1,304 @@
 import sys
 import random
-from PyQt6.QtWidgets import QListWidget, QInputDialog, QTabWidget, QFileDialog, QMessageBox, QStyle, QLabel, \
+from PyQt6.QtWidgets import QListView, QLineEdit, QComboBox, QInputDialog, QTabWidget, QFileDialog, QProgressDialog, QMessageBox, QStyle, QLabel, \
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton
-from PyQt6.QtGui import QPainter, QColor, QPen, QIcon, QAction, QPixmap
-from PyQt6.QtCore import pyqtSignal, QTimer, QRectF, Qt
+from PyQt6.QtGui import QPainter, QColor, QPen, QIcon, QAction, QActionGroup, QPixmap, QImage
+from PyQt6.QtCore import pyqtSignal, QTimer, QRectF, Qt, QThread, QAbstractListModel, QModelIndex
+import numpy as np
 import database
-from modules.relief_generator import generate_relief
+from modules.relief_cache import load_relief
+from modules.life_engine import ENGINES, DEFAULT_ENGINE, create_engine
+from modules.cell_store import CellStore
+from modules.pattern_io import FILE_FILTER, pattern_format, read_pattern, read_macrocell, read_rule, write_pattern
+from modules.rules import CONWAY, KNOWN_RULES, parse_rule
+from modules.density import DensityPyramid, MAX_LEVEL
+from modules.metrics import Metrics
+from modules.cycle_detector import CycleDetector
+from modules.soup_search import classify_object
+from modules.mars_physics import ClimateModel, SOL
+from modules.time_manager import TimeManager, MAX_SCALE
+from modules import terrain_rules
+from modules.terrain_layer import TerrainLayer, level_for_zoom
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+import copy
 import os
+import queue
+import threading
+import time
+import math
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Цвета клеток для отрисовки одним изображением (ARGB): мертвая - прозрачная, живая - черная.
+CELL_COLORS = np.array([0x00000000, 0xFF000000], dtype=np.uint32)
+
+
+def argb_pixmap(pixels):
+    """QPixmap из ARGB32-массива [ряд, колонка] (данные копируются)."""
+    pixels = np.ascontiguousarray(pixels)
+    height, width = pixels.shape
+    return QPixmap.fromImage(QImage(pixels.data, width, height, width * 4, QImage.Format.Format_ARGB32))
+
+
+def cell_colors(states):
+    """
+    Палитра на все 256 значений клетки для правила с states состояниями:
+    угасающие клетки Generations светлеют от темно-серого к светло-серому.
+    """
+    colors = np.zeros(256, dtype=np.uint32)
+    colors[:2] = CELL_COLORS
+    if states > 2:
+        gray = np.linspace(0x50, 0xD0, states - 2).astype(np.uint32)
+        colors[2:states] = 0xFF000000 | (gray << 16) | (gray << 8) | gray
+    return colors
+
+
+# Пределы масштаба. Ниже LOD_ZOOM (клетка меньше пикселя) поле рисуется
+# по пирамиде плотности: блок 2^L x 2^L клеток становится одним пикселем.
+MIN_ZOOM = 1 / 2 ** MAX_LEVEL
+MAX_ZOOM = 100
+LOD_ZOOM = 1
+
+# Период паттерна при сохранении в библиотеку ищется, только если в нем не больше клеток.
+PERIOD_MAX_CELLS = 20000
+
+# Что делать, когда поле вымерло или зациклилось: код -> подпись в меню.
+CYCLE_MODES = {"pause": "Ставить на паузу", "replay": "Проигрывать цикл", "off": "Не отслеживать"}
+# Цикл проигрывается из снимков, только если они займут не больше этого объема.
+REPLAY_MEMORY = 256 * 1024 * 1024
+
+# Шагов модели климата в секунду модельного времени (один шаг - марсианский час).
+CLIMATE_RATE = 10
+# Как часто обновлять показания климата в строке состояния во время игры, мс.
+CLIMATE_LABEL_INTERVAL = 250
+# Как часто фоновая перемотка на N поколений сообщает прогресс (и проверяет отмену), с.
+JUMP_PROGRESS_INTERVAL = 0.1
+# Наибольший шаг HashLife за один вызов при перемотке (между вызовами проверяется отмена).
+JUMP_MAX_CHUNK = 2 ** 20
+# Скорость модельного времени -> подпись в меню.
+TIME_SCALES = {0: "Пауза", 1: "1x", 10: "10x", MAX_SCALE: "Максимальная"}
+
+
+# --- Поток симуляции ---
+# Продвигает движок вне главного потока, чтобы медленный шаг не блокировал интерфейс.
+# Когда делать шаги, решает TimeManager: поток регистрирует в нем подсистему "life"
+# и делает тики, а остальные подсистемы (климат) шагают в том же потоке.
+class SimulationThread(QThread):
+    # Сигнал о новом снимке; сам снимок забирается через take_snapshot().
+    snapshot_ready = pyqtSignal()
+    # Поле вымерло или зациклилось: (поколение, период; 0 - поле опустело).
+    cycle_detected = pyqtSignal(int, int)
+
+    def __init__(self, engine, time_manager, generations_per_second=10, parent=None, metrics=None,
+                 cycle_mode="pause"):
+        super().__init__(parent)
+        self.engine = engine
+        self.time_manager = time_manager
+        self.metrics = metrics or Metrics()
+        # Реакция на цикл (см. CYCLE_MODES). Хеш состояния и история поколений
+        # обновляются за O(изменений) и O(1) на шаг.
+        self.cycle_mode = cycle_mode
+        self.detector = CycleDetector()
+        self._halted = False  # Цикл найден в режиме паузы: шаги не делаются до правки.
+        self._recording = None  # Снимки одного периода, пока цикл записывается.
+        self._recording_period = 0
+        self._replay = None  # Записанный цикл: снимок i - состояние через i поколений от движка.
+        self._replayed = 0  # Сколько поколений проиграно поверх движка.
+        self._edits = queue.SimpleQueue()  # Правки поля из главного потока.
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._latest = None
+        self._pending = False  # Снимок опубликован, но виджет его еще не забрал.
+        time_manager.register("life", generations_per_second, self._step)
+
+    def wake(self):
+        """Будит поток, например после смены скорости времени."""
+        self._wake.set()
+
+    def submit(self, edit):
+        """Ставит правку поля (функцию от движка) в очередь потока симуляции."""
+        self._edits.put(edit)
+        self._wake.set()
+
+    def take_snapshot(self):
+        """Забирает последний снимок. Вызывается из главного потока."""
+        with self._lock:
+            self._pending = False
+            return self._latest
+
+    def stop(self):
+        """Останавливает поток и дожидается его завершения."""
+        self.requestInterruption()
+        self._wake.set()
+        self.wait()
+
+    def _apply_edits(self):
+        """Применяет накопившиеся правки. Возвращает True, если они были."""
+        applied = False
+        while True:
+            try:
+                edit = self._edits.get_nowait()
+            except queue.Empty:
+                return applied
+            if not applied:
+                # Правка меняет поле: движок догоняет проигранный цикл, история сбрасывается.
+                self._stop_replay()
+                self.detector.reset()
+                self._halted = False
+                self.time_manager.set_enabled("life", True)
+            edit(self.engine)
+            applied = True
+
+    def _stop_replay(self):
+        """Возвращает движку поколение, до которого дошло проигрывание цикла."""
+        self._recording = None
+        if self._replay is None:
+            return
+        period = len(self._replay)
+        phase = self._replayed % period
+        self.engine.advance(phase)
+        self.engine.generation += self._replayed - phase
+        self._replay = None
+        self._replayed = 0
+
+    def _snapshot(self):
+        """Снимок текущего поколения: из записанного цикла или из движка."""
+        if self._replay is None:
+            return self.engine.snapshot()
+        snapshot = copy.copy(self._replay[self._replayed % len(self._replay)])
+        snapshot.generation = self.engine.generation + self._replayed
+        return snapshot
+
+    def _step(self):
+        """Делает одно поколение и проверяет, не вымерло ли поле и не зациклилось ли."""
+        if self._replay is not None:
+            self._replayed += 1
+            return
+        self.metrics.step(self.engine)
+        if self._recording is not None:
+            self._record()
+            return
+        if self.cycle_mode == "off":
+            return
+        engine = self.engine
+        period = self.detector.observe(engine.generation, engine.state_hash(), len(engine))
+        if period is None:
+            return
+        if self.cycle_mode == "replay" and period > 1:
+            # Записываем один период снимков, дальше поле проигрывается по кругу без шагов движка.
+            self._recording = []
+            self._recording_period = period
+        else:
+            self._halt()
+        self.cycle_detected.emit(engine.generation, period)
+
+    def _halt(self):
+        """Останавливает шаги поля до правки; другие подсистемы продолжают шагать."""
+        self._halted = True
+        self.time_manager.set_enabled("life", False)
+
+    def _record(self):
+        """Добавляет снимок в записываемый цикл; по окончании периода включает проигрывание."""
+        recording = self._recording
+        recording.append(self.engine.snapshot())
+        if sum(snapshot.nbytes for snapshot in recording) > REPLAY_MEMORY:
+            # Цикл слишком велик для хранения - просто останавливаемся.
+            self._recording = None
+            self._halt()
+        elif len(recording) == self._recording_period:
+            # Движок снова в начале цикла: последний снимок совпадает с текущим состоянием.
+            self._replay = recording[-1:] + recording[:-1]
+            self._recording = None
+
+    def _publish(self, force=False):
+        """
+        Публикует снимок состояния. Пока виджет не забрал предыдущий снимок,
+        промежуточные поколения пропускаются (если не force).
+        """
+        with self._lock:
+            if self._pending and not force:
+                return
+        snapshot = self._snapshot()
+        with self._lock:
+            self._latest = snapshot
+            notify = not self._pending
+            self._pending = True
+        if notify:
+            self.snapshot_ready.emit()
+
+    def run(self):
+        time_manager = self.time_manager
+        time_manager.reset()
+        try:
+            while not self.isInterruptionRequested():
+                if self._apply_edits():
+                    self._publish(force=True)
+
+                delay = time_manager.time_to_next()
+                if delay is None or delay > 0:
+                    # Ждем следующего шага (на паузе или после остановки поля - без срока),
+                    # но просыпаемся сразу при правке, смене скорости или остановке.
+                    self._wake.wait(delay)
+                    self._wake.clear()
+                    continue
+
+                # Под нагрузкой тик делает несколько шагов в пределах бюджета кадра, снимок - один.
+                if time_manager.tick().get("life"):
+                    self._publish(force=self._halted)
+        finally:
+            time_manager.unregister("life")
+        self._stop_replay()
+        self._apply_edits()
+
 
 # --- Класс игрового поля ---
 # Отвечает за всю логику, отрисовку и обработку пользовательского ввода.
 class GridWidget(QWidget):
+    # Игра нашла вымирание или цикл: (поколение, период; 0 - поле опустело).
+    cycle_detected = pyqtSignal(int, int)
+    # Курсор переместился: (колонка, ряд).
+    cursor_moved = pyqtSignal(int, int)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMinimumSize(500, 500)
 
-        # Для "бесконечного" поля используется множество (set) для хранения координат
-        # только живых клеток в формате (колонка, ряд).
-        self.live_cells = set()
+        # Движок симуляции хранит живые клетки в формате (колонка, ряд)
+        # и вычисляет поколения. Его можно сменить во время работы (см. set_engine).
+        self.engine = create_engine(DEFAULT_ENGINE)
+
+        # --- Фоновая симуляция ---
+        self.sim_thread = None  # Поток SimulationThread, пока игра запущена.
+        self.snapshot = None  # Последний снимок из потока, который рисуется во время игры.
+        self.busy = False  # Движок перематывается в фоне: рисуется снимок, правки откладываются.
+        self._deferred = []  # Действия, отложенные до конца перемотки (см. _defer).
+
+        # --- Пирамида плотности для отрисовки при отдалении ---
+        self._density = None  # DensityPyramid для self._density_view.
+        self._density_view = None  # Снимок или движок, по которому построена пирамида.
+        self._density_generation = None
+
+        # --- Метрики и их оверлей ---
+        self.metrics = Metrics()
+        self.show_metrics = False
+
+        # Реакция на вымирание и циклы во время игры (см. CYCLE_MODES).
+        self.cycle_mode = "pause"
+
+        # Правило поля (modules.rules.Rule) и палитра его состояний.
+        self.rule = CONWAY
+        self.cell_colors = cell_colors(CONWAY.states)
+
+        # Правила по рельефу (modules.terrain_rules.TerrainRules) или None - правило поля везде.
+        self.terrain = None
+
+        # Подложка рельефа (modules.terrain_layer.TerrainLayer) или None, пока карты нет.
+        self.relief = None
+        self.show_relief = True
+
+        # Планировщик шагов: поле и другие подсистемы шагают по нему в потоке симуляции.
+        self.time_manager = TimeManager()
+        self.generations_per_second = 10
 
         # Шаблон фигуры "Глайдер" в виде смещений (ряд, колонка).
         self.glider_pattern = [(0, 1), (1, 2), (2, 0), (2, 1), (2, 2)]
@@ -58,10 +336,176 @@ class GridWidget(QWidget):
             self.offset_x = self.width() / 2
             self.offset_y = self.height() / 2
 
+    def _view(self):
+        """Источник клеток для отрисовки: снимок во время игры или перемотки, иначе сам движок."""
+        return self.snapshot if self.sim_thread is not None or self.busy else self.engine
+
+    def _edit(self, edit):
+        """
+        Применяет правку (функцию от движка): во время игры - через очередь
+        потока симуляции, иначе сразу. Во время перемотки правка откладывается.
+        """
+        if self._defer(lambda: self._edit(edit)):
+            return
+        if self.sim_thread is not None:
+            self.sim_thread.submit(edit)
+        else:
+            edit(self.engine)
+            self._density_view = None  # Движок изменился на месте - пирамида устарела.
+            self.update()
+
+    def is_running(self):
+        return self.sim_thread is not None
+
+    def start_simulation(self, generations_per_second):
+        """Запускает поток симуляции или меняет его скорость, если он уже запущен."""
+        self.generations_per_second = generations_per_second
+        if self._defer(lambda: self.start_simulation(generations_per_second)):
+            return
+        if self.sim_thread is not None:
+            self.time_manager.set_rate("life", generations_per_second)
+            self.sim_thread.wake()
+            return
+        self.snapshot = self.engine.snapshot()
+        self.sim_thread = SimulationThread(self.engine, self.time_manager, generations_per_second, self,
+                                           self.metrics, self.cycle_mode)
+        self.sim_thread.snapshot_ready.connect(self._on_snapshot_ready)
+        self.sim_thread.cycle_detected.connect(self._on_cycle_detected)
+        self.sim_thread.start()
+
+    def set_time_scale(self, scale):
+        """Меняет скорость модельного времени: 0 - пауза, MAX_SCALE - максимальная."""
+        self.time_manager.scale = scale
+        if self.sim_thread is not None:
+            self.sim_thread.wake()
+
+    def _defer(self, action):
+        """
+        Во время перемотки ставит действие в очередь до end_background, чтобы
+        движок и состояние поля не менялись под фоновой задачей.
+
+        :return: True, если действие отложено.
+        """
+        if not self.busy:
+            return False
+        self._deferred.append(action)
+        return True
+
+    def begin_background(self):
+        """
+        Отдает движок фоновой задаче: до end_background рисуется снимок
+        текущего состояния, а правки, смена движка и запуск игры откладываются.
+        """
+        self.snapshot = self.engine.snapshot()
+        self.busy = True
+        return self.engine
+
+    def end_background(self):
+        """Возвращает движок главному потоку и выполняет отложенные за это время действия по порядку."""
+        self.busy = False
+        self.snapshot = None
+        self._density_view = None  # Движок изменился на месте - пирамида устарела.
+        deferred, self._deferred = self._deferred, []
+        for action in deferred:
+            action()
+        self.update()
+
+    def stop_simulation(self):
+        """Останавливает поток симуляции; движок снова принадлежит главному потоку."""
+        if self.sim_thread is None:
+            return
+        self.sim_thread.stop()
+        self.sim_thread = None
+        self.snapshot = None
+        self.update()
+
+    def _on_snapshot_ready(self):
+        """Забирает свежий снимок из потока симуляции и перерисовывает поле."""
+        # Сигнал уже остановленного потока мог прийти после запуска нового.
+        if self.sim_thread is None or self.sender() is not self.sim_thread:
+            return
+        self.snapshot = self.sim_thread.take_snapshot()
+        self.update()
+
+    def _on_cycle_detected(self, generation, period):
+        """Поток нашел вымирание или цикл: на паузе игра останавливается, о находке сообщается окну."""
+        if self.sim_thread is None or self.sender() is not self.sim_thread:
+            return
+        if self.cycle_mode == "pause" or period <= 1:
+            self.stop_simulation()
+        self.cycle_detected.emit(generation, period)
+
+    def set_cycle_mode(self, mode):
+        """Меняет реакцию на циклы; на ходу - через перезапуск потока симуляции."""
+        self.cycle_mode = mode
+        if self.sim_thread is not None:
+            self.stop_simulation()
+            self.start_simulation(self.generations_per_second)
+
+    def set_engine(self, name):
+        """Переключает движок симуляции, перенося в него текущие клетки."""
+        if self._defer(lambda: self.set_engine(name)) or name == self.engine.name:
+            return
+        running = self.sim_thread is not None
+        if running:
+            self.stop_simulation()
+        engine = create_engine(name)
+        engine.set_rule(self.rule)
+        engine.set_cells(self.engine.get_cells())
+        engine.generation = self.engine.generation
+        if engine.supports_terrain and self.rule.states == 2:
+            engine.set_terrain(self.terrain)
+        self.engine = engine
+        if running:
+            self.start_simulation(self.generations_per_second)
+        self.update()
+
+    def set_terrain(self, terrain):
+        """
+        Включает правила по рельефу; движок без их поддержки (HashLife) и правила
+        Generations считают по правилу поля.
+        """
+        if self._defer(lambda: self.set_terrain(terrain)):
+            return
+        self.terrain = terrain
+        if self.engine.supports_terrain and self.rule.states == 2:
+            self._edit(lambda engine: engine.set_terrain(terrain))
+
+    def set_rule(self, rule):
+        """Меняет правило поля; движок без поддержки правил Generations заменяется плотным."""
+        if self._defer(lambda: self.set_rule(rule)):
+            return
+        if rule.states > self.engine.max_states:
+            self.set_engine("dense")
+        self.rule = rule
+        self.cell_colors = cell_colors(rule.states)
+        terrain = self.terrain if self.engine.supports_terrain and rule.states == 2 else None
+
+        def edit(engine):
+            # Правила по рельефу снимаются на время смены: они бывают только у двухцветных правил.
+            engine.set_terrain(None)
+            engine.set_rule(rule)
+            engine.set_terrain(terrain)
+
+        self._edit(edit)
+
+    def set_relief(self, altitude_map):
+        """Строит подложку по карте высот (None - убирает ее)."""
+        self.relief = None if altitude_map is None else TerrainLayer(altitude_map, argb_pixmap)
+        self.update()
+
+    def set_show_relief(self, visible):
+        self.show_relief = visible
+        self.update()
+
+    def set_universe(self, universe):
+        """Загружает готовую вселенную HashLife (например, из файла Macrocell)."""
+        self.set_engine("hashlife")
+        self._edit(lambda engine: engine.set_universe(universe))
+
     def clear_grid(self):
         """Полностью очищает поле от живых клеток."""
-        self.live_cells.clear()
-        self.update()
+        self._edit(lambda engine: engine.clear())
 
     def screen_to_world(self, pos):
         """Преобразует экранные координаты (пиксели) в мировые (клетки)."""
@@ -69,39 +513,9 @@ class GridWidget(QWidget):
         row = int((pos.y() - self.offset_y) / self.zoom)
         return col, row
 
-    def count_neighbors(self, col, row):
-        """Считает количество живых соседей для указанной клетки."""
-        count = 0
-        # dr (delta row) и dc (delta col) - смещения для проверки 8 соседей.
-        for dr in range(-1, 2):
-            for dc in range(-1, 2):
-                if dr == 0 and dc == 0:
-                    continue  # Пропускаем саму клетку.
-                if (col + dc, row + dr) in self.live_cells:
-                    count += 1
-        return count
-
     def update_grid(self):
         """Вычисляет следующее поколение клеток по правилам игры 'Жизнь'."""
-        # Собираем всех "кандидатов" - живые клетки и их непосредственных соседей.
-        # Только эти клетки могут изменить свое состояние.
-        candidates = set()
-        for (col, row) in self.live_cells:
-            for dr in range(-1, 2):
-                for dc in range(-1, 2):
-                    candidates.add((col + dc, row + dr))
-
-        next_live_cells = set()
-        # Проверяем каждого кандидата и решаем, будет ли он жив в след. поколении.
-        for (col, row) in candidates:
-            neighbors = self.count_neighbors(col, row)
-            is_alive = (col, row) in self.live_cells
-
-            if (is_alive and neighbors in (2, 3)) or (not is_alive and neighbors == 3):
-                next_live_cells.add((col, row))
-
-        self.live_cells = next_live_cells
-        self.update()
+        self._edit(self.metrics.step)
 
     def keyPressEvent(self, event):
         """Обрабатывает нажатия клавиш для управления курсором и клетками."""
@@ -118,14 +532,12 @@ class GridWidget(QWidget):
             col += 1
         # Нажатие Enter инвертирует состояние клетки под курсором.
         elif event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
-            if self.cursor_pos in self.live_cells:
-                self.live_cells.remove(self.cursor_pos)
-            else:
-                self.live_cells.add(self.cursor_pos)
+            self._edit(lambda engine, cell=self.cursor_pos: engine.toggle(cell))
 
         self.cursor_pos = (col, row)
         self.cursor_visible = True  # Делаем курсор видимым после любого действия.
         self.cursor_timer.start(500)  # Перезапускаем таймер мигания.
+        self.cursor_moved.emit(col, row)
         self.update()
 
     def mousePressEvent(self, event):
@@ -135,6 +547,7 @@ class GridWidget(QWidget):
             self.cursor_pos = self.screen_to_world(event.position())
             self.cursor_visible = True
             self.cursor_timer.start(500)
+            self.cursor_moved.emit(*self.cursor_pos)
             self.update()
         # Правая кнопка: активирует режим перетаскивания поля.
         elif event.button() == Qt.MouseButton.RightButton:
@@ -170,7 +583,7 @@ class GridWidget(QWidget):
             self.zoom *= 1.2
         else:
             self.zoom /= 1.2
-        self.zoom = max(1, min(self.zoom, 100))  # Ограничиваем масштаб.
+        self.zoom = max(MIN_ZOOM, min(self.zoom, MAX_ZOOM))  # Ограничиваем масштаб.
 
         # Корректируем смещение, чтобы точка под курсором осталась на месте.
         self.offset_x = mouse_pos.x() - world_before_zoom_x * self.zoom
@@ -178,25 +591,114 @@ class GridWidget(QWidget):
         self.update()
 
     def get_live_cells(self):
-        """Возвращает множество всех живых клеток."""
-        return self.live_cells
+        """Возвращает все живые клетки (CellStore)."""
+        return self._view().get_cells()
 
     def set_live_cells(self, cells):
         """Устанавливает новое состояние живых клеток и перерисовывает поле."""
-        self.live_cells = cells
+        self._edit(lambda engine: engine.set_cells(cells))
+
+    def _density_pyramid(self):
+        """
+        Возвращает пирамиду плотности для текущего состояния. Пирамида кэшируется,
+        а для следующего поколения обновляется по родившимся и умершим клеткам.
+        """
+        view = self._view()
+        previous = self._density_view
+        if previous is view and self._density_generation == view.generation:
+            return self._density
+
+        changes = None
+        if self._density is not None and previous is not None \
+                and view.generation == self._density_generation + 1 and hasattr(view, "diff"):
+            changes = view.diff(previous)
+        if changes is not None:
+            self._density.update(*changes)
+        else:
+            self._density = DensityPyramid(view.coords())
+        self._density_view = view
+        self._density_generation = view.generation
+        return self._density
+
+    def _paint_density(self, painter, start_col, start_row, end_col, end_row):
+        """Рисует видимую область как изображение плотности: один пиксель на блок клеток."""
+        level = min(MAX_LEVEL, max(1, math.ceil(-math.log2(self.zoom))))
+        block = 1 << level
+        bx0, by0 = start_col >> level, start_row >> level
+        bx1, by1 = ((end_col - 1) >> level) + 1, ((end_row - 1) >> level) + 1
+        counts = self._density_pyramid().query(level, bx0, by0, bx1, by1)
+        if not counts.any():
+            return
+        # Прозрачность пикселя пропорциональна доле живых клеток в блоке.
+        alpha = np.minimum(counts * 255 // (block * block), 255).astype(np.uint32)
+        alpha[counts > 0] = np.maximum(alpha[counts > 0], 32)  # Одиночные клетки тоже видны.
+        pixels = np.ascontiguousarray(alpha << 24)
+        height, width = pixels.shape
+        image = QImage(pixels.data, width, height, width * 4, QImage.Format.Format_ARGB32_Premultiplied)
+        painter.drawImage(QRectF(bx0 * block * self.zoom + self.offset_x, by0 * block * self.zoom + self.offset_y,
+                                 width * block * self.zoom, height * block * self.zoom), image)
+
+    def set_metrics_overlay(self, visible):
+        """Показывает или скрывает оверлей метрик; показ включает их сбор."""
+        self.show_metrics = visible
+        if visible:
+            self.metrics.set_enabled(True)
         self.update()
 
+    def _paint_metrics(self, painter):
+        """Рисует в левом верхнем углу сводку метрик."""
+        summary = self.metrics.summary()
+        view = self._view()
+
+        def ms(stats):
+            return "-" if stats is None else f"{stats['mean'] * 1000:.2f} (макс. {stats['max'] * 1000:.2f})"
+
+        lines = [f"Поколение: {view.generation}",
+                 f"Население: {len(view)}",
+                 f"Шаг, мс: {ms(summary['step'])}",
+                 f"Отрисовка, мс: {ms(summary['paint'])}",
+                 f"Кадр, мс: {ms(summary['frame'])}",
+                 "FPS: -" if summary["fps"] is None else f"FPS: {summary['fps']:.1f}"]
+        if self.relief is not None:
+            cache = self.relief.cache
+            lines.append(f"Рельеф: {len(cache)} тайлов, {cache.nbytes / 2 ** 20:.1f} МБ, "
+                         f"попаданий {cache.hits}/{cache.hits + cache.misses}")
+        metrics = painter.fontMetrics()
+        line_height = metrics.height()
+        width = max(metrics.horizontalAdvance(line) for line in lines) + 12
+        painter.fillRect(QRectF(4, 4, width, line_height * len(lines) + 8), QColor(0, 0, 0, 160))
+        painter.setPen(QColor("white"))
+        for i, line in enumerate(lines):
+            painter.drawText(10, 8 + metrics.ascent() + i * line_height, line)
+
+    def _paint_relief(self, painter, start_col, start_row, end_col, end_row):
+        """
+        Рисует видимые тайлы подложки уровня пирамиды для текущего масштаба;
+        тайлы берутся из кэша, так что панорамирование не пересчитывает цвета.
+        """
+        level = level_for_zoom(self.zoom)
+        for tx, ty in self.relief.visible_tiles(level, start_col, start_row, end_col, end_row):
+            pixmap, (col, row, cols, rows) = self.relief.tile(level, tx, ty)
+            painter.drawPixmap(QRectF(col * self.zoom + self.offset_x, row * self.zoom + self.offset_y,
+                                      cols * self.zoom, rows * self.zoom), pixmap, QRectF(pixmap.rect()))
+
     def paintEvent(self, event):
         """Главный метод отрисовки. Вызывается каждый раз при self.update()."""
+        metrics = self.metrics
+        paint_start = time.perf_counter() if metrics.active else None
         painter = QPainter(self)
         painter.fillRect(self.rect(), QColor("white"))  # Заливаем фон белым.
 
         # Вычисляем, какие мировые координаты (клетки) сейчас видны на экране.
-        start_col = int(-self.offset_x / self.zoom);
+        start_col = math.floor(-self.offset_x / self.zoom)
         end_col = int((-self.offset_x + self.width()) / self.zoom) + 1
-        start_row = int(-self.offset_y / self.zoom);
+        start_row = math.floor(-self.offset_y / self.zoom)
         end_row = int((-self.offset_y + self.height()) / self.zoom) + 1
 
+        # Под клетками - подложка рельефа из готовых тайлов.
+        if self.show_relief and self.relief is not None:
+            self._paint_relief(painter, start_col, start_row, end_col, end_row)
+
         # Рисуем сетку, только если масштаб достаточно большой.
         if self.zoom > 4:
             pen = QPen(QColor("#dcdcdc"));
@@ -207,13 +709,20 @@ class GridWidget(QWidget):
             for y in range(start_row, end_row): painter.drawLine(0, int(y * self.zoom + self.offset_y), self.width(),
                                                                  int(y * self.zoom + self.offset_y))
 
-        # Рисуем все живые клетки, которые попадают в видимую область.
-        painter.setBrush(QColor("black"));
-        painter.setPen(Qt.PenStyle.NoPen)
-        for (col, row) in self.live_cells:
-            if start_col <= col < end_col and start_row <= row < end_row:
-                painter.drawRect(
-                    QRectF(col * self.zoom + self.offset_x, row * self.zoom + self.offset_y, self.zoom, self.zoom))
+        # При сильном отдалении рисуем карту плотности вместо отдельных клеток.
+        if self.zoom < LOD_ZOOM:
+            self._paint_density(painter, start_col, start_row, end_col, end_row)
+            bitmap = None
+        else:
+            # Рисуем живые клетки видимой области одним изображением: движок отдает
+            # только видимый прямоугольник, а масштабирование делает QPainter.
+            bitmap = self._view().bitmap_in_rect(start_col, start_row, end_col, end_row)
+        if bitmap is not None and bitmap.any():
+            pixels = self.cell_colors[bitmap]
+            height, width = pixels.shape
+            image = QImage(pixels.data, width, height, width * 4, QImage.Format.Format_ARGB32_Premultiplied)
+            painter.drawImage(QRectF(start_col * self.zoom + self.offset_x, start_row * self.zoom + self.offset_y,
+                                     width * self.zoom, height * self.zoom), image)
 
         # Рисуем мигающий курсор поверх всего остального.
         if self.cursor_visible:
@@ -226,22 +735,118 @@ class GridWidget(QWidget):
                 painter.drawRect(
                     QRectF(col * self.zoom + self.offset_x, row * self.zoom + self.offset_y, self.zoom, self.zoom))
 
+        if paint_start is not None:
+            metrics.record_paint(paint_start, time.perf_counter() - paint_start)
+        # Оверлей рисуется после замера, чтобы не входить в время отрисовки поля.
+        if self.show_metrics:
+            self._paint_metrics(painter)
+
+
+# --- Модель списка паттернов ---
+# Подгружает паттерны из базы страницами по мере прокрутки, поэтому
+# библиотека из сотен тысяч записей открывается мгновенно.
+class PatternListModel(QAbstractListModel):
+    PAGE_SIZE = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.query = ""
+        self.sort = "name"
+        self.descending = False
+        self.rows = []
+        self.total = 0
+
+    def set_filter(self, query, sort="name", descending=False):
+        """Задает строку поиска и сортировку и перечитывает первую страницу."""
+        self.query, self.sort, self.descending = query, sort, descending
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.total = database.count_patterns(self.query)
+        self.rows = database.search_patterns(self.query, self.sort, self.descending, 0, self.PAGE_SIZE)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self.rows) < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        page = database.search_patterns(self.query, self.sort, self.descending, len(self.rows), self.PAGE_SIZE)
+        if not page:
+            self.total = len(self.rows)
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        _, name, population, width, height, period, tags, rule = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            details = f"{population} кл."
+            if width is not None:
+                details += f", {width}x{height}"
+            if period:
+                details += f", период {period}"
+            if rule != str(CONWAY):
+                details += f", {rule}"
+            return f"{name}  ({details})"
+        if role == Qt.ItemDataRole.ToolTipRole and tags:
+            return tags
+        return None
+
+    def pattern_id(self, row):
+        return self.rows[row][0]
+
+    def name(self, row):
+        return self.rows[row][1]
+
 
 class PatternLibraryWindow(QWidget):
-    # Сигнал, который будет отправляться, когда пользователь выберет паттерн
-    pattern_selected = pyqtSignal(set)
+    # Сигнал, который будет отправляться, когда пользователь выберет паттерн: клетки и запись правила
+    pattern_selected = pyqtSignal(object, str)
 
-    def __init__(self, current_cells):
+    # Варианты сортировки: подпись, ключ database.SORT_COLUMNS, по убыванию.
+    SORT_OPTIONS = [("По имени", "name", False), ("По населению", "population", True),
+                    ("По размеру", "size", True), ("По периоду", "period", False)]
+
+    def __init__(self, current_cells, current_rule=CONWAY):
         super().__init__()
         self.setWindowTitle("Библиотека паттернов")
         self.setFixedSize(400, 500)
         self.current_cells = current_cells
+        self.current_rule = current_rule
 
         layout = QVBoxLayout(self)
 
+        # Поиск по имени и тегам; запрос уходит в базу после паузы в наборе.
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Поиск по имени и тегам...")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.refresh_list)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+
+        self.sort_combo = QComboBox()
+        for label, _, _ in self.SORT_OPTIONS:
+            self.sort_combo.addItem(label)
+        self.sort_combo.currentIndexChanged.connect(self.refresh_list)
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(self.search_edit)
+        filter_layout.addWidget(self.sort_combo)
+
         # Список для отображения паттернов
-        self.pattern_list = QListWidget()
-        self.pattern_list.itemDoubleClicked.connect(self.load_selected_pattern)
+        self.pattern_model = PatternListModel(self)
+        self.pattern_list = QListView()
+        self.pattern_list.setModel(self.pattern_model)
+        self.pattern_list.setUniformItemSizes(True)
+        self.pattern_list.doubleClicked.connect(self.load_selected_pattern)
 
         # Кнопки управления
         load_button = QPushButton("Загрузить выбранный")
@@ -254,6 +859,7 @@ class PatternLibraryWindow(QWidget):
         delete_button.clicked.connect(self.delete_selected_pattern)
 
         layout.addWidget(QLabel("Доступные паттерны:"))
+        layout.addLayout(filter_layout)
         layout.addWidget(self.pattern_list)
         layout.addWidget(load_button)
         layout.addWidget(save_button)
@@ -262,53 +868,69 @@ class PatternLibraryWindow(QWidget):
         self.refresh_list()
 
     def refresh_list(self):
-        """Обновляет список паттернов из базы данных."""
-        self.pattern_list.clear()
-        self.patterns_map = {}
-        patterns = database.get_patterns()
-        for pattern_id, name in patterns:
-            self.pattern_list.addItem(name)
-            self.patterns_map[name] = pattern_id
+        """Обновляет список паттернов из базы данных с учетом поиска и сортировки."""
+        _, sort, descending = self.SORT_OPTIONS[self.sort_combo.currentIndex()]
+        self.pattern_model.set_filter(self.search_edit.text(), sort, descending)
+
+    def _selected_row(self):
+        """Номер выбранной строки или None."""
+        index = self.pattern_list.currentIndex()
+        return index.row() if index.isValid() else None
 
     def load_selected_pattern(self):
         """Загружает выбранный паттерн и отправляет его в главное окно."""
-        selected_item = self.pattern_list.currentItem()
-        if not selected_item:
+        row = self._selected_row()
+        if row is None:
             return
 
-        pattern_id = self.patterns_map[selected_item.text()]
-        cells_str = database.get_pattern_cells(pattern_id)
+        pattern_id = self.pattern_model.pattern_id(row)
+        coords = database.get_pattern_cells(pattern_id)
+        rule = database.get_pattern_rule(pattern_id) or str(CONWAY)
 
-        new_cells = set()
-        if cells_str:
-            for part in cells_str.split(';'):
-                col, row = map(int, part.split(','))
-                new_cells.add((col, row))
+        new_cells = CellStore()
+        if coords is not None:
+            # Клетки приходят массивом NumPy (n, 2) и сразу упаковываются в хранилище.
+            new_cells = CellStore(coords)
 
-        # Отправляем сигнал с загруженными клетками
-        self.pattern_selected.emit(new_cells)
+        # Отправляем сигнал с загруженными клетками и правилом паттерна
+        self.pattern_selected.emit(new_cells, rule)
         self.close()  # Закрываем окно после загрузки
 
+    def _pattern_period(self):
+        """
+        Период текущего паттерна (для кораблей - со сдвигом) или None, если паттерн
+        не повторился за MAX_PERIOD поколений, слишком велик или правило многоцветное.
+        """
+        if self.current_rule.states > 2 or not 0 < len(self.current_cells) <= PERIOD_MAX_CELLS:
+            return None
+        _, period, _ = classify_object(self.current_cells, rule=self.current_rule)
+        return period
+
     def save_current_pattern(self):
-        """Запрашивает имя и сохраняет текущий паттерн в БД."""
+        """Запрашивает имя и теги и сохраняет текущий паттерн в БД вместе с его периодом."""
         name, ok = QInputDialog.getText(self, "Сохранить паттерн", "Введите имя паттерна:")
-        if ok and name:
-            success, message = database.add_pattern(name, self.current_cells)
+        if not (ok and name):
+            return
+        tags, ok = QInputDialog.getText(self, "Сохранить паттерн", "Теги через пробел (необязательно):")
+        if ok:
+            success, message = database.add_pattern(name, self.current_cells, self._pattern_period(),
+                                                    " ".join(tags.split()), str(self.current_rule))
             QMessageBox.information(self, "Результат", message)
             if success:
                 self.refresh_list()
 
     def delete_selected_pattern(self):
         """Удаляет выбранный паттерн из БД."""
-        selected_item = self.pattern_list.currentItem()
-        if not selected_item:
+        row = self._selected_row()
+        if row is None:
             return
 
+        name = self.pattern_model.name(row)
         reply = QMessageBox.question(self, "Подтверждение",
-                                     f"Вы уверены, что хотите удалить паттерн '{selected_item.text()}'?")
+                                     f"Вы уверены, что хотите удалить паттерн '{name}'?")
 
         if reply == QMessageBox.StandardButton.Yes:
-            pattern_id = self.patterns_map[selected_item.text()]
+            pattern_id = self.pattern_model.pattern_id(row)
             database.delete_pattern(pattern_id)
             self.refresh_list()
 
@@ -380,6 +1002,18 @@ class HelpWindow(QWidget):
             <li><b>Смерть:</b> Живая клетка, у которой менее 2 (одиночество) или более 3 (перенаселение) живых соседей, умирает.</li>
             <li><b>Рождение:</b> Мёртвая клетка, у которой ровно 3 живых соседа, становится живой в следующем поколении.</li>
         </ol>
+        <h3>Другие правила</h3>
+        <p>
+            Правило выбирается в меню «Движок → Правило» и записывается как <b>B/S</b>:
+            цифры после B - число соседей для рождения, после S - для выживания.
+            Правила Конвея - B3/S23, HighLife - B36/S23, Day &amp; Night - B3678/S34678.
+        </p>
+        <p>
+            Правила <b>Generations</b> (например, Brian's Brain - B2/S/C3) добавляют число
+            состояний C: не выжившая клетка не умирает сразу, а несколько поколений угасает
+            (рисуется серым) и не считается живой для соседей. Такие правила считает только
+            плотный движок. Правило сохраняется вместе с паттерном в файле и в библиотеке.
+        </p>
         """
         label.setText(text)
 
@@ -418,6 +1052,14 @@ class HelpWindow(QWidget):
 # --- Класс главного окна ---
 # Отвечает за создание окна, кнопок и компоновку элементов.
 class GameOfLifeWindow(QMainWindow):
+    # Сигнал о готовности карты высот (передается сама карта).
+    relief_ready = pyqtSignal(object)
+    # Внутренний сигнал из потока генерации: (номер запроса, future).
+    _relief_done = pyqtSignal(int, object)
+    # Внутренние сигналы фонового чтения и записи файлов: (сделано, всего) и (future, обработчик).
+    _file_progress = pyqtSignal(object, object)
+    _file_done = pyqtSignal(object, object)
+
     def __init__(self):
         super().__init__()
         self.help_win = None
@@ -428,10 +1070,24 @@ class GameOfLifeWindow(QMainWindow):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         main_layout = QVBoxLayout(central_widget)
+
+        # Рельеф генерируется в фоновом потоке, окно открывается сразу.
         self.seed = 1
-        self.altitude_map = generate_relief(width=200, height=150, seed=self.seed)
+        self._altitude_map = None
+        self._relief_future = None
+        self._relief_request = 0
+        self._relief_executor = ThreadPoolExecutor(max_workers=1)
+        self._relief_done.connect(self._on_relief_done)
+
+        # Файлы паттернов читаются и пишутся в фоне, окно показывает прогресс.
+        self._file_executor = ThreadPoolExecutor(max_workers=1)
+        self._file_dialog = None
+        self._file_progress.connect(self._on_file_progress)
+        self._file_done.connect(self._on_file_done)
 
         self.grid_widget = GridWidget()
+        self.grid_widget.cycle_detected.connect(self._on_cycle_detected)
+        self.grid_widget.cursor_moved.connect(self._update_climate_label)
         # Разрешаем виджету отслеживать нажатия клавиш.
         self.grid_widget.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         main_layout.addWidget(self.grid_widget)
@@ -454,13 +1110,166 @@ class GameOfLifeWindow(QMainWindow):
         button_layout.addWidget(reset_glider_button)
         button_layout.addWidget(clear_button)
 
-        # Главный таймер, отвечающий за симуляцию.
-        self.timer = QTimer();
-        self.timer.timeout.connect(self.grid_widget.update_grid)
+        # Режим правил по рельефу (см. modules.terrain_rules.MODES) или None - правило поля везде.
+        self.terrain_mode = None
+
+        # Скорость симуляции (поколений в секунду модельного времени; общая скорость
+        # времени - в меню "Время"). Сама симуляция идет в отдельном потоке (см. SimulationThread).
+        self.generations_per_second = 10
+
+        # Климат над рельефом (см. modules.mars_physics): модель создается, когда
+        # готова карта высот, и шагает в потоке симуляции как подсистема TimeManager.
+        # Клетка поля (колонка, ряд) соответствует клетке карты высот [ряд, колонка].
+        self.climate = None
+        self.climate_timer = QTimer(self)  # Обновляет показания, пока идет игра.
+        self.climate_timer.timeout.connect(self._update_climate_label)
+        self.climate_label = QLabel()
+        self.statusBar().addPermanentWidget(self.climate_label)
+        self.relief_ready.connect(self._on_relief_ready)
 
         # Главное меню игры
         self._create_menu_bar()
 
+        self.set_seed(self.seed)
+
+    @property
+    def altitude_map(self):
+        """Карта высот или None, пока она еще генерируется."""
+        return self._altitude_map
+
+    def set_seed(self, seed):
+        """Запускает фоновую генерацию рельефа для нового сида, отменяя предыдущую."""
+        self.seed = seed
+        self._relief_request += 1
+        request = self._relief_request
+        if self._relief_future is not None:
+            # Еще не начатая задача отменится, результат уже идущей будет проигнорирован.
+            self._relief_future.cancel()
+        self._altitude_map = None
+        self.climate = None
+        self.grid_widget.time_manager.unregister("climate")
+        self._update_climate_label()
+        self.grid_widget.set_terrain(None)  # Правила по рельефу вернутся вместе с новой картой.
+        self.grid_widget.set_relief(None)
+        self.statusBar().showMessage("Генерация рельефа...")
+
+        self._relief_future = self._relief_executor.submit(load_relief, width=200, height=150, seed=seed)
+        self._relief_future.add_done_callback(
+            lambda future: None if future.cancelled() else self._relief_done.emit(request, future))
+
+    def _on_relief_done(self, request, future):
+        """Принимает готовую карту высот в главном потоке."""
+        if request != self._relief_request:
+            return  # Результат для устаревшего сида.
+        try:
+            self._altitude_map = future.result()
+        except Exception as e:
+            self.statusBar().showMessage("")
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сгенерировать рельеф:\n{e}")
+            return
+        self.statusBar().showMessage("Рельеф готов", 3000)
+        self.relief_ready.emit(self._altitude_map)
+
+    def _on_relief_ready(self, altitude_map):
+        """Показывает новую карту высот под полем и создает модель климата над ней."""
+        self.grid_widget.set_relief(altitude_map)
+        self.climate = ClimateModel(altitude_map)
+        self.grid_widget.time_manager.register("climate", CLIMATE_RATE, self.climate.step)
+        self._update_climate_label()
+        self._apply_terrain_rules()
+
+    def set_terrain_mode(self, mode):
+        """Выбирает режим правил по рельефу (см. terrain_rules.MODES; None - правило поля везде)."""
+        self.terrain_mode = mode
+        self._apply_terrain_rules()
+
+    def _apply_terrain_rules(self):
+        """Считает таблицы правил клеток по текущей карте высот и передает их полю."""
+        if self.terrain_mode is None or self._altitude_map is None:
+            self.grid_widget.set_terrain(None)
+            return
+        self.grid_widget.set_terrain(terrain_rules.terrain_rules(self._altitude_map, self.terrain_mode))
+        self._warn_terrain_unsupported()
+
+    def _warn_terrain_unsupported(self):
+        engine, rule = self.grid_widget.engine, self.grid_widget.rule
+        if self.grid_widget.terrain is None:
+            return
+        if rule.states > 2:
+            self.statusBar().showMessage(f"Правила по рельефу работают только с двухцветными правилами: "
+                                         f"действует правило {rule}", 10000)
+        elif not engine.supports_terrain:
+            self.statusBar().showMessage(f"Движок '{engine.title}' не поддерживает правила по рельефу: "
+                                         f"действует правило {rule}", 10000)
+
+    def set_engine(self, name):
+        rule = self.grid_widget.rule
+        if rule.states > ENGINES[name].max_states:
+            self.engine_actions[self.grid_widget.engine.name].setChecked(True)
+            self.statusBar().showMessage(f"Движок '{ENGINES[name].title}' не поддерживает правило {rule}", 10000)
+            return
+        self.grid_widget.set_engine(name)
+        self._warn_terrain_unsupported()
+
+    def set_rule(self, rule):
+        """Меняет правило поля и отмечает его в меню."""
+        self.grid_widget.set_rule(rule)
+        self.engine_actions[self.grid_widget.engine.name].setChecked(True)
+        self.rule_actions.get(str(rule), self.other_rule_action).setChecked(True)
+        self.statusBar().showMessage(f"Правило: {rule}", 5000)
+        self._warn_terrain_unsupported()
+
+    def _set_rule_text(self, text):
+        """Применяет правило из файла или библиотеки; нераспознанное правило оставляет текущее."""
+        try:
+            self.set_rule(parse_rule(text))
+        except ValueError as e:
+            self.statusBar().showMessage(f"{e} Оставлено правило {self.grid_widget.rule}", 10000)
+
+    def ask_rule(self):
+        """Запрашивает запись правила у пользователя."""
+        text, ok = QInputDialog.getText(self, "Правило", "Правило (B36/S23, B2/S/C3, 23/3):",
+                                        text=str(self.grid_widget.rule))
+        if not ok:
+            # Отметка в меню возвращается к действующему правилу.
+            self.rule_actions.get(str(self.grid_widget.rule), self.other_rule_action).setChecked(True)
+            return
+        try:
+            rule = parse_rule(text)
+        except ValueError as e:
+            QMessageBox.warning(self, "Правило", str(e))
+            self.rule_actions.get(str(self.grid_widget.rule), self.other_rule_action).setChecked(True)
+            return
+        self.set_rule(rule)
+
+    def _update_climate_label(self, *args):
+        """Показывает климат в клетке под курсором в правой части строки состояния."""
+        if self.climate is None:
+            self.climate_label.setText("")
+            return
+        col, row = self.grid_widget.cursor_pos
+        sol = int(self.climate.time // SOL)
+        sample = self.climate.sample(row, col)
+        if sample is None:
+            self.climate_label.setText(f"Сол {sol} | вне карты")
+            return
+        temperature, pressure, frost = sample
+        self.climate_label.setText(f"Сол {sol} | T {temperature - 273.15:.1f} °C | "
+                                   f"P {pressure:.0f} Па | иней {frost:.1f} кг/м²")
+
+    def change_seed(self):
+        """Запрашивает у пользователя новый сид рельефа."""
+        seed, ok = QInputDialog.getInt(self, "Сид рельефа", "Введите сид:", self.seed, 1)
+        if ok and seed != self.seed:
+            self.set_seed(seed)
+
+    def closeEvent(self, event):
+        """Останавливает симуляцию и фоновую генерацию при закрытии окна."""
+        self.stop_game()
+        self._relief_executor.shutdown(wait=False, cancel_futures=True)
+        self._file_executor.shutdown(wait=False, cancel_futures=True)
+        super().closeEvent(event)
+
     def _create_menu_bar(self):
         """Создает и настраивает строку меню."""
         menu_bar = self.menuBar()
@@ -478,6 +1287,98 @@ class GameOfLifeWindow(QMainWindow):
         load_action.triggered.connect(self.load_pattern)
         file_menu.addAction(load_action)
 
+        # МЕНЮ "ДВИЖОК" - выбор реализации симуляции
+        engine_menu = menu_bar.addMenu("&Движок")
+        engine_group = QActionGroup(self)
+        self.engine_actions = {}
+        for name, engine_class in ENGINES.items():
+            engine_action = QAction(engine_class.title, self, checkable=True)
+            engine_action.setChecked(name == self.grid_widget.engine.name)
+            engine_action.triggered.connect(lambda checked, name=name: self.set_engine(name))
+            engine_group.addAction(engine_action)
+            engine_menu.addAction(engine_action)
+            self.engine_actions[name] = engine_action
+
+        # Подменю скорости симуляции
+        speed_menu = engine_menu.addMenu("Скорость")
+        speed_group = QActionGroup(self)
+        for generations_per_second, title in ((1, "1 пок./с"), (10, "10 пок./с"), (30, "30 пок./с"),
+                                              (60, "60 пок./с")):
+            speed_action = QAction(title, self, checkable=True)
+            speed_action.setChecked(generations_per_second == self.generations_per_second)
+            speed_action.triggered.connect(lambda checked, gps=generations_per_second: self.set_speed(gps))
+            speed_group.addAction(speed_action)
+            speed_menu.addAction(speed_action)
+
+        # Подменю скорости времени: поле и климат ускоряются вместе, соотношение их частот сохраняется
+        time_menu = engine_menu.addMenu("Время")
+        time_group = QActionGroup(self)
+        for scale, title in TIME_SCALES.items():
+            time_action = QAction(title, self, checkable=True)
+            time_action.setChecked(scale == self.grid_widget.time_manager.scale)
+            time_action.triggered.connect(lambda checked, scale=scale: self.grid_widget.set_time_scale(scale))
+            time_group.addAction(time_action)
+            time_menu.addAction(time_action)
+
+        engine_menu.addSeparator()
+        jump_action = QAction("Перейти на N поколений...", self)
+        jump_action.triggered.connect(self.jump_generations)
+        engine_menu.addAction(jump_action)
+
+        # Подменю правила поля: известные правила и произвольная запись B/S[/C]
+        rule_menu = engine_menu.addMenu("Правило")
+        rule_group = QActionGroup(self)
+        self.rule_actions = {}
+        for title, text in KNOWN_RULES.items():
+            rule = parse_rule(text)
+            rule_action = QAction(f"{title} ({rule})", self, checkable=True)
+            rule_action.setChecked(rule == self.grid_widget.rule)
+            rule_action.triggered.connect(lambda checked, rule=rule: self.set_rule(rule))
+            rule_group.addAction(rule_action)
+            rule_menu.addAction(rule_action)
+            self.rule_actions[str(rule)] = rule_action
+        rule_menu.addSeparator()
+        self.other_rule_action = QAction("Другое...", self, checkable=True)
+        self.other_rule_action.triggered.connect(self.ask_rule)
+        rule_group.addAction(self.other_rule_action)
+        rule_menu.addAction(self.other_rule_action)
+
+        # Подменю правил по рельефу: пороги рождения и выживания зависят от высоты или крутизны
+        terrain_menu = engine_menu.addMenu("Правила по рельефу")
+        terrain_group = QActionGroup(self)
+        for mode, title in [(None, "Везде правило поля")] + [(mode, title) for mode, (_, title)
+                                                               in terrain_rules.MODES.items()]:
+            terrain_action = QAction(title, self, checkable=True)
+            terrain_action.setChecked(mode == self.terrain_mode)
+            terrain_action.triggered.connect(lambda checked, mode=mode: self.set_terrain_mode(mode))
+            terrain_group.addAction(terrain_action)
+            terrain_menu.addAction(terrain_action)
+
+        # Подменю реакции на вымирание и циклы
+        cycle_menu = engine_menu.addMenu("При цикле")
+        cycle_group = QActionGroup(self)
+        for mode, title in CYCLE_MODES.items():
+            cycle_action = QAction(title, self, checkable=True)
+            cycle_action.setChecked(mode == self.grid_widget.cycle_mode)
+            cycle_action.triggered.connect(lambda checked, mode=mode: self.grid_widget.set_cycle_mode(mode))
+            cycle_group.addAction(cycle_action)
+            cycle_menu.addAction(cycle_action)
+
+        # Подменю метрик: сбор, оверлей и экспорт замеров
+        metrics_menu = engine_menu.addMenu("Метрики")
+        self.collect_metrics_action = QAction("Собирать метрики", self, checkable=True)
+        self.collect_metrics_action.triggered.connect(self.grid_widget.metrics.set_enabled)
+        metrics_menu.addAction(self.collect_metrics_action)
+        overlay_action = QAction("Показывать оверлей", self, checkable=True)
+        overlay_action.triggered.connect(self.set_metrics_overlay)
+        metrics_menu.addAction(overlay_action)
+        export_metrics_action = QAction("Экспорт метрик...", self)
+        export_metrics_action.triggered.connect(self.export_metrics)
+        metrics_menu.addAction(export_metrics_action)
+        clear_metrics_action = QAction("Сбросить метрики", self)
+        clear_metrics_action.triggered.connect(self.grid_widget.metrics.clear)
+        metrics_menu.addAction(clear_metrics_action)
+
         # МЕНЮ "ПОМОЩЬ"
         help_icon = self.style().standardIcon(getattr(QStyle.StandardPixmap, "SP_MessageBoxQuestion"))
         help_action = QAction(help_icon, "Справка", self)
@@ -492,6 +1393,32 @@ class GameOfLifeWindow(QMainWindow):
 
         file_menu.addSeparator()
 
+        # Смена сида рельефа
+        seed_action = QAction("Сид рельефа...", self)
+        seed_action.triggered.connect(self.change_seed)
+        file_menu.addAction(seed_action)
+
+        # Подложка рельефа под полем
+        relief_action = QAction("Показывать рельеф", self, checkable=True)
+        relief_action.setChecked(self.grid_widget.show_relief)
+        relief_action.triggered.connect(self.grid_widget.set_show_relief)
+        file_menu.addAction(relief_action)
+
+    def set_metrics_overlay(self, visible):
+        self.grid_widget.set_metrics_overlay(visible)
+        if visible:
+            self.collect_metrics_action.setChecked(True)
+
+    def export_metrics(self):
+        """Сохраняет собранные метрики в CSV или JSON (по расширению файла)."""
+        file_path, _ = QFileDialog.getSaveFileName(self, "Экспорт метрик", "",
+                                                   "CSV (*.csv);;JSON (*.json);;All Files (*)")
+        if file_path:
+            try:
+                self.grid_widget.metrics.export(file_path)
+            except Exception as e:
+                QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить метрики:\n{e}")
+
     def show_help_window(self):
         """Создает и показывает окно справки."""
         # Проверяем, не открыто ли уже окно
@@ -500,10 +1427,60 @@ class GameOfLifeWindow(QMainWindow):
 
         self.help_win.show()
 
+    def _run_file_task(self, label, error_text, task, on_done, on_finish=None):
+        """
+        Выполняет чтение или запись файла в фоновом потоке с окном прогресса.
+
+        :param task: Функция от progress(done, total), выполняемая в фоне.
+        :param on_done: Вызывается в главном потоке с результатом task.
+        :param on_finish: Вызывается в главном потоке после task при любом исходе (до on_done).
+        """
+        cancelled = threading.Event()
+        dialog = QProgressDialog(label, "Отмена", 0, 1000, self)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(300)
+        dialog.canceled.connect(cancelled.set)
+        self._file_dialog = dialog
+
+        def progress(done, total):
+            if cancelled.is_set():
+                raise CancelledError()
+            self._file_progress.emit(done, total)
+
+        future = self._file_executor.submit(task, progress)
+        future.add_done_callback(lambda future: self._file_done.emit(future, (error_text, on_done, on_finish)))
+
+    def _on_file_progress(self, done, total):
+        if self._file_dialog is None:
+            return
+        if total:
+            self._file_dialog.setRange(0, 1000)
+            self._file_dialog.setValue(min(999, done * 1000 // total))
+        else:
+            self._file_dialog.setRange(0, 0)  # Объем неизвестен - бегущий индикатор.
+
+    def _on_file_done(self, future, handler):
+        """Принимает результат фоновой операции с файлом в главном потоке."""
+        error_text, on_done, on_finish = handler
+        if self._file_dialog is not None:
+            self._file_dialog.close()
+            self._file_dialog = None
+        if on_finish is not None:
+            on_finish()
+        try:
+            result = future.result()
+        except CancelledError:
+            self.statusBar().showMessage("Операция отменена", 3000)
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"{error_text}:\n{e}")
+            return
+        on_done(result)
+
     def save_pattern(self):
         """
         Открывает диалог сохранения файла и записывает в него
-        координаты живых клеток.
+        живые клетки (текст, RLE или Macrocell - по расширению).
         """
         self.stop_game()  # Останавливаем симуляцию перед сохранением
 
@@ -512,26 +1489,30 @@ class GameOfLifeWindow(QMainWindow):
             self,
             "Сохранить паттерн",
             "",  # Начальная директория (пусто = по умолчанию)
-            "Pattern Files (*.txt);;All Files (*)"  # Фильтры файлов
+            FILE_FILTER  # Фильтры файлов
         )
 
         # Если пользователь выбрал файл (не нажал "Отмена")
         if file_path:
-            try:
-                with open(file_path, 'w') as f:
-                    # Получаем клетки от виджета
-                    live_cells = self.grid_widget.get_live_cells()
-                    # Записываем каждую координату (col, row) в новую строку
-                    for col, row in live_cells:
-                        f.write(f"{col},{row}\n")
-            except Exception as e:
-                # Показываем сообщение об ошибке, если что-то пошло не так
-                QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл:\n{e}")
+            # Снимок неизменяем, поэтому его можно отдать фоновому потоку.
+            snapshot = self.grid_widget.engine.snapshot()
+            root = getattr(snapshot, "root", None)
+            rule = str(self.grid_widget.rule)
+
+            def save(progress):
+                # Дерево HashLife пишется в Macrocell напрямую, без перевода в клетки.
+                if root is not None and pattern_format(file_path) == "mc":
+                    write_pattern(file_path, root, progress, rule, (snapshot.origin_x, snapshot.origin_y))
+                else:
+                    write_pattern(file_path, snapshot.coords(), progress, rule)
+
+            self._run_file_task("Сохранение паттерна...", "Не удалось сохранить файл", save,
+                                lambda result: self.statusBar().showMessage("Паттерн сохранен", 3000))
 
     def load_pattern(self):
         """
         Открывает диалог загрузки файла и считывает из него
-        координаты живых клеток.
+        живые клетки (текст, RLE или Macrocell - по расширению).
         """
         self.stop_game()  # Останавливаем симуляцию
 
@@ -539,41 +1520,53 @@ class GameOfLifeWindow(QMainWindow):
             self,
             "Загрузить паттерн",
             "",
-            "Pattern Files (*.txt);;All Files (*)"
+            FILE_FILTER
         )
 
         if file_path:
-            try:
-                new_live_cells = set()
-                with open(file_path, 'r') as f:
-                    for line in f:
-                        # Убираем лишние пробелы и пустые строки
-                        line = line.strip()
-                        if not line:
-                            continue
-                        # Разделяем строку "col,row" на две части
-                        parts = line.split(',')
-                        col = int(parts[0])
-                        row = int(parts[1])
-                        new_live_cells.add((col, row))
-
-                # Передаем новые клетки в виджет
-                self.grid_widget.set_live_cells(new_live_cells)
-            except Exception as e:
-                QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить файл:\n{e}")
+            if pattern_format(file_path) == "mc":
+                # Macrocell загружается прямо в квадродерево HashLife.
+                self._run_file_task("Загрузка паттерна...", "Не удалось загрузить файл",
+                                    lambda progress: (read_macrocell(file_path, progress), read_rule(file_path)),
+                                    self._load_universe)
+            else:
+                self._run_file_task("Загрузка паттерна...", "Не удалось загрузить файл",
+                                    lambda progress: (CellStore(read_pattern(file_path, progress)),
+                                                      read_rule(file_path)),
+                                    self._load_cells)
+
+    def _load_cells(self, result):
+        """Применяет правило прочитанного файла (если оно в нем есть) и передает клетки в виджет."""
+        cells, rule = result
+        if rule is not None:
+            self._set_rule_text(rule)
+        self.grid_widget.set_live_cells(cells)
+
+    def _load_universe(self, result):
+        """Передает прочитанную вселенную HashLife в виджет."""
+        universe, rule = result
+        if rule is not None:
+            self._set_rule_text(rule)
+        if self.grid_widget.rule.states > ENGINES["hashlife"].max_states:
+            # Правило Generations квадродерево не считает: клетки переходят в текущий движок.
+            self.grid_widget.set_live_cells(CellStore(universe.get_cells()))
+            return
+        self.grid_widget.set_universe(universe)
+        self.engine_actions["hashlife"].setChecked(True)
 
     def show_pattern_library(self):
         """Открывает окно библиотеки паттернов."""
         self.stop_game()
         # Передаем текущие клетки, чтобы их можно было сохранить
         current_cells = self.grid_widget.get_live_cells()
-        self.library_win = PatternLibraryWindow(current_cells)
+        self.library_win = PatternLibraryWindow(current_cells, self.grid_widget.rule)
         # Подключаемся к сигналу, который вернет выбранный паттерн
         self.library_win.pattern_selected.connect(self.load_pattern_from_db)
         self.library_win.show()
 
-    def load_pattern_from_db(self, cells):
-        """Слот, который принимает клетки от окна библиотеки и загружает их."""
+    def load_pattern_from_db(self, cells, rule):
+        """Слот, который принимает клетки и правило от окна библиотеки и загружает их."""
+        self._set_rule_text(rule)
         self.grid_widget.set_live_cells(cells)
 
     def reset_and_center_glider(self):
@@ -583,15 +1576,107 @@ class GameOfLifeWindow(QMainWindow):
         self.grid_widget.offset_x = self.grid_widget.width() / 2
         self.grid_widget.offset_y = self.grid_widget.height() / 2
 
-        for dr, dc in self.grid_widget.glider_pattern:
-            self.grid_widget.live_cells.add((0 + dc, 0 + dr))
-        self.grid_widget.update()
+        glider = [(0 + dc, 0 + dr) for dr, dc in self.grid_widget.glider_pattern]
+        self.grid_widget.set_live_cells(glider)
+
+    def jump_generations(self):
+        """
+        Продвигает симуляцию сразу на N поколений (через HashLife, если правило позволяет).
+
+        Перемотка идет в фоновом потоке с окном прогресса и может быть прервана:
+        поле остается на последнем досчитанном поколении.
+        """
+        self.stop_game()
+        if self.grid_widget.busy:
+            return
+        generations, ok = QInputDialog.getInt(self, "Перейти на N поколений",
+                                              "Количество поколений:", 1000, 1, 2 ** 31 - 1)
+        if not ok:
+            return
+        # Для больших прыжков нужен движок с быстрой перемоткой (правила Generations он не считает).
+        if not self.grid_widget.engine.fast_forward \
+                and self.grid_widget.rule.states <= ENGINES["hashlife"].max_states:
+            if self.grid_widget.terrain is not None:
+                answer = QMessageBox.question(
+                    self, "Перейти на N поколений",
+                    "HashLife не поддерживает правила по рельефу: после перехода на него поле "
+                    f"будет считаться по правилу {self.grid_widget.rule}.\n\n"
+                    "Перейти на HashLife? (Нет - считать текущим движком с рельефом, пошагово.)",
+                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+                    | QMessageBox.StandardButton.Cancel)
+                if answer == QMessageBox.StandardButton.Cancel:
+                    return
+                switch = answer == QMessageBox.StandardButton.Yes
+            else:
+                switch = True
+            if switch:
+                self.grid_widget.set_engine("hashlife")
+                self.engine_actions["hashlife"].setChecked(True)
+        engine = self.grid_widget.begin_background()
+
+        def jump(progress):
+            done = 0
+            chunk = 1
+            reported = time.monotonic()
+            try:
+                while done < generations:
+                    # HashLife перематывает степенями двойки, остальные движки - по поколению.
+                    # Шаг HashLife подбирается так, чтобы вызов шел около JUMP_PROGRESS_INTERVAL:
+                    # отмена проверяется только между вызовами.
+                    left = generations - done
+                    step = min(chunk, 1 << (left.bit_length() - 1)) if engine.fast_forward else 1
+                    start = time.monotonic()
+                    engine.advance(step)
+                    done += step
+                    now = time.monotonic()
+                    if now - start < JUMP_PROGRESS_INTERVAL / 2:
+                        chunk = min(chunk * 2, JUMP_MAX_CHUNK)
+                    elif now - start > JUMP_PROGRESS_INTERVAL * 2:
+                        chunk = max(chunk // 2, 1)
+                    if now - reported >= JUMP_PROGRESS_INTERVAL:
+                        reported = now
+                        progress(done, generations)
+            except CancelledError:
+                pass  # Досчитанные поколения остаются на поле.
+            return done
+
+        def report(count):
+            status = "Поколение" if count == generations else "Переход прерван на поколении"
+            self.statusBar().showMessage(f"{status}: {engine.generation}", 5000)
+
+        def finish():
+            # Отложенные во время перемотки действия могли сменить движок.
+            self.grid_widget.end_background()
+            self.engine_actions[self.grid_widget.engine.name].setChecked(True)
+
+        self._run_file_task(f"Переход на {generations} поколений...", "Не удалось перейти на N поколений",
+                            jump, report, finish)
+
+    def _on_cycle_detected(self, generation, period):
+        """Сообщает в строке состояния, что поле вымерло или зациклилось."""
+        if period == 0:
+            message = f"Поле опустело на поколении {generation}"
+        elif period == 1:
+            message = f"Поле застыло на поколении {generation}"
+        elif self.grid_widget.is_running():
+            message = f"Цикл периода {period} с поколения {generation - period}: проигрывается без пересчета"
+        else:
+            message = f"Цикл периода {period} с поколения {generation - period}"
+        self.statusBar().showMessage(message, 10000)
 
     def start_game(self):
-        self.timer.start(100)
+        self.grid_widget.start_simulation(self.generations_per_second)
+        self.climate_timer.start(CLIMATE_LABEL_INTERVAL)
 
     def stop_game(self):
-        self.timer.stop()
+        self.grid_widget.stop_simulation()
+        self.climate_timer.stop()
+
+    def set_speed(self, generations_per_second):
+        """Меняет скорость симуляции, в том числе на ходу."""
+        self.generations_per_second = generations_per_second
+        if self.grid_widget.is_running():
+            self.grid_widget.start_simulation(generations_per_second)
 
     def reset_glider(self):
         self.stop_game()
@@ -624,4 +1709,6 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = GameOfLifeWindow()
     window.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    database.get_repository().close()
+    sys.exit(exit_code)
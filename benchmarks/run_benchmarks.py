@@ -0,0 +1,206 @@
+"""
+Безголовые бенчмарки: шаг 'Жизни', отрисовка GridWidget и генерация рельефа.
+
+Запуск из корня репозитория:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare old.json new.json
+
+Отрисовка идет через offscreen-платформу Qt, дисплей не нужен.
+Результаты пишутся в JSON, чтобы прогоны можно было сравнивать.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource  # Нет в Windows.
+except ImportError:
+    resource = None
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from modules.life_engine import ENGINES, create_engine  # noqa: E402
+from modules.relief_generator import generate_relief  # noqa: E402
+
+# --- Стандартный набор паттернов (колонка, ряд) ---
+R_PENTOMINO = [(1, 0), (2, 0), (0, 1), (1, 1), (1, 2)]
+GOSPER_GUN = [(24, 0), (22, 1), (24, 1), (12, 2), (13, 2), (20, 2), (21, 2), (34, 2), (35, 2),
+              (11, 3), (15, 3), (20, 3), (21, 3), (34, 3), (35, 3), (0, 4), (1, 4), (10, 4),
+              (16, 4), (20, 4), (21, 4), (0, 5), (1, 5), (10, 5), (14, 5), (16, 5), (17, 5),
+              (22, 5), (24, 5), (10, 6), (16, 6), (24, 6), (11, 7), (15, 7), (12, 8), (13, 8)]
+
+
+def random_soup(size, density, seed=0):
+    """Случайный 'суп' size x size с заданной плотностью живых клеток."""
+    rng = random.Random(seed)
+    return [(col, row) for row in range(size) for col in range(size) if rng.random() < density]
+
+
+def life_cases(quick):
+    """Кейсы для шага симуляции: (имя, клетки, число поколений)."""
+    soup_size = 128 if quick else 256
+    generations = 50 if quick else 200
+    cases = [("r_pentomino", R_PENTOMINO, generations * 5),
+             ("gosper_gun", GOSPER_GUN, generations * 5)]
+    for density in (0.1, 0.3, 0.5):
+        cases.append((f"soup_{soup_size}_d{density}", random_soup(soup_size, density), generations))
+    return cases
+
+
+def measure(make_run):
+    """
+    Замеряет нагрузку: make_run() готовит и возвращает функцию без аргументов.
+
+    Время и память меряются в двух отдельных прогонах, потому что tracemalloc
+    заметно замедляет код на чистом Python.
+
+    :return: (результат, секунды, пик памяти Python в байтах).
+    """
+    run = make_run()
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+
+    run = make_run()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def bench_life(quick, engines):
+    results = []
+    for case, cells, generations in life_cases(quick):
+        for name in engines:
+            def make_run():
+                engine = create_engine(name)
+                engine.set_cells(cells)
+
+                def run():
+                    for _ in range(generations):
+                        engine.step()
+                    return len(engine)
+                return run
+
+            population, seconds, peak = measure(make_run)
+            results.append({"suite": "life_step", "case": case, "engine": name,
+                            "generations": generations, "population": population,
+                            "seconds": seconds, "generations_per_sec": generations / seconds,
+                            "peak_memory_bytes": peak})
+    return results
+
+
+def bench_paint(quick, engines):
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtGui import QImage
+    from Mars_game import GridWidget
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    frames = 20 if quick else 100
+    size = 256 if quick else 1024
+    soup = random_soup(size, 0.3)
+    results = []
+    for name in engines:
+        widget = GridWidget()
+        widget.resize(800, 600)
+        widget.set_engine(name)
+        widget.set_live_cells(soup)
+        image = QImage(widget.size(), QImage.Format.Format_ARGB32_Premultiplied)
+        for zoom in (10.0, 1.0, 1 / 8):
+            widget.zoom = zoom
+            widget.offset_x = widget.offset_y = 0
+            widget.render(image)  # Первый кадр строит индексы и кэши.
+
+            def make_run():
+                widget.offset_x = widget.offset_y = 0
+
+                def run():
+                    for _ in range(frames):
+                        widget.offset_x -= 3
+                        widget.render(image)
+                return run
+
+            _, seconds, peak = measure(make_run)
+            results.append({"suite": "paint", "case": f"soup_{size}_zoom_{zoom:g}", "engine": name,
+                            "frames": frames, "seconds": seconds, "ms_per_frame": seconds / frames * 1000,
+                            "peak_memory_bytes": peak})
+        widget.deleteLater()
+    app.processEvents()
+    return results
+
+
+def bench_relief(quick):
+    sizes = [(200, 150), (512, 512)] if quick else [(200, 150), (1024, 1024), (2048, 2048)]
+    results = []
+    for width, height in sizes:
+        _, seconds, peak = measure(lambda: lambda: generate_relief(width, height, seed=1))
+        results.append({"suite": "relief", "case": f"{width}x{height}", "seconds": seconds,
+                        "cells_per_sec": width * height / seconds, "peak_memory_bytes": peak})
+    return results
+
+
+def compare(old_path, new_path):
+    """Печатает отношение времени нового прогона к старому для совпадающих кейсов."""
+    def load(path):
+        with open(path) as f:
+            data = json.load(f)
+        return {(r["suite"], r["case"], r.get("engine")): r for r in data["results"]}
+
+    old, new = load(old_path), load(new_path)
+    for key in sorted(set(old) & set(new), key=str):
+        ratio = new[key]["seconds"] / old[key]["seconds"]
+        suite, case, engine = key
+        print(f"{suite:10} {case:28} {engine or '-':10} {ratio:6.2f}x {'медленнее' if ratio > 1 else 'быстрее'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки симуляции, отрисовки и генерации рельефа.")
+    parser.add_argument("--output", help="Файл для JSON-результатов (по умолчанию stdout).")
+    parser.add_argument("--quick", action="store_true", help="Уменьшенные размеры для быстрой проверки.")
+    parser.add_argument("--suite", action="append", choices=("life", "paint", "relief"),
+                        help="Запустить только указанные наборы (можно несколько раз).")
+    parser.add_argument("--engine", action="append", choices=sorted(ENGINES),
+                        help="Движки для life и paint (по умолчанию все).")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Сравнить два JSON-файла.")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    suites = args.suite or ["life", "paint", "relief"]
+    engines = args.engine or list(ENGINES)
+    results = []
+    if "life" in suites:
+        results += bench_life(args.quick, engines)
+    if "paint" in suites:
+        results += bench_paint(args.quick, engines)
+    if "relief" in suites:
+        results += bench_relief(args.quick)
+
+    report = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "quick": args.quick,
+                 "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
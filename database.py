@@ -1,60 +1,383 @@
+import json
+import os
 import sqlite3
+import threading
 
-DATABASE_NAME = 'patterns.db'
+from modules.cell_codec import as_coords, encode_cells, decode_cells, parse_text_cells
+
+# База лежит рядом с модулем, а не в текущей рабочей директории.
+DATABASE_NAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterns.db')
+
+# Размер пачки id в запросах "WHERE id IN (...)". Короткие пачки дополняются,
+# чтобы текст запроса не менялся и sqlite3 переиспользовал подготовленный запрос.
+ID_BATCH_SIZE = 256
+_SELECT_MANY_CELLS = ("SELECT id, cells, cells_blob FROM patterns WHERE id IN ("
+                      + ",".join("?" * ID_BATCH_SIZE) + ")")
+
+
+# Столбцы, по которым можно сортировать список паттернов.
+SORT_COLUMNS = {
+    "name": "p.name COLLATE NOCASE",
+    "population": "p.population",
+    "period": "p.period",
+    "size": "(p.max_col - p.min_col + 1) * (p.max_row - p.min_row + 1)",
+    "id": "p.id",
+}
+
+# Колонки метаданных и их типы; добавляются в старые базы через ALTER TABLE.
+_METADATA_COLUMNS = {
+    "population": "INTEGER",
+    "min_col": "INTEGER",
+    "min_row": "INTEGER",
+    "max_col": "INTEGER",
+    "max_row": "INTEGER",
+    "period": "INTEGER",
+    "tags": "TEXT NOT NULL DEFAULT ''",
+    # Правило в записи B/S (см. modules.rules); старые паттерны - правила Конвея.
+    "rule": "TEXT NOT NULL DEFAULT 'B3/S23'",
+}
+
+
+def _metadata(coords):
+    """Население и ограничивающий прямоугольник паттерна по массиву (n, 2)."""
+    if len(coords) == 0:
+        return 0, None, None, None, None
+    cols, rows = coords[:, 0], coords[:, 1]
+    return len(coords), int(cols.min()), int(rows.min()), int(cols.max()), int(rows.max())
+
+
+def _fts_query(text):
+    """Превращает строку поиска в запрос FTS5: все слова как префиксы."""
+    words = [word.replace('"', '""') for word in text.split()]
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _decode_row(cells_str, cells_blob):
+    """Клетки строки таблицы: двоичный формат, если он есть, иначе старый текстовый."""
+    if cells_blob is not None:
+        return decode_cells(cells_blob)
+    return parse_text_cells(cells_str)
+
+
+class PatternRepository:
+    """
+    Долгоживущий доступ к библиотеке паттернов.
+
+    У каждого потока свое соединение, которое открывается один раз и
+    переиспользуется (sqlite3 запрещает делить соединение между потоками).
+    База работает в режиме WAL, поэтому чтение из фоновых потоков не
+    блокируется записью.
+    """
+
+    def __init__(self, path=DATABASE_NAME):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.has_fts = False  # Доступен ли полнотекстовый индекс FTS5.
+
+    def connection(self):
+        """Возвращает соединение текущего потока, открывая его при первом обращении."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Закрывает все открытые соединения."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass  # Соединение другого потока - его закроет сборщик мусора.
+        self._local = threading.local()
+
+    def init_db(self):
+        """Создает таблицу, если ее нет, и переводит старые записи в двоичный формат."""
+        conn = self.connection()
+        with conn:
+            # Создаем таблицу для хранения паттернов
+            # name - название паттерна
+            # cells - координаты живых клеток в виде текста (старый формат)
+            # cells_blob - координаты в двоичном формате modules.cell_codec
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS patterns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL UNIQUE,
+                    cells TEXT NOT NULL,
+                    cells_blob BLOB
+                )
+            """)
+            # Базы, созданные до появления двоичного формата, получают новую колонку.
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(patterns)")]
+            if "cells_blob" not in columns:
+                conn.execute("ALTER TABLE patterns ADD COLUMN cells_blob BLOB")
+            # Метаданные для быстрой фильтрации и сортировки без чтения клеток.
+            for column, column_type in _METADATA_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE patterns ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_patterns_population ON patterns(population)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_patterns_period ON patterns(period)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_patterns_name_nocase ON patterns(name COLLATE NOCASE)")
+            # Результаты переписи супов (modules.soup_search): objects - JSON {объект: количество}.
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS soups (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    seed INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    density REAL NOT NULL,
+                    generations INTEGER NOT NULL,
+                    period INTEGER,
+                    population INTEGER NOT NULL,
+                    objects TEXT NOT NULL
+                )
+            """)
+        self._init_fts()
+        self.migrate_text_cells()
+        self._fill_metadata()
+
+    def _init_fts(self):
+        """Создает полнотекстовый индекс по имени и тегам, если SQLite поддерживает FTS5."""
+        conn = self.connection()
+        try:
+            with conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'patterns_fts'").fetchone() is not None
+                conn.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS patterns_fts
+                    USING fts5(name, tags, content='patterns', content_rowid='id')
+                """)
+                # Триггеры поддерживают индекс в актуальном состоянии.
+                conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS patterns_fts_insert AFTER INSERT ON patterns BEGIN
+                        INSERT INTO patterns_fts(rowid, name, tags) VALUES (new.id, new.name, new.tags);
+                    END
+                """)
+                conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS patterns_fts_delete AFTER DELETE ON patterns BEGIN
+                        INSERT INTO patterns_fts(patterns_fts, rowid, name, tags)
+                        VALUES ('delete', old.id, old.name, old.tags);
+                    END
+                """)
+                conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS patterns_fts_update AFTER UPDATE OF name, tags ON patterns BEGIN
+                        INSERT INTO patterns_fts(patterns_fts, rowid, name, tags)
+                        VALUES ('delete', old.id, old.name, old.tags);
+                        INSERT INTO patterns_fts(rowid, name, tags) VALUES (new.id, new.name, new.tags);
+                    END
+                """)
+                if not exists:
+                    conn.execute("INSERT INTO patterns_fts(patterns_fts) VALUES ('rebuild')")
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False  # SQLite собран без FTS5 - поиск будет через LIKE.
+
+    def _fill_metadata(self, batch_size=500):
+        """Заполняет население и границы у паттернов, сохраненных до появления метаданных."""
+        conn = self.connection()
+        with conn:
+            cursor = conn.execute("SELECT id, cells, cells_blob FROM patterns WHERE population IS NULL")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                updates = [_metadata(_decode_row(cells, blob)) + (pattern_id,) for pattern_id, cells, blob in rows]
+                conn.executemany("UPDATE patterns SET population = ?, min_col = ?, min_row = ?, "
+                                 "max_col = ?, max_row = ? WHERE id = ?", updates)
+
+    def migrate_text_cells(self, batch_size=500):
+        """
+        Переводит паттерны из текстового формата в двоичный одной транзакцией.
+
+        :return: Количество сконвертированных паттернов.
+        """
+        converted = 0
+        conn = self.connection()
+        with conn:
+            cursor = conn.execute("SELECT id, cells FROM patterns WHERE cells_blob IS NULL")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                updates = [(encode_cells(parse_text_cells(cells)), pattern_id) for pattern_id, cells in rows]
+                conn.executemany("UPDATE patterns SET cells_blob = ?, cells = '' WHERE id = ?", updates)
+                converted += len(updates)
+        return converted
+
+    def get_patterns(self):
+        """Возвращает список всех паттернов (id, name)."""
+        return self.connection().execute("SELECT id, name FROM patterns ORDER BY name").fetchall()
+
+    def _where(self, query):
+        """Условие WHERE и параметры для строки поиска."""
+        query = query.strip()
+        if not query:
+            return "", []
+        if self.has_fts:
+            return "WHERE p.id IN (SELECT rowid FROM patterns_fts WHERE patterns_fts MATCH ?)", [_fts_query(query)]
+        return "WHERE p.name LIKE ? OR p.tags LIKE ?", [f"%{query}%", f"%{query}%"]
+
+    def count_patterns(self, query=""):
+        """Количество паттернов, подходящих под строку поиска."""
+        where, params = self._where(query)
+        return self.connection().execute(f"SELECT COUNT(*) FROM patterns p {where}", params).fetchone()[0]
+
+    def search_patterns(self, query="", sort="name", descending=False, offset=0, limit=100):
+        """
+        Страница списка паттернов с фильтрацией и сортировкой на стороне базы.
+
+        :param query: Строка поиска по имени и тегам (слова ищутся как префиксы).
+        :param sort: Ключ из SORT_COLUMNS.
+        :return: Список кортежей (id, name, population, width, height, period, tags, rule).
+        """
+        where, params = self._where(query)
+        order = SORT_COLUMNS[sort] + (" DESC" if descending else "")
+        sql = (f"SELECT p.id, p.name, p.population, p.max_col - p.min_col + 1, p.max_row - p.min_row + 1, "
+               f"p.period, p.tags, p.rule FROM patterns p {where} ORDER BY {order}, p.id LIMIT ? OFFSET ?")
+        return self.connection().execute(sql, params + [limit, offset]).fetchall()
+
+    def get_pattern_cells(self, pattern_id):
+        """Клетки паттерна как массив NumPy (n, 2) пар (col, row) или None, если паттерна нет."""
+        row = self.connection().execute(
+            "SELECT cells, cells_blob FROM patterns WHERE id = ?", (pattern_id,)).fetchone()
+        return _decode_row(*row) if row else None
+
+    def get_pattern_rule(self, pattern_id):
+        """Запись правила паттерна или None, если паттерна нет."""
+        row = self.connection().execute("SELECT rule FROM patterns WHERE id = ?", (pattern_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_many_cells(self, pattern_ids):
+        """
+        Клетки нескольких паттернов за минимальное число запросов.
+
+        :return: Словарь id -> массив (n, 2); отсутствующие id пропускаются.
+        """
+        pattern_ids = list(pattern_ids)
+        conn = self.connection()
+        result = {}
+        for start in range(0, len(pattern_ids), ID_BATCH_SIZE):
+            batch = pattern_ids[start:start + ID_BATCH_SIZE]
+            batch += [None] * (ID_BATCH_SIZE - len(batch))
+            for pattern_id, cells_str, cells_blob in conn.execute(_SELECT_MANY_CELLS, batch):
+                result[pattern_id] = _decode_row(cells_str, cells_blob)
+        return result
+
+    _INSERT = ("INSERT{} INTO patterns (name, cells, cells_blob, population, min_col, min_row, "
+               "max_col, max_row, period, tags, rule) VALUES (?, '', ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+    @staticmethod
+    def _insert_row(name, cells, period=None, tags="", rule="B3/S23"):
+        """Параметры INSERT: клетки в двоичном формате и метаданные."""
+        coords = as_coords(cells)
+        return (name, encode_cells(coords)) + _metadata(coords) + (period, tags, str(rule))
+
+    def add_pattern(self, name, cells_set, period=None, tags="", rule="B3/S23"):
+        """Добавляет новый паттерн. Возвращает (успех, сообщение)."""
+        # Клетки хранятся в двоичном формате, текстовая колонка остается пустой.
+        row = self._insert_row(name, cells_set, period, tags, rule)
+        conn = self.connection()
+        try:
+            with conn:
+                conn.execute(self._INSERT.format(""), row)
+            return True, "Паттерн успешно сохранен."
+        except sqlite3.IntegrityError:
+            return False, "Паттерн с таким именем уже существует."
+
+    def add_patterns(self, patterns):
+        """
+        Добавляет много паттернов одной транзакцией.
+
+        :param patterns: Итерируемое кортежей (name, cells) или (name, cells, period, tags[, rule]).
+        :return: Количество добавленных паттернов (имена-дубликаты пропускаются).
+        """
+        conn = self.connection()
+        rows = (self._insert_row(*pattern) for pattern in patterns)
+        with conn:
+            # rowcount, в отличие от total_changes, не учитывает изменения от триггеров FTS.
+            return conn.executemany(self._INSERT.format(" OR IGNORE"), rows).rowcount
+
+    def add_soup_results(self, results):
+        """
+        Добавляет результаты прогона супов одной транзакцией.
+
+        :param results: Итерируемое словарей modules.soup_search.run_soup.
+        """
+        conn = self.connection()
+        rows = ((r["seed"], r["size"], r["density"], r["generations"], r["period"], r["population"],
+                 json.dumps(r["objects"], ensure_ascii=False)) for r in results)
+        with conn:
+            conn.executemany("INSERT INTO soups (seed, size, density, generations, period, population, objects) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_pattern(self, pattern_id):
+        """Удаляет паттерн по его ID."""
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM patterns WHERE id = ?", (pattern_id,))
+
+
+_repository = None
+
+
+def get_repository():
+    """Возвращает общий репозиторий для базы DATABASE_NAME."""
+    global _repository
+    if _repository is None or _repository.path != DATABASE_NAME:
+        _repository = PatternRepository(DATABASE_NAME)
+    return _repository
 
 
 def init_db():
     """Создает базу данных и таблицу, если их не существует."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        # Создаем таблицу для хранения паттернов
-        # name - название паттерна
-        # cells - координаты живых клеток в виде текста
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS patterns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                cells TEXT NOT NULL
-            )
-        """)
-        conn.commit()
+    get_repository().init_db()
+
+
+def migrate_text_cells(batch_size=500):
+    """Переводит паттерны из текстового формата в двоичный (см. PatternRepository)."""
+    return get_repository().migrate_text_cells(batch_size)
 
 
 def get_patterns():
     """Возвращает список всех паттернов (id, name) из базы данных."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, name FROM patterns ORDER BY name")
-        return cursor.fetchall()
+    return get_repository().get_patterns()
+
+
+def search_patterns(query="", sort="name", descending=False, offset=0, limit=100):
+    """Страница списка паттернов с фильтрацией и сортировкой (см. PatternRepository)."""
+    return get_repository().search_patterns(query, sort, descending, offset, limit)
+
+
+def count_patterns(query=""):
+    """Количество паттернов, подходящих под строку поиска."""
+    return get_repository().count_patterns(query)
 
 
 def get_pattern_cells(pattern_id):
-    """Возвращает строку с клетками для указанного паттерна."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT cells FROM patterns WHERE id = ?", (pattern_id,))
-        result = cursor.fetchone()
-        return result[0] if result else None
+    """
+    Возвращает клетки указанного паттерна как массив NumPy (n, 2) пар (col, row)
+    или None, если паттерна нет. Читает и двоичный, и старый текстовый формат.
+    """
+    return get_repository().get_pattern_cells(pattern_id)
 
 
-def add_pattern(name, cells_set):
-    """Добавляет новый паттерн в базу данных."""
-    # Преобразуем множество клеток в строку вида "x1,y1;x2,y2;..."
-    cells_str = ";".join([f"{col},{row}" for col, row in cells_set])
+def get_pattern_rule(pattern_id):
+    """Запись правила паттерна (например, 'B3/S23') или None, если паттерна нет."""
+    return get_repository().get_pattern_rule(pattern_id)
 
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute("INSERT INTO patterns (name, cells) VALUES (?, ?)", (name, cells_str))
-            conn.commit()
-            return True, "Паттерн успешно сохранен."
-        except sqlite3.IntegrityError:
-            return False, "Паттерн с таким именем уже существует."
+
+def add_pattern(name, cells_set, period=None, tags="", rule="B3/S23"):
+    """Добавляет новый паттерн в базу данных."""
+    return get_repository().add_pattern(name, cells_set, period, tags, rule)
 
 
 def delete_pattern(pattern_id):
     """Удаляет паттерн из базы данных по его ID."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM patterns WHERE id = ?", (pattern_id,))
-        conn.commit()
\ No newline at end of file
+    get_repository().delete_pattern(pattern_id)
@@ -0,0 +1,92 @@
+import struct
+import zlib
+
+import numpy as np
+
+from modules.cell_store import CellStore
+
+# Заголовок двоичного формата: сигнатура, версия, флаги, число клеток.
+MAGIC = b"LCB"
+VERSION = 1
+FLAG_ZLIB = 1
+_HEADER = struct.Struct("<3sBBI")
+
+
+def as_coords(cells):
+    """Приводит набор клеток (col, row), CellStore или массив (n, 2) к int64-массиву (n, 2)."""
+    if isinstance(cells, CellStore):
+        return cells.coords()
+    if isinstance(cells, np.ndarray):
+        return cells.astype(np.int64, copy=False).reshape(-1, 2)
+    cells = list(cells)
+    return np.array(cells, dtype=np.int64).reshape(-1, 2)
+
+
+def encode_cells(cells, compress=True):
+    """
+    Кодирует клетки в компактный двоичный формат.
+
+    Клетки сортируются по (ряд, колонка). Ряды хранятся как разности с
+    предыдущей клеткой, колонки - как разность внутри ряда (в начале ряда -
+    абсолютное значение). Оба потока - int32, по желанию сжатые zlib:
+    у плотных паттернов почти все разности равны 0 или 1 и хорошо сжимаются.
+
+    :param cells: Набор пар (col, row) или массив (n, 2).
+    :param compress: Сжимать ли данные zlib.
+    :return: bytes для хранения в BLOB.
+    """
+    coords = as_coords(cells)
+    if len(coords):
+        coords = coords[np.lexsort((coords[:, 0], coords[:, 1]))]
+    cols, rows = coords[:, 0], coords[:, 1]
+
+    drow = np.diff(rows, prepend=0)
+    dcol = np.diff(cols, prepend=0)
+    new_row = drow != 0
+    if len(coords):
+        new_row[0] = True
+    dcol[new_row] = cols[new_row]
+    payload = np.concatenate((drow, dcol)).astype("<i4").tobytes()
+
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload)
+        flags |= FLAG_ZLIB
+    return _HEADER.pack(MAGIC, VERSION, flags, len(coords)) + payload
+
+
+def decode_cells(data):
+    """
+    Декодирует двоичный формат сразу в массив NumPy.
+
+    :return: int64-массив (n, 2) пар (col, row), отсортированный по (row, col).
+    """
+    magic, version, flags, count = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Неизвестный формат клеток.")
+    if version != VERSION:
+        raise ValueError(f"Неподдерживаемая версия формата клеток: {version}")
+    payload = bytes(data[_HEADER.size:])
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    deltas = np.frombuffer(payload, dtype="<i4").astype(np.int64)
+    if len(deltas) != 2 * count:
+        raise ValueError("Поврежденные данные клеток.")
+    drow, dcol = deltas[:count], deltas[count:]
+
+    rows = np.cumsum(drow)
+    # Колонки - накопленная сумма, которая сбрасывается в начале каждого ряда.
+    new_row = drow != 0
+    if count:
+        new_row[0] = True
+    total = np.cumsum(dcol)
+    starts = np.maximum.accumulate(np.where(new_row, np.arange(count), 0))
+    cols = total - (total[starts] - dcol[starts])
+    return np.stack((cols, rows), axis=1)
+
+
+def parse_text_cells(text):
+    """Разбирает старый текстовый формат "x1,y1;x2,y2;..." в массив (n, 2)."""
+    if not text:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.array(text.replace(";", ",").split(","), dtype=np.int64).reshape(-1, 2)
@@ -0,0 +1,178 @@
+import numpy as np
+
+# Смещение координат при упаковке пары (col, row) в один int64-ключ.
+# Координаты должны лежать в диапазоне [-2^30, 2^30).
+OFFSET = 1 << 30
+
+# Разности ключей восьми соседей клетки: ключи складываются как числа,
+# пока координаты не выходят за допустимый диапазон.
+NEIGHBOR_OFFSETS = np.array([(dr << 32) + dc for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc],
+                            dtype=np.int64)
+
+# Сколько клеток отдавать за раз при итерации.
+_ITER_CHUNK = 1 << 16
+
+
+def pack(cols, rows):
+    """Упаковывает координаты в int64-ключи, упорядоченные по (row, col)."""
+    return ((rows + OFFSET) << 32) + (cols + OFFSET)
+
+
+def unpack(keys):
+    """Распаковывает ключи обратно в (cols, rows)."""
+    return (keys & 0xFFFFFFFF) - OFFSET, (keys >> 32) - OFFSET
+
+
+def _frozen(keys):
+    keys.flags.writeable = False
+    return keys
+
+
+_EMPTY = _frozen(np.zeros(0, dtype=np.int64))
+
+
+class CellStore:
+    """
+    Компактное множество живых клеток (col, row).
+
+    Клетки хранятся как отсортированный массив упакованных int64-ключей -
+    8 байт на клетку против сотни с лишним у множества кортежей. Одиночные
+    правки копятся в небольших буферах и вливаются в массив пачкой, поэтому
+    add/discard/in работают за O(log n), а не перестраивают массив.
+
+    Массив ключей после слияния не меняется на месте, так что копия
+    хранилища (copy) дешевая и безопасна для передачи в другой поток.
+    """
+
+    # Сколько правок копится в буферах перед слиянием с массивом.
+    MAX_PENDING = 4096
+
+    def __init__(self, cells=()):
+        self._added = set()
+        self._removed = set()
+        if isinstance(cells, CellStore):
+            self._keys = cells.keys()
+        elif isinstance(cells, np.ndarray):
+            coords = cells.astype(np.int64, copy=False).reshape(-1, 2)
+            self._keys = _frozen(np.unique(pack(coords[:, 0], coords[:, 1])))
+        else:
+            keys = np.fromiter((pack(col, row) for col, row in cells), dtype=np.int64)
+            self._keys = _frozen(np.unique(keys))
+
+    @classmethod
+    def from_keys(cls, keys, assume_sorted=False):
+        """Создает хранилище из массива ключей (отсортированного и уникального, если assume_sorted)."""
+        store = cls()
+        store._keys = _frozen(keys if assume_sorted else np.unique(keys))
+        return store
+
+    def _flush(self):
+        """Вливает накопленные правки в массив ключей."""
+        keys = self._keys
+        if self._removed:
+            removed = np.fromiter(self._removed, dtype=np.int64, count=len(self._removed))
+            keys = np.delete(keys, np.searchsorted(keys, removed))
+            self._removed.clear()
+        if self._added:
+            added = np.sort(np.fromiter(self._added, dtype=np.int64, count=len(self._added)))
+            keys = np.insert(keys, np.searchsorted(keys, added), added)
+            self._added.clear()
+        if keys is not self._keys:
+            self._keys = _frozen(keys)
+
+    def _in_keys(self, key):
+        keys = self._keys
+        i = keys.searchsorted(key)
+        return i < len(keys) and keys[i] == key
+
+    def keys(self):
+        """Отсортированный массив ключей (только для чтения)."""
+        if self._added or self._removed:
+            self._flush()
+        return self._keys
+
+    def coords(self):
+        """Клетки как int64-массив (n, 2) пар (col, row), отсортированный по (row, col)."""
+        cols, rows = unpack(self.keys())
+        return np.stack((cols, rows), axis=1)
+
+    def copy(self):
+        return CellStore(self)
+
+    def add(self, cell):
+        key = pack(cell[0], cell[1])
+        if key in self._removed:
+            self._removed.discard(key)
+        elif not self._in_keys(key):
+            self._added.add(key)
+            if len(self._added) > self.MAX_PENDING:
+                self._flush()
+
+    def discard(self, cell):
+        key = pack(cell[0], cell[1])
+        if key in self._added:
+            self._added.discard(key)
+        elif self._in_keys(key):
+            self._removed.add(key)
+            if len(self._removed) > self.MAX_PENDING:
+                self._flush()
+
+    def clear(self):
+        self._keys = _EMPTY
+        self._added.clear()
+        self._removed.clear()
+
+    def __contains__(self, cell):
+        key = pack(cell[0], cell[1])
+        if key in self._added:
+            return True
+        if key in self._removed:
+            return False
+        return bool(self._in_keys(key))
+
+    def __len__(self):
+        return len(self._keys) + len(self._added) - len(self._removed)
+
+    def __iter__(self):
+        keys = self.keys()
+        for start in range(0, len(keys), _ITER_CHUNK):
+            cols, rows = unpack(keys[start:start + _ITER_CHUNK])
+            yield from zip(cols.tolist(), rows.tolist())
+
+    def __eq__(self, other):
+        if not isinstance(other, CellStore):
+            return NotImplemented
+        return np.array_equal(self.keys(), other.keys())
+
+    def difference(self, other):
+        """Клетки, которых нет в other, как массив (n, 2)."""
+        keys = np.setdiff1d(self.keys(), other.keys(), assume_unique=True)
+        cols, rows = unpack(keys)
+        return np.stack((cols, rows), axis=1)
+
+    def coords_in_rect(self, start_col, start_row, end_col, end_row):
+        """Клетки в прямоугольнике [start, end) как массив (n, 2)."""
+        if start_col >= end_col or start_row >= end_row:
+            return np.zeros((0, 2), dtype=np.int64)
+        keys = self.keys()
+        # Ключи одного ряда идут подряд: для каждого ряда ищем диапазон двоичным поиском.
+        rows = np.arange(start_row, end_row, dtype=np.int64)
+        lo = np.searchsorted(keys, pack(np.int64(start_col), rows))
+        hi = np.searchsorted(keys, pack(np.int64(end_col), rows))
+        lengths = hi - lo
+        total = int(lengths.sum())
+        starts = np.repeat(lo - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        cols, rows = unpack(keys[starts + np.arange(total)])
+        return np.stack((cols, rows), axis=1)
+
+    def cells_in_rect(self, start_col, start_row, end_col, end_row):
+        """Клетки в прямоугольнике [start, end) как список пар (col, row)."""
+        coords = self.coords_in_rect(start_col, start_row, end_col, end_row)
+        return list(zip(coords[:, 0].tolist(), coords[:, 1].tolist()))
+
+    def bitmap_in_rect(self, start_col, start_row, end_col, end_row):
+        """Прямоугольник как uint8-массив [ряд, колонка] из 0 и 1."""
+        bitmap = np.zeros((end_row - start_row, end_col - start_col), dtype=np.uint8)
+        coords = self.coords_in_rect(start_col, start_row, end_col, end_row)
+        bitmap[coords[:, 1] - start_row, coords[:, 0] - start_col] = 1
+        return bitmap
@@ -0,0 +1,161 @@
+"""
+Безголовый запуск симуляции из командной строки, без PyQt.
+
+Запуск из корня репозитория:
+    python -m modules.cli run glider.rle -n 1000 -o out.rle
+    python -m modules.cli run --id 12 -n 100000 --engine hashlife -o out.mc
+    python -m modules.cli run soup.rle -n 500 --rule HighLife --engine dense
+    python -m modules.cli soup --count 10000 -o census.jsonl
+
+Модуль не импортирует ни Mars_game, ни Qt: движки, чтение файлов и база
+паттернов работают без графической части, так что запуск занимает доли секунды.
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from collections import Counter
+
+from modules.life_engine import ENGINES, DEFAULT_ENGINE, create_engine
+from modules.pattern_io import pattern_format, read_pattern, read_macrocell, read_rule, write_pattern
+from modules.rules import parse_rule
+from modules import soup_search
+
+
+def load_engine(engine_name, path=None, pattern_id=None, db_path=None, rule=None):
+    """
+    Создает движок и загружает в него паттерн из файла или из базы по id.
+
+    Файл Macrocell для движка HashLife загружается прямо в квадродерево.
+
+    :param rule: Запись правила; по умолчанию - правило из файла или базы (иначе B3/S23).
+    """
+    engine = create_engine(engine_name)
+    if path is not None:
+        engine.set_rule(parse_rule(rule or read_rule(path) or "B3/S23"))
+        if engine.name == "hashlife" and pattern_format(path) == "mc":
+            engine.set_universe(read_macrocell(path))
+        else:
+            engine.set_cells(read_pattern(path))
+        return engine
+
+    import database  # Нужна только при загрузке из базы.
+    if db_path is not None:
+        database.DATABASE_NAME = db_path
+    try:
+        cells = database.get_pattern_cells(pattern_id)
+        stored_rule = database.get_pattern_rule(pattern_id)
+    finally:
+        database.get_repository().close()
+    if cells is None:
+        raise ValueError(f"Паттерн с id {pattern_id} не найден.")
+    engine.set_rule(parse_rule(rule or stored_rule))
+    engine.set_cells(cells)
+    return engine
+
+
+def save_engine(engine, path):
+    """Записывает состояние движка в файл; формат - по расширению."""
+    snapshot = engine.snapshot()
+    root = getattr(snapshot, "root", None)
+    # Дерево HashLife пишется в Macrocell напрямую, без перевода в клетки.
+    if root is not None and pattern_format(path) == "mc":
+        write_pattern(path, root, rule=str(engine.rule), origin=(snapshot.origin_x, snapshot.origin_y))
+    else:
+        write_pattern(path, engine.coords(), rule=str(engine.rule))
+
+
+def run(args):
+    engine = load_engine(args.engine, args.input, args.id, args.db, args.rule)
+    start = time.perf_counter()
+    engine.advance(args.generations)
+    elapsed = time.perf_counter() - start
+    if args.output:
+        save_engine(engine, args.output)
+    if not args.quiet:
+        speed = args.generations / elapsed if elapsed > 0 else float("inf")
+        print(f"generation={engine.generation} population={len(engine)} "
+              f"seconds={elapsed:.3f} gens_per_second={speed:.1f}", file=sys.stderr)
+    return 0
+
+
+def soup(args):
+    results = soup_search.search(range(args.start, args.start + args.count), workers=args.workers,
+                                 size=args.size, density=args.density,
+                                 max_generations=args.max_generations, engine=args.engine)
+    repository = None
+    if args.output:
+        results = soup_search.write_jsonl(results, args.output)
+    if args.db:
+        import database
+        repository = database.PatternRepository(args.db)
+        repository.init_db()
+        results = soup_search.write_database(results, repository)
+
+    totals = Counter()
+    start = time.perf_counter()
+    try:
+        for done, result in enumerate(results, 1):
+            totals.update(result["objects"])
+            if not args.quiet and done % 100 == 0:
+                print(f"{done}/{args.count} soups, {done / (time.perf_counter() - start):.1f} soups/s",
+                      file=sys.stderr)
+    finally:
+        if repository is not None:
+            repository.close()
+    if not args.quiet:
+        elapsed = time.perf_counter() - start
+        print(f"soups={args.count} seconds={elapsed:.3f} soups_per_second={args.count / elapsed:.1f}",
+              file=sys.stderr)
+        for name, count in totals.most_common(args.top):
+            print(f"{count:10d}  {name}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m modules.cli",
+                                     description="Безголовая симуляция игры 'Жизнь'.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Продвинуть паттерн на N поколений.")
+    source = run_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("input", nargs="?", help="Файл паттерна (.txt, .rle или .mc).")
+    source.add_argument("--id", type=int, help="id паттерна в базе.")
+    run_parser.add_argument("--db", help="Путь к базе паттернов (по умолчанию patterns.db рядом с database.py).")
+    run_parser.add_argument("-n", "--generations", type=int, required=True, help="Число поколений.")
+    run_parser.add_argument("-o", "--output", help="Куда записать результат (.txt, .rle или .mc).")
+    run_parser.add_argument("--engine", choices=list(ENGINES), default=DEFAULT_ENGINE, help="Движок симуляции.")
+    run_parser.add_argument("--rule", help="Правило: B36/S23, B2/S/C3, 23/3 или имя (по умолчанию - из паттерна).")
+    run_parser.add_argument("-q", "--quiet", action="store_true", help="Не печатать итог в stderr.")
+    run_parser.set_defaults(handler=run)
+
+    soup_parser = commands.add_parser("soup", help="Перепись случайных супов на всех ядрах.")
+    soup_parser.add_argument("--count", type=int, default=1000, help="Число супов.")
+    soup_parser.add_argument("--start", type=int, default=0, help="seed первого супа.")
+    soup_parser.add_argument("--size", type=int, default=16, help="Сторона квадрата супа.")
+    soup_parser.add_argument("--density", type=float, default=0.5, help="Доля живых клеток.")
+    soup_parser.add_argument("--max-generations", type=int, default=20000, help="Предел развития супа.")
+    soup_parser.add_argument("--engine", choices=list(ENGINES), default="sparse", help="Движок симуляции.")
+    soup_parser.add_argument("-j", "--workers", type=int, help="Число процессов (по умолчанию - число ядер).")
+    soup_parser.add_argument("-o", "--output", help="JSONL-файл для результатов (дописывается).")
+    soup_parser.add_argument("--db", help="База паттернов для записи результатов в таблицу soups.")
+    soup_parser.add_argument("--top", type=int, default=20, help="Сколько частых объектов напечатать.")
+    soup_parser.add_argument("-q", "--quiet", action="store_true", help="Не печатать прогресс и итог.")
+    soup_parser.set_defaults(handler=soup)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "generations", 0) < 0:
+        parser.error("число поколений не может быть отрицательным")
+    try:
+        return args.handler(args)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
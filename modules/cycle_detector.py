@@ -0,0 +1,87 @@
+"""
+Хеш состояния поля и обнаружение циклов.
+
+Хеш поля - XOR хешей живых клеток (в духе Zobrist), где хеш клетки -
+splitmix64 от ее упакованного ключа (modules.cell_store.pack): таблица
+случайных чисел для бесконечного поля не нужна. XOR обратим, поэтому хеш
+обновляется рождениями и смертями: достаточно XOR-нуть хеши изменившихся клеток.
+
+CycleDetector хранит ограниченную историю хешей и за O(1) на поколение
+сообщает, что поле опустело или повторило одно из недавних состояний.
+"""
+from collections import deque
+
+import numpy as np
+
+# Сколько последних поколений помнит детектор: циклы длиннее не обнаруживаются.
+HISTORY_SIZE = 4096
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def cell_hashes(keys):
+    """splitmix64 от каждого ключа клетки (массив int64) как массив uint64."""
+    z = keys.astype(np.uint64) + _GOLDEN
+    z ^= z >> np.uint64(30)
+    z *= _MIX1
+    z ^= z >> np.uint64(27)
+    z *= _MIX2
+    z ^= z >> np.uint64(31)
+    return z
+
+
+def hash_keys(keys, states=None):
+    """
+    Хеш набора клеток по их ключам: XOR хешей клеток (0 для пустого набора).
+
+    :param states: Состояния клеток для правил Generations (None - все живые, состояние 1).
+    """
+    if len(keys) == 0:
+        return 0
+    keys = keys.astype(np.uint64)
+    if states is not None:
+        # Состояние 1 дает тот же хеш, что и двухцветное поле; остальные сдвигают ключ.
+        keys += (np.asarray(states).astype(np.uint64) - np.uint64(1)) * _GOLDEN
+    return int(np.bitwise_xor.reduce(cell_hashes(keys)))
+
+
+class CycleDetector:
+    """
+    Обнаруживает вымирание и повтор состояния по хешам поколений.
+
+    Каждый хеш хранится вместе с поколением и населением: совпадение
+    населения отсекает почти все коллизии 64-битного хеша.
+    """
+
+    def __init__(self, capacity=HISTORY_SIZE):
+        self.capacity = capacity
+        self._seen = {}  # Хеш -> (поколение, население).
+        self._order = deque()  # (хеш, поколение) в порядке добавления - для вытеснения старых.
+
+    def reset(self):
+        """Забывает историю, например после правки поля."""
+        self._seen.clear()
+        self._order.clear()
+
+    def observe(self, generation, state_hash, population):
+        """
+        Запоминает состояние поколения generation.
+
+        :return: Период цикла (1 - натюрморт), 0 - поле опустело,
+                 None - состояние в недавней истории не встречалось.
+        """
+        if population == 0:
+            return 0
+        seen = self._seen.get(state_hash)
+        if seen is not None and seen[1] == population and seen[0] < generation:
+            return generation - seen[0]
+        self._seen[state_hash] = (generation, population)
+        self._order.append((state_hash, generation))
+        if len(self._order) > self.capacity:
+            old_hash, old_generation = self._order.popleft()
+            # Хеш мог быть перезаписан более новым поколением - тогда его не трогаем.
+            if self._seen.get(old_hash, (None,))[0] == old_generation:
+                del self._seen[old_hash]
+        return None
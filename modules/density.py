@@ -0,0 +1,80 @@
+import numpy as np
+
+from modules.cell_store import pack, unpack
+
+# Число уровней пирамиды: уровень L хранит число живых клеток в блоках 2^L x 2^L.
+MAX_LEVEL = 4
+
+
+class DensityPyramid:
+    """
+    Пирамида плотности живых клеток для отрисовки при сильном отдалении.
+
+    Каждый уровень - отсортированный массив ключей непустых блоков и массив
+    количеств клеток в них. Между поколениями пирамиду можно обновить по
+    родившимся и умершим клеткам, не пересчитывая всю популяцию.
+    """
+
+    def __init__(self, coords, max_level=MAX_LEVEL):
+        self.max_level = max_level
+        self.keys = [None] * (max_level + 1)
+        self.counts = [None] * (max_level + 1)
+        xs, ys = coords[:, 0], coords[:, 1]
+        for level in range(1, max_level + 1):
+            keys, counts = np.unique(pack(xs >> level, ys >> level), return_counts=True)
+            self.keys[level] = keys
+            self.counts[level] = counts.astype(np.int64)
+
+    def update(self, born, died):
+        """Учитывает изменения за поколение: born и died - массивы (n, 2) клеток."""
+        xs = np.concatenate((born[:, 0], died[:, 0]))
+        ys = np.concatenate((born[:, 1], died[:, 1]))
+        weights = np.concatenate((np.ones(len(born), dtype=np.int64), -np.ones(len(died), dtype=np.int64)))
+        if len(weights) == 0:
+            return
+        for level in range(1, self.max_level + 1):
+            delta_keys, inverse = np.unique(pack(xs >> level, ys >> level), return_inverse=True)
+            delta = np.bincount(inverse.ravel(), weights=weights, minlength=len(delta_keys)).astype(np.int64)
+
+            keys = self.keys[level]
+            counts = self.counts[level]
+            pos = np.searchsorted(keys, delta_keys)
+            found = pos < len(keys)
+            found[found] = keys[pos[found]] == delta_keys[found]
+            counts[pos[found]] += delta[found]
+
+            new = ~found
+            if new.any():
+                keys = np.insert(keys, pos[new], delta_keys[new])
+                counts = np.insert(counts, pos[new], delta[new])
+            nonzero = counts != 0
+            if not nonzero.all():
+                keys = keys[nonzero]
+                counts = counts[nonzero]
+            self.keys[level] = keys
+            self.counts[level] = counts
+
+    def query(self, level, bx0, by0, bx1, by1):
+        """
+        Возвращает плотность блоков уровня level в прямоугольнике блоков [b0, b1)
+        как массив [ряд, колонка] количеств живых клеток.
+        """
+        result = np.zeros((by1 - by0, bx1 - bx0), dtype=np.int64)
+        if bx0 >= bx1 or by0 >= by1:
+            return result
+        keys = self.keys[level]
+        counts = self.counts[level]
+        # Для каждого видимого ряда блоков ищем диапазон ключей двоичным поиском.
+        rows = np.arange(by0, by1, dtype=np.int64)
+        lo = np.searchsorted(keys, pack(np.int64(bx0), rows))
+        hi = np.searchsorted(keys, pack(np.int64(bx1), rows))
+        lengths = hi - lo
+        total = int(lengths.sum())
+        if total == 0:
+            return result
+        # Индексы всех найденных ключей без цикла по рядам.
+        starts = np.repeat(lo - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        index = starts + np.arange(total)
+        bxs, bys = unpack(keys[index])
+        result[bys - by0, bxs - bx0] = counts[index]
+        return result
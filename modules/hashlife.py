@@ -0,0 +1,359 @@
+class Node:
+    """
+    Узел квадродерева HashLife.
+
+    Узел уровня k описывает квадрат 2^k x 2^k из четырех дочерних узлов
+    уровня k-1: a - северо-запад, b - северо-восток, c - юго-запад, d - юго-восток.
+    Узлы неизменяемы и канонизированы: одинаковые квадраты - это один объект.
+    """
+    __slots__ = ("k", "a", "b", "c", "d", "n", "hash")
+
+    def __init__(self, k, a, b, c, d, n):
+        self.k = k
+        self.a = a
+        self.b = b
+        self.c = c
+        self.d = d
+        self.n = n  # Количество живых клеток.
+        self.hash = None  # Позиционный хеш содержимого (см. node_hash), считается по запросу.
+
+
+# Листья - отдельные клетки.
+OFF = Node(0, None, None, None, None, 0)
+ON = Node(0, None, None, None, None, 1)
+OFF.hash = 0
+ON.hash = 1
+
+# Позиционный хеш: сумма HASH_COL^x * HASH_ROW^y по живым клеткам по модулю 2^64.
+# Множители нечетные, поэтому обратимы, и сдвиг на отрицательное начало тоже считается.
+HASH_COL = 0x9E3779B97F4A7C15
+HASH_ROW = 0xC2B2AE3D27D4EB4F
+_HASH_MASK = (1 << 64) - 1
+_HASH_MODULUS = 1 << 64
+
+
+def node_hash(node):
+    """
+    Позиционный хеш узла относительно его левого верхнего угла.
+
+    Хеш зависит только от клеток, а не от устройства дерева: пустые
+    поддеревья дают 0, поэтому узлы разного уровня с одними и теми же
+    клетками хешируются одинаково. Узлы канонизированы, и хеш каждого
+    запоминается в нем самом: повторный запрос после шага пересчитывает
+    только новые узлы.
+    """
+    if node.hash is not None:
+        return node.hash
+    stack = [node]
+    while stack:
+        top = stack[-1]
+        children = [child for child in (top.a, top.b, top.c, top.d) if child.hash is None]
+        if children:
+            stack.extend(children)
+            continue
+        stack.pop()
+        if top.hash is not None:
+            continue
+        half = 1 << (top.k - 1)
+        col = pow(HASH_COL, half, _HASH_MODULUS)
+        row = pow(HASH_ROW, half, _HASH_MODULUS)
+        top.hash = (top.a.hash + col * top.b.hash + row * top.c.hash + col * row % _HASH_MODULUS * top.d.hash) \
+            & _HASH_MASK
+    return node.hash
+
+
+def node_cells_in_rect(root, origin_x, origin_y, start_col, start_row, end_col, end_row):
+    """
+    Живые клетки узла с левым верхним углом (origin_x, origin_y), попадающие
+    в прямоугольник. Пустые и невидимые поддеревья пропускаются целиком.
+    """
+    result = []
+    stack = [(root, origin_x, origin_y)]
+    while stack:
+        node, x, y = stack.pop()
+        size = 1 << node.k
+        if node.n == 0 or x >= end_col or y >= end_row or x + size <= start_col or y + size <= start_row:
+            continue
+        if node.k == 0:
+            result.append((x, y))
+            continue
+        half = size >> 1
+        stack.append((node.a, x, y))
+        stack.append((node.b, x + half, y))
+        stack.append((node.c, x, y + half))
+        stack.append((node.d, x + half, y + half))
+    return result
+
+
+class HashLife:
+    """
+    Вселенная 'Жизни' на мемоизированном квадродереве (алгоритм Госпера).
+
+    Позволяет продвигаться сразу на 2^j поколений за один рекурсивный шаг.
+    Таблица узлов вместе с кэшем результатов ограничена max_nodes и во время
+    шага: при переполнении кэш сбрасывается, а из таблицы удаляются узлы,
+    недостижимые ни из корня, ни из уже посчитанных частей незавершенного шага.
+    Если живых узлов больше половины предела, он на время растет вдвое от их числа.
+    """
+
+    def __init__(self, max_nodes=1_000_000, birth=(3,), survive=(2, 3)):
+        self.max_nodes = max_nodes
+        self.birth = frozenset(birth)
+        self.survive = frozenset(survive)
+        self._nodes = {}
+        self._results = {}
+        self._limit = max_nodes  # Предел таблицы и кэша до следующей сборки мусора.
+        self._pinned = []  # Посчитанные части незавершенных successor: их узлы переживают сборку.
+        self._zeros = [OFF]
+        self.root = self.zero(3)
+        # Мировые координаты (колонка, ряд) левого верхнего угла корня.
+        self.origin_x = -4
+        self.origin_y = -4
+
+    def set_rule(self, birth, survive):
+        """Меняет правило; мемоизированные результаты старого правила сбрасываются."""
+        birth, survive = frozenset(birth), frozenset(survive)
+        if (birth, survive) != (self.birth, self.survive):
+            self.birth, self.survive = birth, survive
+            self._results.clear()
+
+    # --- Построение узлов ---
+
+    def join(self, a, b, c, d):
+        """Возвращает канонический узел из четырех дочерних."""
+        key = (a, b, c, d)
+        node = self._nodes.get(key)
+        if node is None:
+            node = Node(a.k + 1, a, b, c, d, a.n + b.n + c.n + d.n)
+            self._nodes[key] = node
+        return node
+
+    def zero(self, k):
+        """Возвращает пустой узел уровня k."""
+        while len(self._zeros) <= k:
+            z = self._zeros[-1]
+            self._zeros.append(self.join(z, z, z, z))
+        return self._zeros[k]
+
+    def centre(self, node):
+        """Оборачивает узел пустой рамкой: результат на уровень выше, node - в центре."""
+        z = self.zero(node.k - 1)
+        return self.join(self.join(z, z, z, node.a), self.join(z, z, node.b, z),
+                         self.join(z, node.c, z, z), self.join(node.d, z, z, z))
+
+    def _inner(self, node):
+        """Центральный подузел уровня k-1."""
+        return self.join(node.a.d, node.b.c, node.c.b, node.d.a)
+
+    def _is_padded(self, node):
+        """Все живые клетки узла лежат в его центральной половине."""
+        return (node.a.n == node.a.d.n and node.b.n == node.b.c.n
+                and node.c.n == node.c.b.n and node.d.n == node.d.a.n)
+
+    # --- Эволюция ---
+
+    def _life_4x4(self, m):
+        """Базовый случай: центральный квадрат 2x2 узла 4x4 через одно поколение."""
+        cells = [[0] * 4 for _ in range(4)]
+        for qy, qx, q in ((0, 0, m.a), (0, 2, m.b), (2, 0, m.c), (2, 2, m.d)):
+            cells[qy][qx] = q.a.n
+            cells[qy][qx + 1] = q.b.n
+            cells[qy + 1][qx] = q.c.n
+            cells[qy + 1][qx + 1] = q.d.n
+
+        def next_state(y, x):
+            count = sum(cells[y + dy][x + dx] for dy in (-1, 0, 1) for dx in (-1, 0, 1)) - cells[y][x]
+            alive = count in self.survive if cells[y][x] else count in self.birth
+            return ON if alive else OFF
+
+        return self.join(next_state(1, 1), next_state(1, 2), next_state(2, 1), next_state(2, 2))
+
+    def successor(self, m, j):
+        """
+        Центральный подузел m (уровень k-1) через 2^j поколений, 0 <= j <= k-2.
+        """
+        if len(self._nodes) + len(self._results) > self._limit:
+            self.collect()
+        if m.k > 2:
+            j = min(j, m.k - 2)
+        key = (m, j)
+        result = self._results.get(key)
+        if result is not None:
+            return result
+
+        if m.n == 0:
+            result = m.a
+        elif m.k == 2:
+            result = self._life_4x4(m)
+        else:
+            join = self.join
+            a, b, c, d = m.a, m.b, m.c, m.d
+            # Посчитанные части закреплены, пока считаются следующие: сборка мусора их не тронет.
+            parts = []
+            self._pinned.append(parts)
+            # Девять перекрывающихся подузлов уровня k-1, продвинутых во времени.
+            for quad in (a, join(a.b, b.a, a.d, b.c), b, join(a.c, a.d, c.a, c.b), join(a.d, b.c, c.b, d.a),
+                         join(b.c, b.d, d.a, d.b), c, join(c.b, d.a, c.d, d.c), d):
+                parts.append(self.successor(quad, j))
+            c1, c2, c3, c4, c5, c6, c7, c8, c9 = parts
+            if j < m.k - 2:
+                # Шаг меньше максимального: второй половины шага нет, просто собираем центр.
+                result = join(join(c1.d, c2.c, c4.b, c5.a), join(c2.d, c3.c, c5.b, c6.a),
+                              join(c4.d, c5.c, c7.b, c8.a), join(c5.d, c6.c, c8.b, c9.a))
+            else:
+                for quad in ((c1, c2, c4, c5), (c2, c3, c5, c6), (c4, c5, c7, c8), (c5, c6, c8, c9)):
+                    parts.append(self.successor(join(*quad), j))
+                result = join(*parts[9:])
+            self._pinned.pop()
+
+        self._results[key] = result
+        return result
+
+    def _expand(self):
+        """Увеличивает корень на уровень, сохраняя содержимое на месте."""
+        half = 1 << (self.root.k - 1)
+        self.root = self.centre(self.root)
+        self.origin_x -= half
+        self.origin_y -= half
+
+    def _crop(self):
+        """Уменьшает корень, пока все клетки помещаются в его центральную половину."""
+        while self.root.k > 3 and self._is_padded(self.root):
+            quarter = 1 << (self.root.k - 2)
+            self.root = self._inner(self.root)
+            self.origin_x += quarter
+            self.origin_y += quarter
+
+    def _advance_pow2(self, j):
+        """Продвигает вселенную ровно на 2^j поколений."""
+        self._pinned = []  # После прерванного шага закрепленные части не нужны.
+        # Две пустые рамки гарантируют, что за 2^j поколений ничего не выйдет за край.
+        self._expand()
+        self._expand()
+        while self.root.k < j + 3:
+            self._expand()
+        quarter = 1 << (self.root.k - 2)
+        self.root = self.successor(self.root, j)
+        self.origin_x += quarter
+        self.origin_y += quarter
+        self._crop()
+        if len(self._nodes) + len(self._results) > self._limit:
+            self.collect()
+
+    def advance(self, generations):
+        """Продвигает вселенную на указанное число поколений (по степеням двойки)."""
+        j = 0
+        while generations > 0:
+            if generations & 1:
+                self._advance_pow2(j)
+            generations >>= 1
+            j += 1
+
+    def collect(self):
+        """
+        Сборка мусора: оставляет только узлы, достижимые из корня и из
+        закрепленных частей текущего шага, и сбрасывает кэш результатов.
+        """
+        self._results.clear()
+        nodes = {}
+        stack = [self.root] + self._zeros[1:] + [node for parts in self._pinned for node in parts]
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node.k == 0 or id(node) in seen:
+                continue
+            seen.add(id(node))
+            nodes[(node.a, node.b, node.c, node.d)] = node
+            stack.extend((node.a, node.b, node.c, node.d))
+        self._nodes = nodes
+        self._limit = max(self.max_nodes, 2 * len(nodes))
+
+    # --- Доступ к клеткам ---
+
+    @property
+    def population(self):
+        return self.root.n
+
+    def set_cells(self, cells):
+        """Строит дерево заново из набора клеток (col, row)."""
+        cells = list(cells)
+        if not cells:
+            self.root = self.zero(3)
+            self.origin_x = self.origin_y = -4
+            return
+        min_x = min(col for col, _ in cells)
+        min_y = min(row for _, row in cells)
+        size = max(max(col for col, _ in cells) - min_x, max(row for _, row in cells) - min_y) + 1
+        k = max(3, (size - 1).bit_length())
+
+        # Собираем дерево снизу вверх: на каждом уровне группируем узлы по родителям.
+        level = {(col - min_x, row - min_y): ON for col, row in cells}
+        for lvl in range(k):
+            z = self.zero(lvl)
+            parents = {}
+            for (x, y), node in level.items():
+                parents.setdefault((x >> 1, y >> 1), [z, z, z, z])[(y & 1) * 2 + (x & 1)] = node
+            level = {pos: self.join(*children) for pos, children in parents.items()}
+        self.root = level[(0, 0)]
+        self.origin_x = min_x
+        self.origin_y = min_y
+
+    def state_hash(self):
+        """64-битный хеш живых клеток с учетом их положения (см. node_hash)."""
+        shift = pow(HASH_COL, self.origin_x, _HASH_MODULUS) * pow(HASH_ROW, self.origin_y, _HASH_MODULUS)
+        return node_hash(self.root) * shift & _HASH_MASK
+
+    def _contains_point(self, col, row):
+        size = 1 << self.root.k
+        return (self.origin_x <= col < self.origin_x + size
+                and self.origin_y <= row < self.origin_y + size)
+
+    def get_cell(self, col, row):
+        if not self._contains_point(col, row):
+            return False
+        node = self.root
+        x = col - self.origin_x
+        y = row - self.origin_y
+        while node.k > 0:
+            if node.n == 0:
+                return False
+            half = 1 << (node.k - 1)
+            if y < half:
+                node = node.a if x < half else node.b
+            else:
+                node = node.c if x < half else node.d
+            x %= half
+            y %= half
+        return node is ON
+
+    def set_cell(self, col, row, alive):
+        """Меняет состояние одной клетки, копируя путь от корня."""
+        while not self._contains_point(col, row):
+            self._expand()
+
+        def rebuild(node, x, y):
+            if node.k == 0:
+                return ON if alive else OFF
+            half = 1 << (node.k - 1)
+            a, b, c, d = node.a, node.b, node.c, node.d
+            if y < half:
+                if x < half:
+                    a = rebuild(a, x, y)
+                else:
+                    b = rebuild(b, x - half, y)
+            elif x < half:
+                c = rebuild(c, x, y - half)
+            else:
+                d = rebuild(d, x - half, y - half)
+            return self.join(a, b, c, d)
+
+        self.root = rebuild(self.root, col - self.origin_x, row - self.origin_y)
+
+    def cells_in_rect(self, start_col, start_row, end_col, end_row):
+        """Живые клетки в прямоугольнике [start, end)."""
+        return node_cells_in_rect(self.root, self.origin_x, self.origin_y, start_col, start_row, end_col, end_row)
+
+    def get_cells(self):
+        """Все живые клетки (дорого для больших паттернов)."""
+        size = 1 << self.root.k
+        return self.cells_in_rect(self.origin_x, self.origin_y, self.origin_x + size, self.origin_y + size)
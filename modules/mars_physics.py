@@ -0,0 +1,223 @@
+"""
+Упрощенная модель климата Марса на сетке карты высот.
+
+Поля модели - температура поверхности (К), давление (Па) и слой CO2-инея
+(кг/м^2) - лежат на той же сетке, что и рельеф: клетка (ряд, колонка) поля
+соответствует клетке карты высот.
+
+Шаг модели:
+    1. Тепло диффундирует по горизонтали (5-точечный шаблон, по долготе поле
+       замкнуто, у полюсов - отражающая граница).
+    2. Температура релаксирует к равновесной: она падает с высотой (lapse rate),
+       к полюсам и меняется по сезону (ряды карты - широты от +90 до -90).
+    3. Давление - гидростатическое, p = p_ref * exp(-h / H); p_ref падает, когда
+       CO2 вымерзает из атмосферы в иней, и растет при сублимации.
+    4. Там, где температура ниже точки замерзания CO2 при местном давлении,
+       CO2 конденсируется в иней, выделяя теплоту; иней сублимирует, поглощая ее.
+
+Модель хранит не температуру, а потенциальную температуру theta = T + lapse * h:
+диффузия theta не стирает высотный градиент, а равновесная theta зависит только
+от широты. Все операции шага векторные и пишут в заранее выделенные буферы
+(out=), так что шаг не выделяет память. theta хранится в двух буферах с рамкой
+в одну клетку: диффузия читает передний и пишет задний, затем они меняются.
+Режим float32 вдвое уменьшает память и примерно вдвое ускоряет шаг.
+"""
+import math
+
+import numpy as np
+
+# --- Физические константы Марса ---
+GRAVITY = 3.711  # м/с^2
+SOL = 88775.0  # Длительность солнечных суток, с.
+HOUR = SOL / 24  # Марсианский час - шаг модели по умолчанию, с.
+YEAR = 668.6 * SOL  # Марсианский год, с.
+REFERENCE_PRESSURE = 610.0  # Среднее давление на нулевой высоте, Па.
+SCALE_HEIGHT = 11100.0  # Высота однородной атмосферы, м.
+LAPSE_RATE = 0.0025  # Падение температуры с высотой, К/м.
+LATENT_HEAT = 5.9e5  # Удельная теплота сублимации CO2, Дж/кг.
+
+# Точка замерзания CO2: T = FROST_A / (FROST_B - ln(p / 100 Па)).
+FROST_A = 3148.0
+FROST_B = 23.102
+
+
+def frost_point(pressure: np.ndarray) -> np.ndarray:
+    """Температура замерзания CO2 (К) при давлении pressure (Па)."""
+    return FROST_A / (FROST_B - np.log(np.asarray(pressure) * 0.01))
+
+
+class ClimateModel:
+    """
+    Поля температуры, давления и CO2-инея над картой высот.
+
+    :param altitude: Карта высот [ряд, колонка] в единицах генератора рельефа.
+    :param altitude_scale: Метров в единице высоты карты.
+    :param cell_size: Размер клетки, м (шаг сетки для диффузии).
+    :param dtype: np.float64 или np.float32 (вдвое меньше памяти).
+    """
+
+    # Равновесная температура на экваторе на нулевой высоте и ее падение к полюсам, К.
+    EQUATOR_TEMPERATURE = 230.0
+    POLE_DROP = 80.0
+    # Сезонный размах равновесной температуры на полюсах, К.
+    SEASON_AMPLITUDE = 40.0
+    # Время радиационной релаксации, с.
+    RELAXATION_TIME = 2 * SOL
+    # Эффективный коэффициент горизонтальной диффузии тепла, м^2/с.
+    DIFFUSIVITY = 2.0e4
+    # Теплоемкость поверхностного слоя на единицу площади, Дж/(м^2 К).
+    HEAT_CAPACITY = 2.0e5
+    # Наибольший устойчивый коэффициент явной схемы диффузии на подшаг.
+    MAX_DIFFUSION = 0.2
+
+    def __init__(self, altitude: np.ndarray, altitude_scale: float = 1000.0,
+                 cell_size: float = 20000.0, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.height, self.width = altitude.shape
+        self.cell_size = cell_size
+        self.time = 0.0  # Модельное время, с.
+        shape = altitude.shape
+
+        meters = np.asarray(altitude, dtype=np.float64) * altitude_scale
+        self._lapse = (LAPSE_RATE * meters).astype(self.dtype)
+        self._pressure_factor = np.exp(-meters / SCALE_HEIGHT).astype(self.dtype)
+        # ln(p / 100) = ln(p_ref / 100) - h / H, поэтому знаменатель точки замерзания
+        # FROST_B - ln(p / 100) = (FROST_B + h / H) - ln(p_ref / 100): логарифм поля не нужен.
+        self._frost_denominator = (FROST_B + meters / SCALE_HEIGHT).astype(self.dtype)
+
+        # Широта ряда: от +90 сверху до -90 снизу (центры рядов).
+        latitude = np.linspace(math.pi / 2, -math.pi / 2, 2 * self.height + 1)[1::2]
+        self._sin_latitude = np.sin(latitude).astype(self.dtype)[:, None]
+        # Равновесная theta зависит только от ряда: столбец (height, 1) вместо целого поля.
+        self._base_theta = (self.EQUATOR_TEMPERATURE - self.POLE_DROP * self._sin_latitude ** 2).astype(self.dtype)
+        self._equilibrium = np.empty_like(self._base_theta)
+
+        # Масса атмосферного столба на нулевой высоте: от нее считается p_ref.
+        self._column_mass = REFERENCE_PRESSURE / GRAVITY
+        # Сколько кг/м^2 инея дает охлаждение на 1 К ниже точки замерзания.
+        self._frost_per_kelvin = self.HEAT_CAPACITY / LATENT_HEAT
+
+        # Двойной буфер theta с рамкой в одну клетку под шаблон диффузии.
+        self._front = np.empty((self.height + 2, self.width + 2), dtype=self.dtype)
+        self._back = np.empty_like(self._front)
+        self._front[1:-1, 1:-1] = self._base_theta
+        # Иней хранится в кельвинах скрытой теплоты (кг/м^2 = кельвины * _frost_per_kelvin):
+        # так фазовый переход считается без перевода единиц на каждом шаге.
+        self._frost = np.zeros(shape, dtype=self.dtype)
+        self._frost_theta = np.empty(shape, dtype=self.dtype)  # Точка замерзания в единицах theta.
+        self._work = np.empty(shape, dtype=self.dtype)
+        self._reference_pressure = REFERENCE_PRESSURE
+
+    # --- Поля ---
+
+    @property
+    def theta(self) -> np.ndarray:
+        """Потенциальная температура [ряд, колонка], К (вид на буфер, не копия)."""
+        return self._front[1:-1, 1:-1]
+
+    @property
+    def temperature(self) -> np.ndarray:
+        """Температура поверхности [ряд, колонка], К (новый массив)."""
+        return self.theta - self._lapse
+
+    @property
+    def pressure(self) -> np.ndarray:
+        """Давление у поверхности [ряд, колонка], Па (новый массив)."""
+        return self._pressure_factor * self._reference_pressure
+
+    @property
+    def frost(self) -> np.ndarray:
+        """Слой CO2-инея [ряд, колонка], кг/м^2 (новый массив)."""
+        return self._frost * self._frost_per_kelvin
+
+    @property
+    def reference_pressure(self) -> float:
+        """Давление на нулевой высоте с учетом CO2, вымерзшего в иней."""
+        return self._reference_pressure
+
+    @property
+    def nbytes(self) -> int:
+        """Память, занятая полями и буферами модели."""
+        arrays = (self._lapse, self._pressure_factor, self._frost_denominator,
+                  self._front, self._back, self._frost, self._frost_theta, self._work)
+        return sum(array.nbytes for array in arrays)
+
+    def sample(self, row: int, col: int) -> tuple[float, float, float] | None:
+        """(температура К, давление Па, иней кг/м^2) в клетке или None вне карты."""
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            return None
+        return (float(self.theta[row, col] - self._lapse[row, col]),
+                float(self._pressure_factor[row, col] * self._reference_pressure),
+                float(self._frost[row, col] * self._frost_per_kelvin))
+
+    # --- Шаг ---
+
+    def _fill_border(self, padded: np.ndarray) -> None:
+        """Заполняет рамку: по долготе поле замкнуто, у полюсов значения отражаются."""
+        padded[1:-1, 0] = padded[1:-1, -2]
+        padded[1:-1, -1] = padded[1:-1, 1]
+        padded[0] = padded[1]
+        padded[-1] = padded[-2]
+
+    def _diffuse(self, factor: float) -> None:
+        """Явный шаг диффузии theta из переднего буфера в задний: C * (1 - 4f) + f * (N + S + W + E)."""
+        front, back, work = self._front, self._back, self._work
+        self._fill_border(front)
+        np.add(front[:-2, 1:-1], front[2:, 1:-1], out=work)
+        work += front[1:-1, :-2]
+        work += front[1:-1, 2:]
+        work *= factor
+        inner = back[1:-1, 1:-1]
+        np.multiply(front[1:-1, 1:-1], 1 - 4 * factor, out=inner)
+        inner += work
+        self._front, self._back = back, front
+
+    def _relax(self, dt: float) -> None:
+        """Тянет theta к равновесной с учетом сезона."""
+        season = math.cos(2 * math.pi * self.time / YEAR)
+        # Лето северного полушария при season = 1: север теплее, юг холоднее.
+        equilibrium = self._equilibrium
+        np.multiply(self._sin_latitude, self.SEASON_AMPLITUDE * season, out=equilibrium)
+        equilibrium += self._base_theta
+        work = self._work
+        theta = self.theta
+        np.subtract(equilibrium, theta, out=work)
+        work *= min(dt / self.RELAXATION_TIME, 1.0)
+        theta += work
+
+    def _update_frost_point(self) -> None:
+        """Точка замерзания CO2 при текущем давлении, переведенная в единицы theta."""
+        out = self._frost_theta
+        np.subtract(self._frost_denominator, math.log(self._reference_pressure * 0.01), out=out)
+        np.divide(FROST_A, out, out=out)
+        out += self._lapse
+
+    def _condense(self) -> None:
+        """
+        Конденсация CO2 ниже точки замерзания и сублимация инея выше нее.
+
+        В кельвинах скрытой теплоты новый иней равен max(иней + (T_frost - T), 0),
+        а температура меняется ровно на изменение инея.
+        """
+        work = self._work
+        theta = self.theta
+        np.subtract(self._frost_theta, theta, out=work)
+        work += self._frost
+        np.maximum(work, 0, out=work)
+        theta += work  # Конденсация греет, сублимация охлаждает.
+        theta -= self._frost
+        self._frost, self._work = work, self._frost
+
+    def step(self, dt: float = HOUR) -> None:
+        """Продвигает модель на dt секунд (диффузия при необходимости делится на подшаги)."""
+        factor = self.DIFFUSIVITY * dt / self.cell_size ** 2
+        substeps = max(1, math.ceil(factor / self.MAX_DIFFUSION))
+        for _ in range(substeps):
+            self._diffuse(factor / substeps)
+        self._relax(dt)
+        self._update_frost_point()
+        self._condense()
+        # Вымерзший CO2 уходит из атмосферы: давление на нулевой высоте падает.
+        frozen = float(self._frost.mean()) * self._frost_per_kelvin
+        self._reference_pressure = max(REFERENCE_PRESSURE * (1.0 - frozen / self._column_mass), 1.0)
+        self.time += dt
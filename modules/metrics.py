@@ -0,0 +1,161 @@
+"""
+Встроенные метрики: время шага симуляции, отрисовки и кадра.
+
+Замеры хранятся в кольцевых буферах фиксированной длины. Пока сбор выключен
+и подписчиков нет, вызывающий код проверяет один флаг active и не трогает
+ни таймер, ни буферы, так что выключенные метрики почти ничего не стоят.
+"""
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+# Сколько последних замеров каждого вида хранится.
+DEFAULT_CAPACITY = 1000
+
+# События, на которые можно подписаться через Metrics.subscribe.
+EVENTS = ("step", "paint")
+
+
+def _stats(values):
+    """Среднее и максимум списка или None для пустого."""
+    if not values:
+        return None
+    return {"mean": sum(values) / len(values), "max": max(values), "count": len(values)}
+
+
+class Metrics:
+    """
+    Сборщик метрик симуляции и отрисовки.
+
+    Шаги записываются из потока симуляции, отрисовка - из главного потока,
+    поэтому буферы защищены блокировкой. Подписчики (например, внешний
+    профилировщик) вызываются в том потоке, где произошло событие:
+        step  - callback(seconds, generation, population)
+        paint - callback(seconds, frame_seconds)
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.enabled = False
+        self.active = False  # Включен сбор или есть подписчики - проверяется на горячем пути.
+        # Шаги: (время, поколение, население, секунды шага).
+        self.steps = deque(maxlen=capacity)
+        # Кадры: (время, секунды отрисовки, секунды с начала предыдущего кадра).
+        self.frames = deque(maxlen=capacity)
+        self._hooks = {event: [] for event in EVENTS}
+        self._lock = threading.Lock()
+        self._last_paint = None
+
+    def _update_active(self):
+        self.active = self.enabled or any(self._hooks.values())
+
+    def set_enabled(self, enabled):
+        """Включает или выключает запись в буферы."""
+        self.enabled = enabled
+        self._last_paint = None
+        self._update_active()
+
+    def subscribe(self, event, callback):
+        """Подписывает callback на событие из EVENTS."""
+        if event not in self._hooks:
+            raise ValueError(f"Неизвестное событие метрик: {event}")
+        with self._lock:
+            self._hooks[event] = self._hooks[event] + [callback]
+        self._update_active()
+
+    def unsubscribe(self, event, callback):
+        with self._lock:
+            self._hooks[event] = [hook for hook in self._hooks[event] if hook is not callback]
+        self._update_active()
+
+    def clear(self):
+        with self._lock:
+            self.steps.clear()
+            self.frames.clear()
+        self._last_paint = None
+
+    # --- Запись ---
+
+    def step(self, engine):
+        """Делает шаг движка и, если метрики активны, записывает его время."""
+        if not self.active:
+            engine.step()
+            return
+        start = time.perf_counter()
+        engine.step()
+        self.record_step(time.perf_counter() - start, engine.generation, len(engine))
+
+    def record_step(self, seconds, generation, population):
+        if self.enabled:
+            with self._lock:
+                self.steps.append((time.time(), generation, population, seconds))
+        for hook in self._hooks["step"]:
+            hook(seconds, generation, population)
+
+    def record_paint(self, start, seconds):
+        """
+        Записывает отрисовку, начавшуюся в start (time.perf_counter).
+        Время кадра - интервал между началами соседних отрисовок: в него
+        входят и шаг, и обработка событий Qt.
+        """
+        frame_seconds = None if self._last_paint is None else start - self._last_paint
+        self._last_paint = start
+        if self.enabled:
+            with self._lock:
+                self.frames.append((time.time(), seconds, frame_seconds))
+        for hook in self._hooks["paint"]:
+            hook(seconds, frame_seconds)
+
+    # --- Чтение и экспорт ---
+
+    def summary(self):
+        """Сводка по буферам: среднее и максимум времен (в секундах), последнее поколение."""
+        with self._lock:
+            steps = list(self.steps)
+            frames = list(self.frames)
+        frame_times = [frame for _, _, frame in frames if frame is not None]
+        frame_stats = _stats(frame_times)
+        return {
+            "generation": steps[-1][1] if steps else None,
+            "population": steps[-1][2] if steps else None,
+            "step": _stats([seconds for *_, seconds in steps]),
+            "paint": _stats([seconds for _, seconds, _ in frames]),
+            "frame": frame_stats,
+            "fps": 1.0 / frame_stats["mean"] if frame_stats and frame_stats["mean"] > 0 else None,
+        }
+
+    def to_dict(self):
+        with self._lock:
+            steps = list(self.steps)
+            frames = list(self.frames)
+        return {
+            "summary": self.summary(),
+            "steps": [{"time": t, "generation": generation, "population": population, "seconds": seconds}
+                      for t, generation, population, seconds in steps],
+            "frames": [{"time": t, "paint_seconds": paint, "frame_seconds": frame} for t, paint, frame in frames],
+        }
+
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def export_csv(self, path):
+        """Пишет все замеры одной таблицей; пустые ячейки - поля, не относящиеся к виду замера."""
+        data = self.to_dict()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["kind", "time", "generation", "population", "step_seconds",
+                             "paint_seconds", "frame_seconds"])
+            for step in data["steps"]:
+                writer.writerow(["step", step["time"], step["generation"], step["population"], step["seconds"], "", ""])
+            for frame in data["frames"]:
+                writer.writerow(["frame", frame["time"], "", "", "", frame["paint_seconds"],
+                                 "" if frame["frame_seconds"] is None else frame["frame_seconds"]])
+
+    def export(self, path):
+        """Экспорт по расширению файла: .json или CSV для всего остального."""
+        if path.lower().endswith(".json"):
+            self.export_json(path)
+        else:
+            self.export_csv(path)
@@ -0,0 +1,441 @@
+"""
+Потоковое чтение и запись файлов паттернов.
+
+Поддерживаются три формата:
+    * текстовый "col,row" по строке на клетку (старый формат игры, .txt);
+    * RLE (.rle) - стандартный формат Golly/LifeWiki;
+    * Macrocell (.mc) - дерево узлов HashLife, компактный для огромных паттернов.
+      Положение корня пишется строкой "#P x y" (левый верхний угол); файлы без
+      нее, например из Golly, кладутся корнем по центру начала координат.
+
+Файлы читаются кусками по CHUNK_SIZE байт, каждый кусок разбирается средствами
+NumPy в массив координат, так что большие файлы не держатся в памяти целиком.
+Все функции принимают необязательный progress(done, total) (total == 0 - объем
+работы заранее неизвестен). Функции можно вызывать из фонового потока, а
+прервать операцию - бросив исключение из progress.
+
+RLE и Macrocell хранят и правило паттерна (см. read_rule); текстовый формат -
+только клетки. Клетки Generations пишутся как живые: угасающие не сохраняются.
+"""
+import os
+import re
+
+import numpy as np
+
+from modules.cell_codec import as_coords
+from modules.hashlife import HashLife, Node, OFF, ON, node_cells_in_rect
+
+# Размер куска файла при чтении и число клеток на кусок при записи.
+CHUNK_SIZE = 1 << 20
+CHUNK_CELLS = 1 << 18
+
+# Расширение файла -> формат.
+FORMATS = {".txt": "text", ".rle": "rle", ".mc": "mc"}
+# Фильтр для диалогов открытия и сохранения файлов.
+FILE_FILTER = "Pattern Files (*.txt *.rle *.mc);;Text (*.txt);;RLE (*.rle);;Macrocell (*.mc);;All Files (*)"
+
+# Максимальная длина строки RLE по спецификации.
+RLE_LINE_LENGTH = 70
+
+_DIGITS = b"0123456789"
+_WHITESPACE = b" \t\r\n"
+_RLE_HEADER = re.compile(rb"^\s*x\s*=")
+_RLE_POSITION = re.compile(rb"Pos\s*=\s*(-?\d+)\s*,\s*(-?\d+)")
+_RLE_RULE = re.compile(rb"rule\s*=\s*([^\s,]+)", re.IGNORECASE)
+_MC_POSITION = re.compile(rb"^#P\s+(-?\d+)\s+(-?\d+)")
+
+
+def pattern_format(path):
+    """Формат файла по расширению; неизвестные расширения читаются как текст."""
+    return FORMATS.get(os.path.splitext(path)[1].lower(), "text")
+
+
+def _empty():
+    return np.zeros((0, 2), dtype=np.int64)
+
+
+def _concat(chunks):
+    return np.concatenate(chunks) if chunks else _empty()
+
+
+def _report(progress, done, total):
+    if progress is not None:
+        progress(done, total)
+
+
+# --- Текстовый формат ---
+
+def read_text(path, progress=None, chunk_size=CHUNK_SIZE):
+    """Читает файл "col,row" по строке на клетку в int64-массив (n, 2)."""
+    total = os.path.getsize(path)
+    chunks = []
+    done = 0
+    tail = b""
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            done += len(data)
+            if data:
+                # Незаконченная последняя строка переносится в следующий кусок.
+                data, tail = tail + data, b""
+                cut = data.rfind(b"\n") + 1
+                data, tail = data[:cut], data[cut:]
+            else:
+                data, tail = tail, b""
+            if data:
+                numbers = np.array(data.replace(b",", b" ").split(), dtype=np.int64)
+                chunks.append(numbers.reshape(-1, 2))
+            _report(progress, done, total)
+            if not data and not tail:
+                break
+    return _concat(chunks)
+
+
+def write_text(path, cells, progress=None):
+    """Записывает клетки в формате "col,row" по строке на клетку."""
+    coords = as_coords(cells)
+    with open(path, "w") as f:
+        for start in range(0, len(coords), CHUNK_CELLS):
+            chunk = coords[start:start + CHUNK_CELLS]
+            f.write("".join(map("{},{}\n".format, chunk[:, 0].tolist(), chunk[:, 1].tolist())))
+            _report(progress, start + len(chunk), len(coords))
+
+
+# --- RLE ---
+
+def _parse_rle_chunk(data, x, y):
+    """
+    Разбирает кусок тела RLE без пробелов, оканчивающийся на тег (не на цифру).
+
+    Счетчики повторов вычисляются векторно: каждая цифра дает вклад
+    d * 10^k в счетчик ближайшего тега справа.
+
+    :param x, y: Позиция пера перед куском (относительно левого верхнего угла).
+    :return: (массив (n, 2) живых клеток, x, y, встречен ли конец паттерна '!').
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    is_digit = (buf >= ord("0")) & (buf <= ord("9"))
+    tag_pos = np.flatnonzero(~is_digit)
+    tags = buf[tag_pos]
+
+    finished = False
+    end = np.flatnonzero(tags == ord("!"))
+    if len(end):
+        finished = True
+        tag_pos, tags = tag_pos[:end[0]], tags[:end[0]]
+
+    counts = np.zeros(len(tags), dtype=np.int64)
+    digit_pos = np.flatnonzero(is_digit)
+    owner = np.searchsorted(tag_pos, digit_pos)
+    used = owner < len(tag_pos)
+    digit_pos, owner = digit_pos[used], owner[used]
+    np.add.at(counts, owner, (buf[digit_pos] - ord("0")).astype(np.int64)
+              * 10 ** (tag_pos[owner] - digit_pos - 1))
+    counts[counts == 0] = 1  # Без числа тег повторяется один раз.
+
+    if len(tags) == 0:
+        return _empty(), x, y, finished
+
+    # '$' - переход на новую строку; остальные теги сдвигают перо по строке.
+    newline = tags == ord("$")
+    alive = (tags == ord("o")) | ((tags >= ord("A")) & (tags <= ord("X")))
+    dy = np.where(newline, counts, 0)
+    dx = np.where(newline, 0, counts)
+    ys = y + np.cumsum(dy) - dy
+    xs = np.cumsum(dx) - dx
+    # Позиция в строке отсчитывается от последнего '$' (или от x до первого '$').
+    last_newline = np.maximum.accumulate(np.where(newline, np.arange(len(tags)), -1))
+    xs = np.where(last_newline >= 0, xs - xs[np.maximum(last_newline, 0)], xs + x)
+    x = int(xs[-1] + dx[-1])
+    y = int(ys[-1] + dy[-1])
+
+    # Разворачиваем серии живых клеток в отдельные клетки.
+    starts, lengths, rows = xs[alive], counts[alive], ys[alive]
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    cells = np.stack((np.repeat(starts, lengths) + offsets, np.repeat(rows, lengths)), axis=1)
+    return cells, x, y, finished
+
+
+def read_rle(path, progress=None, chunk_size=CHUNK_SIZE):
+    """
+    Читает файл RLE в int64-массив (n, 2) пар (col, row).
+
+    Позиция паттерна берется из комментария "#CXRLE Pos=x,y" (как в Golly)
+    или "#P x y", иначе левый верхний угол оказывается в (0, 0).
+    """
+    total = os.path.getsize(path)
+    chunks = []
+    origin_x = origin_y = 0
+    with open(path, "rb") as f:
+        # Заголовок: строки-комментарии '#' и строка "x = ..., y = ..., rule = ...".
+        body = b""
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            if line.startswith(b"#"):
+                position = _RLE_POSITION.search(line)
+                if position:
+                    origin_x, origin_y = int(position.group(1)), int(position.group(2))
+                elif line.startswith(b"#P"):
+                    parts = line.split()
+                    if len(parts) >= 3:
+                        origin_x, origin_y = int(parts[1]), int(parts[2])
+                continue
+            if not _RLE_HEADER.match(line):
+                body = line  # Заголовка нет - сразу тело.
+            break
+
+        x = y = 0
+        tail = b""
+        done = f.tell()
+        finished = False
+        while not finished:
+            data = body or f.read(chunk_size)
+            body = b""
+            done += len(data)
+            eof = not data
+            data = tail + data.translate(None, _WHITESPACE)
+            # Число на границе куска может быть не дочитано - переносим цифры в конце.
+            cut = len(data.rstrip(_DIGITS)) if not eof else len(data)
+            data, tail = data[:cut], data[cut:]
+            cells, x, y, finished = _parse_rle_chunk(data, x, y)
+            if len(cells):
+                chunks.append(cells)
+            _report(progress, min(done, total), total)
+            if eof:
+                break
+    coords = _concat(chunks)
+    coords[:, 0] += origin_x
+    coords[:, 1] += origin_y
+    return coords
+
+
+def _rle_tokens(coords, prev_row, prev_end, min_col):
+    """
+    Токены RLE для отсортированного по (row, col) куска клеток.
+
+    :param prev_row, prev_end: Ряд и колонка за последней записанной клеткой.
+    :return: (список токенов, prev_row, prev_end).
+    """
+    cols, rows = coords[:, 0], coords[:, 1]
+    # Серии - подряд идущие клетки одного ряда.
+    breaks = np.flatnonzero((np.diff(cols) != 1) | (np.diff(rows) != 0)) + 1
+    starts = np.concatenate(([0], breaks))
+    lengths = np.diff(np.concatenate((starts, [len(cols)])))
+    tokens = []
+    for col, row, length in zip(cols[starts].tolist(), rows[starts].tolist(), lengths.tolist()):
+        if row != prev_row:
+            dy = row - prev_row
+            tokens.append("$" if dy == 1 else f"{dy}$")
+            prev_end = min_col
+        gap = col - prev_end
+        if gap:
+            tokens.append("b" if gap == 1 else f"{gap}b")
+        tokens.append("o" if length == 1 else f"{length}o")
+        prev_row, prev_end = row, col + length
+    return tokens, prev_row, prev_end
+
+
+def write_rle(path, cells, progress=None, rule="B3/S23"):
+    """Записывает клетки в RLE с позицией в комментарии #CXRLE."""
+    coords = as_coords(cells)
+    if len(coords):
+        coords = coords[np.lexsort((coords[:, 0], coords[:, 1]))]
+        min_col, min_row = int(coords[:, 0].min()), int(coords[:, 1].min())
+        width = int(coords[:, 0].max()) - min_col + 1
+        height = int(coords[:, 1].max()) - min_row + 1
+    else:
+        min_col = min_row = width = height = 0
+
+    with open(path, "w") as f:
+        f.write(f"#CXRLE Pos={min_col},{min_row}\n")
+        f.write(f"x = {width}, y = {height}, rule = {rule}\n")
+        line = ""
+        prev_row, prev_end = min_row, min_col
+        for start in range(0, len(coords), CHUNK_CELLS):
+            tokens, prev_row, prev_end = _rle_tokens(coords[start:start + CHUNK_CELLS], prev_row, prev_end, min_col)
+            lines = []
+            for token in tokens:
+                if len(line) + len(token) > RLE_LINE_LENGTH:
+                    lines.append(line)
+                    line = ""
+                line += token
+            if lines:
+                f.write("\n".join(lines) + "\n")
+            _report(progress, min(start + CHUNK_CELLS, len(coords)), len(coords))
+        if len(line) + 1 > RLE_LINE_LENGTH:
+            f.write(line + "\n")
+            line = ""
+        f.write(line + "!\n")
+
+
+# --- Macrocell ---
+
+def _leaf_from_rows(life, rows):
+    """Узел уровня 3 из 8 рядов по 8 клеток (0 или 1)."""
+    nodes = [[ON if rows[y][x] else OFF for x in range(8)] for y in range(8)]
+    size = 8
+    while size > 1:
+        size //= 2
+        nodes = [[life.join(nodes[2 * y][2 * x], nodes[2 * y][2 * x + 1],
+                            nodes[2 * y + 1][2 * x], nodes[2 * y + 1][2 * x + 1])
+                  for x in range(size)] for y in range(size)]
+    return nodes[0][0]
+
+
+def read_macrocell(path, progress=None, life=None):
+    """
+    Читает файл Macrocell прямо в узлы HashLife, не разворачивая клетки.
+
+    Левый верхний угол корня берется из строки "#P x y", иначе, как и в Golly,
+    корень кладется центром в начало координат.
+
+    :return: Вселенная HashLife (новая или переданная life) с загруженным паттерном.
+    """
+    life = life or HashLife()
+    total = os.path.getsize(path)
+    nodes = [None]  # Узлы нумеруются с 1; 0 - пустой узел.
+    position = None
+    done = 0
+    with open(path, "rb") as f:
+        for number, line in enumerate(f):
+            done += len(line)
+            if number % 65536 == 0:
+                _report(progress, done, total)
+            line = line.strip()
+            if not line or line[:1] in (b"#", b"["):
+                match = _MC_POSITION.match(line)
+                if match:
+                    position = int(match.group(1)), int(match.group(2))
+                continue
+            if line[:1] in b".*$":
+                # Лист 8x8: '.' - мертвая, '*' - живая, '$' - конец ряда.
+                rows = [[0] * 8 for _ in range(8)]
+                x = y = 0
+                for char in line:
+                    if char == ord("$"):
+                        x, y = 0, y + 1
+                    else:
+                        rows[y][x] = char == ord("*")
+                        x += 1
+                nodes.append(_leaf_from_rows(life, rows))
+                continue
+            k, *children = (int(value) for value in line.split())
+            if k < 4:
+                raise ValueError("Поддерживаются только двухцветные файлы Macrocell.")
+            nodes.append(life.join(*(nodes[child] if child else life.zero(k - 1) for child in children)))
+    _report(progress, total, total)
+
+    root = nodes[-1] if len(nodes) > 1 else life.zero(3)
+    life.root = root
+    if position is None:
+        life.origin_x = life.origin_y = -(1 << (root.k - 1))
+    else:
+        life.origin_x, life.origin_y = position
+    return life
+
+
+def write_macrocell(path, root, progress=None, rule="B3/S23", origin=None):
+    """
+    Записывает узел квадродерева в Macrocell: каждый уникальный узел - одна строка.
+
+    :param root: Узел HashLife (например, корень движка или снимка).
+    :param origin: Левый верхний угол корня (col, row); None - корень по центру начала координат.
+    """
+    life = None
+    while root.k < 3:
+        life = life or HashLife()
+        z = life.zero(root.k)
+        root = life.join(root, z, z, z)
+
+    index = {}
+    with open(path, "w") as f:
+        f.write("[M2] (marsian_climate_visualizer_game)\n")
+        f.write(f"#R {rule}\n")
+        if origin is not None:
+            f.write(f"#P {origin[0]} {origin[1]}\n")
+
+        def write(node):
+            # Глубина рекурсии - уровень узла, а не число узлов.
+            if node.n == 0:
+                return 0
+            number = index.get(id(node))
+            if number is not None:
+                return number
+            if node.k == 3:
+                rows = [["."] * 8 for _ in range(8)]
+                for x, y in node_cells_in_rect(node, 0, 0, 0, 0, 8, 8):
+                    rows[y][x] = "*"
+                text = ["".join(row).rstrip(".") + "$" for row in rows]
+                while text and text[-1] == "$":
+                    text.pop()
+                line = "".join(text)
+            else:
+                line = f"{node.k} {write(node.a)} {write(node.b)} {write(node.c)} {write(node.d)}"
+            f.write(line + "\n")
+            number = index[id(node)] = len(index) + 1
+            if number % 65536 == 0:
+                _report(progress, number, 0)  # Число уникальных узлов заранее неизвестно.
+            return number
+
+        write(root)
+    _report(progress, 1, 1)
+
+
+# --- Общий интерфейс ---
+
+def read_rule(path):
+    """
+    Запись правила из заголовка файла ("rule = ..." в RLE, "#R ..." в Macrocell)
+    или None, если файл правила не задает. Читаются только строки заголовка.
+    """
+    fmt = pattern_format(path)
+    if fmt == "text":
+        return None
+    with open(path, "rb") as f:
+        for line in f:
+            if fmt == "mc":
+                if line.startswith(b"#R"):
+                    return line[2:].strip().decode("ascii", "replace") or None
+                if not line.startswith((b"#", b"[")):
+                    return None
+                continue
+            if not line.startswith(b"#"):
+                match = _RLE_RULE.search(line) if _RLE_HEADER.match(line) else None
+                return match.group(1).decode("ascii", "replace") if match else None
+    return None
+
+
+def read_pattern(path, progress=None):
+    """Читает файл любого поддерживаемого формата в int64-массив (n, 2) пар (col, row)."""
+    fmt = pattern_format(path)
+    if fmt == "rle":
+        return read_rle(path, progress)
+    if fmt == "mc":
+        cells = read_macrocell(path, progress).get_cells()
+        return as_coords(cells)
+    return read_text(path, progress)
+
+
+def write_pattern(path, cells, progress=None, rule="B3/S23", origin=None):
+    """
+    Записывает клетки в файл; формат выбирается по расширению.
+
+    :param cells: Набор пар (col, row), массив (n, 2) или, для Macrocell, узел HashLife.
+    :param rule: Запись правила для заголовка RLE и Macrocell.
+    :param origin: Левый верхний угол узла (col, row), если cells - узел HashLife.
+    """
+    fmt = pattern_format(path)
+    if fmt == "mc":
+        if not isinstance(cells, Node):
+            life = HashLife()
+            life.set_cells(map(tuple, as_coords(cells).tolist()))
+            cells, origin = life.root, (life.origin_x, life.origin_y)
+        write_macrocell(path, cells, progress, rule, origin)
+        return
+    if fmt == "rle":
+        write_rle(path, cells, progress, rule)
+    else:
+        write_text(path, cells, progress)
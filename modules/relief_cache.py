@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from modules.relief_generator import GENERATOR_VERSION, generate_relief
+from modules.relief_tiles import generate_relief_tiled
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Каталог кэша и его предельный размер (при превышении удаляются давно не использованные карты).
+CACHE_DIR = os.path.join(BASE_DIR, "cache", "relief")
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# Кэш можно отключить переменной окружения MARS_RELIEF_CACHE=0.
+CACHE_ENABLED = os.environ.get("MARS_RELIEF_CACHE", "1") != "0"
+
+# Карты крупнее этого числа клеток генерируются по тайлам сразу в файл кэша.
+TILED_THRESHOLD = 1024 * 1024
+
+
+def cache_key(width: int, height: int, seed: int, octaves: int = 4,
+              amp: float = 10.0, period: int = 32) -> str:
+    """Возвращает хеш параметров генерации вместе с версией генератора."""
+    params = {"width": width, "height": height, "seed": seed, "octaves": octaves,
+              "amp": float(amp), "period": period, "version": GENERATOR_VERSION}
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def _entries(cache_dir: str) -> list[os.DirEntry]:
+    """Возвращает файлы карт в кэше."""
+    if not os.path.isdir(cache_dir):
+        return []
+    return [entry for entry in os.scandir(cache_dir) if entry.is_file() and entry.name.endswith(".npy")]
+
+
+def _evict(cache_dir: str, max_bytes: int, keep: str) -> None:
+    """Удаляет давно не использованные карты (кроме keep), пока кэш не уложится в max_bytes."""
+    entries = sorted(_entries(cache_dir), key=lambda entry: entry.stat().st_mtime)
+    total = sum(entry.stat().st_size for entry in entries)
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        if entry.path == keep:
+            continue
+        total -= entry.stat().st_size
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def clear_cache(cache_dir: str | None = None) -> None:
+    """Полностью очищает кэш карт высот."""
+    for entry in _entries(cache_dir or CACHE_DIR):
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def load_relief(width: int, height: int, seed: int, octaves: int = 4, amp: float = 10.0,
+                period: int = 32, use_cache: bool | None = None, cache_dir: str | None = None,
+                max_bytes: int = MAX_CACHE_BYTES) -> np.ndarray:
+    """
+    Возвращает карту высот из кэша или генерирует и сохраняет ее.
+
+    Ключ кэша - хеш всех параметров generate_relief и версии генератора.
+    Найденная карта открывается через memmap только для чтения, поэтому
+    попадание в кэш занимает миллисекунды.
+
+    :param use_cache: False - всегда генерировать заново; None - по CACHE_ENABLED.
+    :param cache_dir: Каталог кэша (по умолчанию CACHE_DIR).
+    :param max_bytes: Предельный суммарный размер кэша.
+    :return: 2D-массив NumPy с высотами.
+    """
+    if use_cache is None:
+        use_cache = CACHE_ENABLED
+    if not use_cache:
+        return generate_relief(width, height, seed, octaves, amp, period)
+
+    cache_dir = cache_dir or CACHE_DIR
+    path = os.path.join(cache_dir, cache_key(width, height, seed, octaves, amp, period) + ".npy")
+    try:
+        relief_map = np.load(path, mmap_mode="r")
+        os.utime(path)  # Отмечаем использование для LRU.
+        return relief_map
+    except (OSError, ValueError):
+        pass
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        if width * height > TILED_THRESHOLD:
+            generate_relief_tiled(tmp_path, width, height, seed, octaves, amp, period)
+            os.remove(tmp_path + ".json")
+        else:
+            with open(tmp_path, "wb") as f:
+                np.save(f, generate_relief(width, height, seed, octaves, amp, period))
+        # Атомарная замена: другой процесс никогда не увидит недописанный файл.
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    relief_map = np.load(path, mmap_mode="r")
+    _evict(cache_dir, max_bytes, keep=path)
+    return relief_map
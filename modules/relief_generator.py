@@ -1,5 +1,91 @@
+import random
+
 import numpy as np
-from perlin_noise import PerlinNoise
+
+# Версия алгоритма генерации. Меняется при любом изменении, влияющем на результат.
+GENERATOR_VERSION = 2
+
+
+def _lattice_gradients(hashes: np.ndarray, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Возвращает градиентные векторы для узлов решетки по их хешам.
+
+    Повторяет схему библиотеки perlin_noise: каждый узел получает вектор
+    из random.uniform(-1, 1), засеянного значением seed * hash. Python-генератор
+    вызывается только один раз на уникальный хеш, а не на каждую клетку карты.
+
+    :param hashes: Массив хешей узлов решетки.
+    :param seed: Сид карты.
+    :return: Два массива (gx, gy) той же формы, что и hashes.
+    """
+    unique, inverse = np.unique(hashes, return_inverse=True)
+    vectors = np.empty((len(unique), 2), dtype=np.float64)
+    state = random.getstate()
+    try:
+        for i, h in enumerate(unique.tolist()):
+            random.seed(seed * h)
+            vectors[i, 0] = random.uniform(-1, 1)
+            vectors[i, 1] = random.uniform(-1, 1)
+    finally:
+        random.setstate(state)
+    inverse = inverse.reshape(hashes.shape)
+    return vectors[inverse, 0], vectors[inverse, 1]
+
+
+def _fade(t: np.ndarray) -> np.ndarray:
+    """Сглаживающая кривая 6t^5 - 15t^4 + 10t^3."""
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+def _gradient_noise(xs: np.ndarray, ys: np.ndarray, seed: int) -> np.ndarray:
+    """
+    Векторизованный градиентный шум для прямоугольной сетки координат.
+
+    :param xs: 1D-массив координат по горизонтали (в единицах решетки).
+    :param ys: 1D-массив координат по вертикали (в единицах решетки).
+    :param seed: Сид карты.
+    :return: 2D-массив формы (len(ys), len(xs)).
+    """
+    x0 = np.floor(xs).astype(np.int64)
+    y0 = np.floor(ys).astype(np.int64)
+    dx = xs - x0
+    dy = ys - y0
+
+    # Узлы решетки, которые нужны для этой сетки: от минимального до максимального + 1.
+    lx = np.arange(x0.min(), x0.max() + 2)
+    ly = np.arange(y0.min(), y0.max() + 2)
+    hashes = np.maximum(1, np.abs(lx[None, :] + 10 * ly[:, None] + 1))
+    gx, gy = _lattice_gradients(hashes, seed)
+
+    ix = x0 - lx[0]
+    iy = y0 - ly[0]
+    result = np.zeros((len(ys), len(xs)), dtype=np.float64)
+    # Суммируем вклад четырех углов ячейки. Веса разделимы по осям,
+    # поэтому считаются один раз на столбец/строку.
+    for cx in (0, 1):
+        ddx = dx - cx
+        wx = _fade(1 - np.abs(ddx))
+        for cy in (0, 1):
+            ddy = dy - cy
+            wy = _fade(1 - np.abs(ddy))
+            rows = (iy + cy)[:, None]
+            cols = (ix + cx)[None, :]
+            dot = gx[rows, cols] * ddx[None, :] + gy[rows, cols] * ddy[:, None]
+            result += wy[:, None] * wx[None, :] * dot
+    return result
+
+
+def _relief_window(x0: int, y0: int, width: int, height: int, seed: int,
+                   octaves: int, amp: float, period: int) -> np.ndarray:
+    """
+    Генерирует прямоугольный фрагмент карты высот с левым верхним углом (x0, y0).
+
+    Значение в каждой точке зависит только от ее абсолютных координат,
+    поэтому фрагменты стыкуются без швов.
+    """
+    xs = np.arange(x0, x0 + width, dtype=np.float64) / period * octaves
+    ys = np.arange(y0, y0 + height, dtype=np.float64) / period * octaves
+    return (_gradient_noise(xs, ys, seed) * amp).astype(np.float32)
 
 
 def generate_relief(width: int, height: int, seed: int,
@@ -7,6 +93,10 @@ def generate_relief(width: int, height: int, seed: int,
     """
     Генерирует 2D-карту высот (рельеф) с использованием шума Перлина.
 
+    Вся сетка вычисляется векторно средствами NumPy; результат совпадает
+    с поклеточным вызовом perlin_noise.PerlinNoise(octaves, seed) с точностью
+    до погрешности float32.
+
     :param width: Ширина карты.
     :param height: Высота карты.
     :param seed: Сид для генератора случайных чисел, обеспечивает воспроизводимость.
@@ -15,12 +105,6 @@ def generate_relief(width: int, height: int, seed: int,
     :param period: Период/масштаб (влияет на "размер" гор и долин).
     :return: 2D-массив NumPy с высотами.
     """
-    # 1. Инициализация генератора шума с заданными параметрами
-    noise = PerlinNoise(octaves=octaves, seed=seed)
-    relief_map = np.zeros((height, width), dtype=np.float32)
-    for y in range(height):
-        for x in range(width):
-            noise_val = noise([x / period, y / period])
-            relief_map[y][x] = noise_val * amp
-
-    return relief_map
\ No newline at end of file
+    if width <= 0 or height <= 0:
+        return np.zeros((max(height, 0), max(width, 0)), dtype=np.float32)
+    return _relief_window(0, 0, width, height, seed, octaves, amp, period)
@@ -0,0 +1,101 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from modules.relief_generator import GENERATOR_VERSION, _relief_window
+
+
+def _meta_path(path: str) -> str:
+    """Путь к файлу с параметрами генерации, который лежит рядом с картой."""
+    return path + ".json"
+
+
+def iter_tiles(width: int, height: int, tile_size: int):
+    """
+    Перебирает тайлы карты.
+
+    :return: Генератор кортежей (tile_x, tile_y, x0, y0, w, h).
+    """
+    for ty, y0 in enumerate(range(0, height, tile_size)):
+        for tx, x0 in enumerate(range(0, width, tile_size)):
+            yield tx, ty, x0, y0, min(tile_size, width - x0), min(tile_size, height - y0)
+
+
+def _render_tile(path: str, x0: int, y0: int, w: int, h: int, params: dict) -> tuple[int, int]:
+    """
+    Генерирует один тайл и сразу записывает его в memmap-файл на диске.
+
+    Выполняется в процессе-воркере, поэтому в памяти держится только этот тайл.
+    """
+    tile = _relief_window(x0, y0, w, h, params["seed"], params["octaves"],
+                          params["amp"], params["period"])
+    relief_map = np.load(path, mmap_mode="r+")
+    relief_map[y0:y0 + h, x0:x0 + w] = tile
+    relief_map.flush()
+    del relief_map
+    return x0, y0
+
+
+def generate_relief_tiled(path: str, width: int, height: int, seed: int,
+                          octaves: int = 4, amp: float = 10.0, period: int = 32,
+                          tile_size: int = 512, workers: int | None = None) -> np.ndarray:
+    """
+    Генерирует большую карту высот по тайлам в пуле процессов.
+
+    Готовые тайлы пишутся прямо в .npy-файл, открытый через memmap, поэтому
+    пиковое потребление памяти - порядка одного тайла на воркер. Параметры
+    генерации сохраняются в файл <path>.json, чтобы позже можно было
+    перегенерировать отдельный тайл (см. regenerate_tile).
+
+    :param path: Путь к выходному .npy-файлу.
+    :param tile_size: Сторона квадратного тайла.
+    :param workers: Количество процессов (None - по числу ядер, 1 - без пула).
+    :return: Карта высот, открытая только для чтения через memmap.
+    """
+    params = {"width": width, "height": height, "seed": seed, "octaves": octaves,
+              "amp": amp, "period": period, "tile_size": tile_size,
+              "version": GENERATOR_VERSION}
+
+    # Создаем файл нужного размера; данные заполнят воркеры.
+    relief_map = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(height, width))
+    del relief_map
+    with open(_meta_path(path), "w") as f:
+        json.dump(params, f)
+
+    tiles = [(x0, y0, w, h) for _, _, x0, y0, w, h in iter_tiles(width, height, tile_size)]
+    if workers == 1:
+        for x0, y0, w, h in tiles:
+            _render_tile(path, x0, y0, w, h, params)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_render_tile, path, x0, y0, w, h, params) for x0, y0, w, h in tiles]
+            for future in futures:
+                future.result()
+
+    return np.load(path, mmap_mode="r")
+
+
+def regenerate_tile(path: str, tile_x: int, tile_y: int) -> None:
+    """
+    Перегенерирует один тайл карты, не трогая остальные.
+
+    Параметры генерации берутся из файла <path>.json.
+
+    :param tile_x: Номер тайла по горизонтали.
+    :param tile_y: Номер тайла по вертикали.
+    """
+    with open(_meta_path(path)) as f:
+        params = json.load(f)
+    if params.get("version") != GENERATOR_VERSION:
+        raise ValueError("Карта создана другой версией генератора, перегенерируйте ее целиком.")
+
+    tile_size = params["tile_size"]
+    x0 = tile_x * tile_size
+    y0 = tile_y * tile_size
+    if not (0 <= x0 < params["width"] and 0 <= y0 < params["height"]):
+        raise IndexError(f"Тайл ({tile_x}, {tile_y}) вне карты.")
+    w = min(tile_size, params["width"] - x0)
+    h = min(tile_size, params["height"] - y0)
+    _render_tile(path, x0, y0, w, h, params)
+
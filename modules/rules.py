@@ -0,0 +1,161 @@
+"""
+Правила клеточных автоматов 'Жизнь'-типа.
+
+Внешне-тоталистическое правило записывается строкой B/S: B36/S23 - клетка
+рождается при 3 или 6 живых соседях и выживает при 2 или 3. Правила
+Generations добавляют число состояний C: в B2/S/C3 живая клетка (состояние 1),
+не выжившая по правилу, не умирает сразу, а проходит состояния 2..C-1
+('угасает'), не считаясь живой для соседей, и только потом становится
+мертвой (0). Понимаются и записи Golly: 23/3 (S/B) и 23/3/3 (S/B/C), а также
+имена известных правил из KNOWN_RULES.
+
+Правило компилируется в таблицы:
+    table - 18-битная таблица двухцветной части: бит 2 * соседи + жива равен 1,
+            если клетка в следующем поколении жива;
+    lut   - uint8-таблица из states * 9 значений: следующее состояние клетки
+            по индексу состояние * 9 + соседи.
+Шаг движка - одна векторная выборка из таблицы по уже посчитанным соседям,
+поэтому HighLife или Day & Night считаются так же быстро, как правила Конвея.
+
+Правила с B0 (рождение в пустоте) не поддерживаются: все движки считают,
+что пустая область поля остается пустой.
+"""
+import re
+
+import numpy as np
+
+# Наибольшее число состояний Generations: состояние клетки хранится в uint8.
+MAX_STATES = 256
+
+# Известные правила: имя -> запись.
+KNOWN_RULES = {
+    "Conway's Life": "B3/S23",
+    "HighLife": "B36/S23",
+    "Day & Night": "B3678/S34678",
+    "Seeds": "B2/S",
+    "Life without Death": "B3/S012345678",
+    "Maze": "B3/S12345",
+    "2x2": "B36/S125",
+    "Replicator": "B1357/S1357",
+    "Brian's Brain": "B2/S/C3",
+    "Star Wars": "B2/S345/C4",
+}
+
+_BS_RULE = re.compile(r"^B([0-9]*)/?S([0-9]*)(?:/?[CG]([0-9]+))?$", re.IGNORECASE)
+_GOLLY_RULE = re.compile(r"^([0-9]*)/([0-9]*)(?:/([0-9]+))?$")
+
+
+def rule_table(birth, survival) -> int:
+    """18-битная таблица правила: рождение при числе соседей из birth, выживание - из survival."""
+    table = 0
+    for count in birth:
+        table |= 1 << (2 * count)
+    for count in survival:
+        table |= 1 << (2 * count + 1)
+    return table
+
+
+def next_state(tables, counts, alive):
+    """
+    Следующее поколение двухцветного правила как uint8-массив из 0 и 1.
+
+    :param tables: 18-битная таблица (число) или массив таблиц по клеткам.
+    :param counts: Число живых соседей.
+    :param alive: Жива ли клетка (0/1).
+    """
+    index = counts.astype(np.uint32) << 1
+    index |= alive
+    result = np.asarray(tables, dtype=np.uint32) >> index
+    result &= 1
+    return result.astype(np.uint8)
+
+
+class Rule:
+    """
+    Скомпилированное правило.
+
+    :param birth: Числа соседей, при которых мертвая клетка рождается.
+    :param survival: Числа соседей, при которых живая клетка выживает.
+    :param states: Число состояний (2 - обычное правило, больше - Generations).
+    """
+
+    def __init__(self, birth, survival, states=2):
+        birth, survival = frozenset(birth), frozenset(survival)
+        if not birth | survival <= set(range(9)):
+            raise ValueError("Число соседей в правиле должно быть от 0 до 8.")
+        if 0 in birth:
+            raise ValueError("Правила с B0 (рождение в пустоте) не поддерживаются.")
+        if not 2 <= states <= MAX_STATES:
+            raise ValueError(f"Число состояний должно быть от 2 до {MAX_STATES}.")
+        self.birth = birth
+        self.survival = survival
+        self.states = states
+        self.table = rule_table(birth, survival)
+        self.lut = self._compile()
+        self.lut.flags.writeable = False
+
+    def _compile(self):
+        lut = np.zeros((self.states, 9), dtype=np.uint8)
+        lut[0, sorted(self.birth)] = 1
+        # Не выжившая живая клетка начинает угасать (в двухцветном правиле - сразу умирает).
+        lut[1] = 2 % self.states
+        lut[1, sorted(self.survival)] = 1
+        for state in range(2, self.states):
+            lut[state] = (state + 1) % self.states
+        return lut.ravel()
+
+    @property
+    def is_conway(self):
+        return self.states == 2 and self.table == CONWAY.table
+
+    def next_states(self, counts, states):
+        """
+        Следующее поколение по числу живых соседей и текущим состояниям клеток.
+
+        :return: uint8-массив состояний той же формы.
+        """
+        if self.states == 2:
+            return next_state(self.table, counts, states)
+        index = states.astype(np.intp) * 9
+        index += counts
+        return self.lut[index]
+
+    def __str__(self):
+        text = "B" + "".join(map(str, sorted(self.birth))) + "/S" + "".join(map(str, sorted(self.survival)))
+        return text + (f"/C{self.states}" if self.states > 2 else "")
+
+    def __repr__(self):
+        return f"Rule('{self}')"
+
+    def __eq__(self, other):
+        return isinstance(other, Rule) and (self.birth, self.survival, self.states) == \
+            (other.birth, other.survival, other.states)
+
+    def __hash__(self):
+        return hash((self.birth, self.survival, self.states))
+
+
+def parse_rule(text) -> Rule:
+    """
+    Разбирает запись правила: B36/S23, B2/S/C3, b3s23, 23/3, 23/3/3 или имя из KNOWN_RULES.
+
+    :raises ValueError: Запись не распознана или правило не поддерживается.
+    """
+    text = text.strip()
+    for name, rule in KNOWN_RULES.items():
+        if text.lower() == name.lower():
+            text = rule
+            break
+    compact = text.replace(" ", "")
+    match = _BS_RULE.match(compact)
+    if match:
+        birth, survival, states = match.groups()
+    else:
+        match = _GOLLY_RULE.match(compact)
+        if not match:
+            raise ValueError(f"Неверная запись правила: {text}")
+        survival, birth, states = match.groups()
+    return Rule(map(int, birth), map(int, survival), int(states) if states else 2)
+
+
+CONWAY = Rule((3,), (2, 3))
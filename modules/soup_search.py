@@ -0,0 +1,303 @@
+"""
+Перепись случайных 'супов': пакетный прогон на всех ядрах.
+
+Каждый суп - случайный квадрат size x size с заданной плотностью, однозначно
+задаваемый целым seed. Суп развивается, пока не стабилизируется: состояние
+повторилось (совпал хеш, см. modules.cycle_detector) или население стало периодичным (так заканчиваются
+супы, выпустившие планеры). Оставшиеся клетки делятся на объекты по связности,
+и каждый объект классифицируется отдельно:
+
+    xs<население>_<форма> - натюрморт;
+    xp<период>_<форма>    - осциллятор;
+    xq<период>_<форма>    - космический корабль;
+    zz<население>_<форма> - объект, не ставший периодичным за MAX_PERIOD поколений.
+
+Форма - каноническая запись: минимум по всем фазам и восьми симметриям
+квадрата, поэтому один и тот же объект в любой ориентации дает один код.
+Известным объектам (KNOWN_OBJECTS) вместо кода дается имя.
+
+Супы раздаются пулу процессов пачками, результаты приходят по мере готовности
+и пишутся в JSONL-файл или в таблицу soups базы паттернов.
+"""
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+
+import numpy as np
+
+from modules.cell_codec import as_coords
+from modules.cell_store import pack, unpack
+from modules.cycle_detector import CycleDetector
+from modules.life_engine import SparseLifeEngine, create_engine
+
+# Параметры супа по умолчанию.
+SOUP_SIZE = 16
+SOUP_DENSITY = 0.5
+# Предел развития супа; не стабилизировавшийся к этому поколению суп классифицируется как есть.
+MAX_GENERATIONS = 20000
+# Наибольший период, который ищется при стабилизации и классификации.
+MAX_PERIOD = 64
+# Сколько последних поколений население должно повторяться, чтобы суп считался стабильным.
+POPULATION_WINDOW = 256
+# Как часто (в поколениях) проверять периодичность населения.
+CHECK_INTERVAL = 64
+# Части, между которыми меньше OBJECT_RADIUS пустых клеток, могут оказаться одним объектом (см. census).
+OBJECT_RADIUS = 2
+
+# Распространенные объекты (клетки в любой фазе и ориентации) -> имя.
+KNOWN_OBJECTS = {
+    "block": [(0, 0), (1, 0), (0, 1), (1, 1)],
+    "beehive": [(1, 0), (2, 0), (0, 1), (3, 1), (1, 2), (2, 2)],
+    "loaf": [(1, 0), (2, 0), (0, 1), (3, 1), (1, 2), (3, 2), (2, 3)],
+    "boat": [(0, 0), (1, 0), (0, 1), (2, 1), (1, 2)],
+    "ship": [(0, 0), (1, 0), (0, 1), (2, 1), (1, 2), (2, 2)],
+    "tub": [(1, 0), (0, 1), (2, 1), (1, 2)],
+    "pond": [(1, 0), (2, 0), (0, 1), (3, 1), (0, 2), (3, 2), (1, 3), (2, 3)],
+    "long boat": [(0, 0), (1, 0), (0, 1), (2, 1), (1, 2), (3, 2), (2, 3)],
+    "blinker": [(0, 0), (1, 0), (2, 0)],
+    "toad": [(1, 0), (2, 0), (3, 0), (0, 1), (1, 1), (2, 1)],
+    "beacon": [(0, 0), (1, 0), (0, 1), (1, 1), (2, 2), (3, 2), (2, 3), (3, 3)],
+    "barge": [(1, 0), (0, 1), (2, 1), (1, 2), (3, 2), (2, 3)],
+    "snake": [(0, 0), (1, 0), (3, 0), (0, 1), (2, 1), (3, 1)],
+    "aircraft carrier": [(0, 0), (1, 0), (0, 1), (3, 1), (2, 2), (3, 2)],
+    "pentadecathlon": [(1, 0), (1, 1), (0, 2), (2, 2), (1, 3), (1, 4), (1, 5), (1, 6),
+                       (0, 7), (2, 7), (1, 8), (1, 9)],
+    "glider": [(1, 0), (2, 1), (0, 2), (1, 2), (2, 2)],
+    "lwss": [(1, 0), (4, 0), (0, 1), (0, 2), (4, 2), (0, 3), (1, 3), (2, 3), (3, 3)],
+}
+
+
+def soup_cells(seed, size=SOUP_SIZE, density=SOUP_DENSITY):
+    """Клетки супа seed как int64-массив (n, 2) пар (col, row)."""
+    rng = np.random.default_rng(seed)
+    rows, cols = np.nonzero(rng.random((size, size)) < density)
+    return np.stack((cols, rows), axis=1).astype(np.int64)
+
+
+# --- Объекты ---
+
+def _offsets(radius):
+    """Ключевые разности клеток на расстоянии (Чебышева) от 1 до radius, по одной из каждой пары ±."""
+    return np.array([(dr << 32) + dc for dr in range(0, radius + 1) for dc in range(-radius, radius + 1)
+                     if dr > 0 or dc > 0], dtype=np.int64)
+
+
+def split_objects(cells, radius=OBJECT_RADIUS):
+    """
+    Делит клетки на связные группы: клетки на расстоянии не больше radius по
+    каждой оси попадают в одну группу.
+
+    :return: Список int64-массивов (n, 2), по одному на группу.
+    """
+    coords = as_coords(cells)
+    if len(coords) == 0:
+        return []
+    keys = np.unique(pack(coords[:, 0], coords[:, 1]))
+    # Ребра между соседними клетками ищутся двоичным поиском по отсортированным ключам.
+    first, second = [], []
+    for offset in _offsets(radius):
+        target = keys + offset
+        index = np.minimum(np.searchsorted(keys, target), len(keys) - 1)
+        found = np.nonzero(keys[index] == target)[0]
+        first.append(found)
+        second.append(index[found])
+    first = np.concatenate(first)
+    second = np.concatenate(second)
+
+    # Метка группы - наименьший номер клетки в ней: распространяем минимум по ребрам.
+    labels = np.arange(len(keys))
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, first, labels[second])
+        np.minimum.at(labels, second, labels[first])
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            break
+
+    order = np.argsort(labels, kind="stable")
+    bounds = np.nonzero(np.diff(labels[order]))[0] + 1
+    coords = np.stack(unpack(keys), axis=1)
+    return [coords[group] for group in np.split(order, bounds)]
+
+
+def _normalize(coords):
+    """Сдвигает клетки в начало координат и сортирует по (row, col)."""
+    coords = coords - coords.min(axis=0)
+    return coords[np.lexsort((coords[:, 0], coords[:, 1]))]
+
+
+def _encode(coords):
+    """Запись формы: размеры и биты строк в hex."""
+    width, height = (coords.max(axis=0) + 1).tolist()
+    bitmap = np.zeros((height, width), dtype=np.uint8)
+    bitmap[coords[:, 1], coords[:, 0]] = 1
+    return f"{width}x{height}_{np.packbits(bitmap, axis=1).tobytes().hex()}"
+
+
+def canonical_form(coords):
+    """Каноническая запись формы: минимум по восьми симметриям квадрата."""
+    coords = as_coords(coords)
+    forms = []
+    for swap in (False, True):
+        base = coords[:, ::-1] if swap else coords
+        for sx in (1, -1):
+            for sy in (1, -1):
+                forms.append(_encode(_normalize(base * (sx, sy))))
+    return min(forms, key=lambda form: (len(form), form))
+
+
+def classify_object(cells, max_period=MAX_PERIOD, rule=None):
+    """
+    Классифицирует одиночный объект, развивая его отдельно от остальных.
+
+    :param rule: Двухцветное правило (modules.rules.Rule); None - B3/S23.
+    :return: (код, период или None, смещение за период (dx, dy)).
+    """
+    coords = _normalize(as_coords(cells))
+    engine = SparseLifeEngine()
+    if rule is not None:
+        engine.set_rule(rule)
+    engine.set_cells(coords)
+    phases = [coords]
+    for period in range(1, max_period + 1):
+        engine.step()
+        current = engine.coords()
+        if len(current) == 0:
+            return "zz0_empty", None, (0, 0)
+        if len(current) == len(coords) and np.array_equal(_normalize(current), coords):
+            shift = tuple((current.min(axis=0) - coords.min(axis=0)).tolist())
+            form = min((canonical_form(phase) for phase in phases), key=lambda form: (len(form), form))
+            if shift != (0, 0):
+                prefix = f"xq{period}"
+            elif period == 1:
+                prefix = f"xs{len(coords)}"
+            else:
+                prefix = f"xp{period}"
+            return f"{prefix}_{form}", period, shift
+        phases.append(current)
+    return f"zz{len(coords)}_{canonical_form(coords)}", None, (0, 0)
+
+
+@lru_cache(maxsize=None)
+def _known_codes():
+    return {classify_object(cells)[0]: name for name, cells in KNOWN_OBJECTS.items()}
+
+
+def object_name(code):
+    """Имя известного объекта или его код."""
+    return _known_codes().get(code, code)
+
+
+def census(cells, max_period=MAX_PERIOD):
+    """
+    Перепись объектов в наборе клеток.
+
+    Сначала каждая 8-связная часть классифицируется отдельно: так соседние
+    натюрморты и мигалки считаются по одному. Если какая-то часть сама по себе
+    не повторяется (например, фаза маяка распадается на два куска), вместо
+    частей классифицируется вся группа клеток в радиусе OBJECT_RADIUS.
+
+    :return: Counter имя/код -> число объектов.
+    """
+    counts = Counter()
+    for group in split_objects(cells):
+        parts = [classify_object(part, max_period) for part in split_objects(group, radius=1)]
+        if len(parts) > 1 and any(period is None for _, period, _ in parts):
+            whole = classify_object(group, max_period)
+            if whole[1] is not None:
+                parts = [whole]
+        for code, _, _ in parts:
+            counts[object_name(code)] += 1
+    return counts
+
+
+# --- Супы ---
+
+def _population_period(populations, max_period=MAX_PERIOD, window=POPULATION_WINDOW):
+    """Наименьший период, с которым повторяются последние window значений населения, или None."""
+    if len(populations) < window + max_period:
+        return None
+    history = np.asarray(populations[-(window + max_period):])
+    tail = history[max_period:]
+    for period in range(1, max_period + 1):
+        if np.array_equal(tail, history[max_period - period:len(history) - period]):
+            return period
+    return None
+
+
+def run_soup(seed, size=SOUP_SIZE, density=SOUP_DENSITY, max_generations=MAX_GENERATIONS,
+             engine="sparse", max_period=MAX_PERIOD):
+    """
+    Развивает суп до стабилизации и классифицирует оставшиеся объекты.
+
+    :return: Словарь результата: seed, параметры, поколение остановки, период
+             (0 - суп вымер, None - не стабилизировался), население и объекты.
+    """
+    life = create_engine(engine)
+    life.set_cells(soup_cells(seed, size, density))
+    detector = CycleDetector()
+    populations = []
+    period = None
+    while life.generation < max_generations:
+        population = len(life)
+        period = detector.observe(life.generation, life.state_hash(), population)
+        if period is not None:
+            break
+        populations.append(population)
+        if life.generation % CHECK_INTERVAL == 0:
+            period = _population_period(populations, max_period)
+            if period is not None:
+                break
+        life.step()
+    coords = life.coords()
+    return {
+        "seed": seed,
+        "size": size,
+        "density": density,
+        "generations": life.generation,
+        "period": period,
+        "population": len(coords),
+        "objects": dict(census(coords, max_period)),
+    }
+
+
+def search(seeds, workers=None, chunksize=8, **params):
+    """
+    Прогоняет супы на пуле процессов.
+
+    Результаты отдаются по мере готовности в порядке seeds, так что их можно
+    сразу писать на диск, не дожидаясь конца переписи.
+
+    :param seeds: Итерируемое целых seed.
+    :param workers: Число процессов (по умолчанию - число ядер); 1 - без пула.
+    :param params: Параметры run_soup.
+    """
+    task = partial(run_soup, **params)
+    if workers == 1:
+        yield from map(task, seeds)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(task, seeds, chunksize=chunksize)
+
+
+def write_jsonl(results, path):
+    """Пишет результаты в файл по строке JSON на суп, возвращая их дальше."""
+    with open(path, "a", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            f.flush()
+            yield result
+
+
+def write_database(results, repository, batch_size=100):
+    """Пишет результаты в таблицу soups пачками по batch_size, возвращая их дальше."""
+    batch = []
+    for result in results:
+        batch.append(result)
+        if len(batch) >= batch_size:
+            repository.add_soup_results(batch)
+            batch = []
+        yield result
+    if batch:
+        repository.add_soup_results(batch)
@@ -0,0 +1,210 @@
+"""
+Подложка рельефа под полем 'Жизни': отмывка (hillshade) и цветовая шкала высот.
+
+Клетка поля (колонка, ряд) лежит на клетке карты высот [ряд, колонка], поэтому
+подложка рисуется в тех же координатах, что и клетки. Цвета всей карты
+считаются векторно один раз, а на экран идут тайлы пирамиды масштабов:
+уровень L хранит карту с 2^L пикселями на клетку (отрицательные уровни -
+уменьшенную усреднением блоков). Тайл TILE_SIZE x TILE_SIZE пикселей
+переводится в изображение один раз и лежит в LRU-кэше с пределом по памяти,
+так что панорамирование и масштабирование только перерисовывают готовые
+тайлы. Масштаб между уровнями добирает QPainter (не больше чем вдвое).
+
+Модуль не зависит от Qt: перевод пикселей в изображение (QPixmap) передается
+в TerrainLayer функцией convert.
+"""
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from modules.density import MAX_LEVEL as DENSITY_LEVEL
+
+# Сторона тайла, пиксели.
+TILE_SIZE = 256
+# Уровни пирамиды: от 1/16 пикселя на клетку (самое дальнее отдаление) до 128.
+MIN_LEVEL = -DENSITY_LEVEL
+MAX_LEVEL = 7
+# Предел памяти кэша тайлов, байты.
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# Свет с северо-запада под 45 градусов, как принято для отмывки.
+LIGHT_AZIMUTH = 315.0
+LIGHT_ELEVATION = 45.0
+# Вертикальное преувеличение: высота карты (км) в единицах шага сетки.
+Z_FACTOR = 1.0
+# Доля рассеянного света: склоны в тени не становятся черными.
+AMBIENT = 0.35
+
+# Цветовая шкала высот: (высота, км; R, G, B) - от темных низин к светлым нагорьям.
+ELEVATION_COLORS = (
+    (-6.0, (70, 45, 40)),
+    (-3.0, (120, 70, 48)),
+    (0.0, (176, 104, 62)),
+    (3.0, (206, 150, 98)),
+    (6.0, (236, 214, 186)),
+)
+
+
+def hillshade(altitude: np.ndarray, azimuth: float = LIGHT_AZIMUTH, elevation: float = LIGHT_ELEVATION,
+              z_factor: float = Z_FACTOR) -> np.ndarray:
+    """
+    Освещенность склонов от 0 до 1 [ряд, колонка].
+
+    :param azimuth: Направление на источник света, градусы по часовой от севера (верх карты).
+    :param elevation: Высота источника над горизонтом, градусы.
+    """
+    grad_rows, grad_cols = np.gradient(np.asarray(altitude, dtype=np.float32) * np.float32(z_factor))
+    azimuth, elevation = math.radians(azimuth), math.radians(elevation)
+    # Направление на свет: колонки растут на восток, ряды - на юг.
+    light_east = math.sin(azimuth) * math.cos(elevation)
+    light_south = -math.cos(azimuth) * math.cos(elevation)
+    light_up = math.sin(elevation)
+    # Нормаль к поверхности z = f(x, y) - (-fx, -fy, 1), скалярно со светом и нормированная.
+    shade = light_up - grad_cols * np.float32(light_east) - grad_rows * np.float32(light_south)
+    shade /= np.sqrt(1 + grad_cols * grad_cols + grad_rows * grad_rows)
+    return np.clip(shade, 0, 1, out=shade)
+
+
+def colormap(altitude: np.ndarray, colors=ELEVATION_COLORS) -> np.ndarray:
+    """Цвет высот по шкале colors как float32-массив [ряд, колонка, RGB] от 0 до 255."""
+    heights = [height for height, _ in colors]
+    altitude = np.asarray(altitude, dtype=np.float32)
+    rgb = np.empty(altitude.shape + (3,), dtype=np.float32)
+    for channel in range(3):
+        rgb[..., channel] = np.interp(altitude, heights, [color[channel] for _, color in colors])
+    return rgb
+
+
+def shaded_relief(altitude: np.ndarray) -> np.ndarray:
+    """Цвет высот, затененный отмывкой: float32-массив [ряд, колонка, RGB] от 0 до 255."""
+    rgb = colormap(altitude)
+    light = hillshade(altitude)
+    light *= 1 - AMBIENT
+    light += AMBIENT
+    rgb *= light[..., None]
+    return rgb
+
+
+def to_argb(rgb: np.ndarray) -> np.ndarray:
+    """Непрозрачные пиксели ARGB32 (uint32) из массива [..., RGB] от 0 до 255."""
+    channels = np.clip(np.rint(rgb), 0, 255).astype(np.uint32)
+    return 0xFF000000 | (channels[..., 0] << 16) | (channels[..., 1] << 8) | channels[..., 2]
+
+
+def level_for_zoom(zoom: float) -> int:
+    """Уровень пирамиды для масштаба zoom (пикселей на клетку): ближайший не мельче экрана."""
+    return min(max(math.ceil(math.log2(zoom) - 1e-9), MIN_LEVEL), MAX_LEVEL)
+
+
+class TileCache:
+    """
+    LRU-кэш с пределом по памяти: при переполнении вытесняются давно не
+    использованные записи. Объем записи сообщается при добавлении.
+    """
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # Ключ -> (значение, объем); в конце - недавние.
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        """Значение по ключу или None; найденная запись становится самой свежей."""
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value, nbytes):
+        """Добавляет запись и вытесняет старые, пока кэш не уложится в max_bytes (новая остается)."""
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self._items[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes and len(self._items) > 1:
+            _, (_, size) = self._items.popitem(last=False)
+            self.nbytes -= size
+
+    def clear(self):
+        self._items.clear()
+        self.nbytes = 0
+
+
+class TerrainLayer:
+    """
+    Пирамида тайлов подложки рельефа.
+
+    :param altitude: Карта высот [ряд, колонка] (км).
+    :param convert: Функция ARGB32-массива (высота, ширина) в готовое для отрисовки
+                    изображение; по умолчанию тайлом служит сам массив.
+    :param tile_size: Сторона тайла, пиксели (степень двойки).
+    :param max_bytes: Предел памяти кэша тайлов.
+    """
+
+    def __init__(self, altitude: np.ndarray, convert=None, tile_size=TILE_SIZE, max_bytes=MAX_CACHE_BYTES):
+        self.height, self.width = altitude.shape
+        self.convert = convert
+        self.tile_size = tile_size
+        self.cache = TileCache(max_bytes)
+        # Цвета карты считаются один раз: тайлы только режут, повторяют или усредняют их.
+        self._rgb = shaded_relief(altitude)
+        self._argb = to_argb(self._rgb)
+
+    def tile_cells(self, level: int) -> int:
+        """Сколько клеток по каждой оси накрывает тайл уровня level."""
+        return max(self.tile_size >> level if level >= 0 else self.tile_size << -level, 1)
+
+    def visible_tiles(self, level, start_col, start_row, end_col, end_row):
+        """Номера (tx, ty) тайлов уровня level, пересекающих прямоугольник клеток и карту."""
+        cells = self.tile_cells(level)
+        col0, row0 = max(start_col, 0), max(start_row, 0)
+        col1, row1 = min(end_col, self.width), min(end_row, self.height)
+        if col0 >= col1 or row0 >= row1:
+            return []
+        return [(tx, ty) for ty in range(row0 // cells, (row1 - 1) // cells + 1)
+                for tx in range(col0 // cells, (col1 - 1) // cells + 1)]
+
+    def render_tile(self, level, tx, ty) -> np.ndarray:
+        """ARGB32-пиксели тайла; у края карты тайл обрезается по ней."""
+        cells = self.tile_cells(level)
+        rows = slice(ty * cells, (ty + 1) * cells)
+        cols = slice(tx * cells, (tx + 1) * cells)
+        if level >= 0:
+            scale = 1 << level
+            return np.repeat(np.repeat(self._argb[rows, cols], scale, axis=0), scale, axis=1)
+        # Уменьшение: средний цвет блока factor x factor клеток (неполный блок у края - по тому, что есть).
+        factor = 1 << -level
+        block = self._rgb[rows, cols]
+        row_starts = np.arange(0, block.shape[0], factor)
+        col_starts = np.arange(0, block.shape[1], factor)
+        sums = np.add.reduceat(np.add.reduceat(block, row_starts, axis=0), col_starts, axis=1)
+        counts = np.outer(np.diff(row_starts, append=block.shape[0]), np.diff(col_starts, append=block.shape[1]))
+        return to_argb(sums / counts[..., None])
+
+    def tile(self, level, tx, ty):
+        """
+        Тайл из кэша (при промахе - отрисованный и переведенный через convert).
+
+        :return: (изображение, (колонка, ряд, колонок, рядов) - накрытый прямоугольник клеток).
+        """
+        key = (level, tx, ty)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        pixels = self.render_tile(level, tx, ty)
+        cells = self.tile_cells(level)
+        col0, row0 = tx * cells, ty * cells
+        rect = (col0, row0, min(cells, self.width - col0), min(cells, self.height - row0))
+        image = self.convert(pixels) if self.convert is not None else pixels
+        tile = (image, rect)
+        self.cache.put(key, tile, pixels.nbytes)
+        return tile
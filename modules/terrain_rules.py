@@ -0,0 +1,95 @@
+"""
+Правила игры 'Жизнь', зависящие от рельефа.
+
+Клетка поля (колонка, ряд) лежит на клетке карты высот [ряд, колонка], и в
+режиме правил по рельефу каждая клетка карты живет по своему правилу:
+пороги рождения и выживания зависят от полосы высот (в низинах атмосфера
+плотнее и жизнь устойчивее, на нагорьях - суровее) или от крутизны склона.
+Вне карты действует правило движка (см. modules.rules).
+
+Правило клетки хранится как 18-битная таблица (modules.rules.rule_table).
+Таблицы всех клеток считаются один раз при загрузке рельефа, а шаг - это
+векторная выборка бита (tables >> индекс) & 1 по уже посчитанным соседям,
+одинаковая для любого набора правил. Правила по рельефу - двухцветные.
+"""
+import numpy as np
+
+from modules.cell_store import OFFSET
+from modules.rules import rule_table
+
+# Полосы: (верхняя граница или None, рождение, выживание, название).
+# Высота - в единицах карты (км), крутизна - перепад высоты на клетку.
+ALTITUDE_BANDS = (
+    (-2.0, (3,), (2, 3, 4), "Низины"),
+    (2.0, (3,), (2, 3), "Равнины"),
+    (None, (3,), (3,), "Нагорья"),
+)
+SLOPE_BANDS = (
+    (0.5, (3,), (2, 3), "Пологие склоны"),
+    (1.2, (3,), (2,), "Крутые склоны"),
+    (None, (3, 6), (2,), "Обрывы"),
+)
+
+# Режимы правил по рельефу: код -> (полосы, подпись в меню).
+MODES = {
+    "altitude": (ALTITUDE_BANDS, "По высоте"),
+    "slope": (SLOPE_BANDS, "По крутизне"),
+}
+
+
+def slope(altitude: np.ndarray) -> np.ndarray:
+    """Крутизна: модуль градиента карты высот (перепад на клетку)."""
+    grad_rows, grad_cols = np.gradient(np.asarray(altitude, dtype=np.float64))
+    return np.hypot(grad_rows, grad_cols)
+
+
+class TerrainRules:
+    """
+    Таблицы правил клеток карты высот.
+
+    :param tables: uint32-массив [ряд, колонка] 18-битных таблиц (см. rule_table).
+    """
+
+    def __init__(self, tables: np.ndarray):
+        self.tables = np.ascontiguousarray(tables, dtype=np.uint32)
+        self.tables.flags.writeable = False
+        self.height, self.width = self.tables.shape
+
+    @classmethod
+    def from_bands(cls, values: np.ndarray, bands) -> "TerrainRules":
+        """Раскладывает значения карты (высоту или крутизну) по полосам bands."""
+        bounds = [bound for bound, *_ in bands[:-1]]
+        tables = np.array([rule_table(birth, survival) for _, birth, survival, _ in bands], dtype=np.uint32)
+        return cls(tables[np.digitize(values, bounds)])
+
+    def window(self, col0: int, row0: int, height: int, width: int, default: int) -> np.ndarray:
+        """Таблицы прямоугольника поля с левым верхним углом (col0, row0); вне карты - таблица default."""
+        result = np.full((height, width), default, dtype=np.uint32)
+        r0, c0 = max(row0, 0), max(col0, 0)
+        r1, c1 = min(row0 + height, self.height), min(col0 + width, self.width)
+        if r0 < r1 and c0 < c1:
+            result[r0 - row0:r1 - row0, c0 - col0:c1 - col0] = self.tables[r0:r1, c0:c1]
+        return result
+
+    def key_range(self) -> tuple[int, int]:
+        """Границы [от, до) упакованных ключей (см. cell_store.pack) рядов карты."""
+        return OFFSET << 32, (self.height + OFFSET) << 32
+
+    def lookup(self, cols: np.ndarray, rows: np.ndarray):
+        """
+        Таблицы правил клеток, попавших на карту.
+
+        :return: (индексы клеток внутри карты, их таблицы).
+        """
+        inside = np.nonzero((cols >= 0) & (cols < self.width) & (rows >= 0) & (rows < self.height))[0]
+        return inside, self.tables[rows[inside], cols[inside]]
+
+
+def terrain_rules(altitude: np.ndarray, mode: str) -> TerrainRules:
+    """Правила клеток для карты высот в режиме mode из MODES."""
+    try:
+        bands, _ = MODES[mode]
+    except KeyError:
+        raise ValueError(f"Неизвестный режим правил по рельефу: {mode}") from None
+    values = slope(altitude) if mode == "slope" else np.asarray(altitude)
+    return TerrainRules.from_bands(values, bands)
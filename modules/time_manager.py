@@ -0,0 +1,175 @@
+"""
+Планировщик симуляции с фиксированным шагом.
+
+Подсистемы (шаг 'Жизни', шаг климата и т.п.) регистрируются со своей
+частотой - числом шагов за секунду модельного времени. Модельное время идет
+со скоростью scale относительно реального: 0 - пауза, 1 - реальное время,
+MAX_SCALE - так быстро, как позволяет процессор.
+
+Каждый тик переводит прошедшее реальное время в модельное и делает все
+накопившиеся шаги по порядку их модельного времени, так что частоты
+подсистем соблюдаются при любой скорости, а под нагрузкой на один кадр
+приходится несколько шагов. Тик укладывается в бюджет кадра: если шаги не
+успевают, остаток переносится на следующий тик, но отставание не растет
+больше max_lag секунд - лишние шаги пропускаются, а не догоняются лавиной.
+
+Часы передаются в конструктор, поэтому планировщик проверяется без Qt
+и без реального ожидания.
+"""
+import math
+import time
+
+# Скорость 'максимально быстро'.
+MAX_SCALE = math.inf
+# Бюджет одного тика по умолчанию, с (кадр при 60 к/с).
+FRAME_BUDGET = 1 / 60
+# Наибольшее отставание от реального времени, с; шаги сверх него пропускаются.
+MAX_LAG = 0.25
+
+
+class Subsystem:
+    """Зарегистрированная подсистема: шаг callback() rate раз за секунду модельного времени."""
+
+    def __init__(self, name, rate, callback):
+        self.name = name
+        self.callback = callback
+        self.enabled = True
+        self.steps = 0  # Сколько шагов сделано всего.
+        self.next_time = 0.0  # Модельное время следующего шага.
+        self.interval = 0.0
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        if not rate > 0 or math.isinf(rate):
+            raise ValueError(f"Частота подсистемы {self.name} должна быть положительным числом: {rate}")
+        self.rate = rate
+        self.interval = 1.0 / rate
+
+
+class TimeManager:
+    """
+    Накопитель модельного времени и очередь шагов подсистем.
+
+    Регистрация и смена частоты безопасны из другого потока: словарь
+    подсистем не меняется на месте, а заменяется копией.
+
+    :param clock: Функция текущего времени в секундах (по умолчанию time.perf_counter).
+    :param scale: Скорость модельного времени (0 - пауза, MAX_SCALE - максимальная).
+    :param frame_budget: Сколько реального времени может занять один тик, с.
+    :param max_lag: Наибольшее отставание модельного времени от реального, с.
+    """
+
+    def __init__(self, clock=time.perf_counter, scale=1.0, frame_budget=FRAME_BUDGET, max_lag=MAX_LAG):
+        self.clock = clock
+        self.scale = scale
+        self.frame_budget = frame_budget
+        self.max_lag = max_lag
+        self.time = 0.0  # Модельное время, с.
+        self.dropped = 0  # Сколько шагов пропущено из-за отставания.
+        self._backlog = 0.0  # Модельное время, не отработанное прошлым тиком из-за бюджета кадра.
+        self._subsystems = {}
+        self._last = clock()
+
+    # --- Подсистемы ---
+
+    def register(self, name, rate, callback):
+        """Регистрирует (или заменяет) подсистему; первый шаг - через один интервал."""
+        subsystem = Subsystem(name, rate, callback)
+        subsystem.next_time = self.time + subsystem.interval
+        self._subsystems = {**self._subsystems, name: subsystem}
+        return subsystem
+
+    def unregister(self, name):
+        self._subsystems = {key: value for key, value in self._subsystems.items() if key != name}
+
+    def subsystem(self, name):
+        return self._subsystems.get(name)
+
+    def set_rate(self, name, rate):
+        """Меняет частоту подсистемы; следующий шаг не откладывается дальше нового интервала."""
+        subsystem = self._subsystems[name]
+        subsystem.set_rate(rate)
+        subsystem.next_time = min(subsystem.next_time, self.time + subsystem.interval)
+
+    def set_enabled(self, name, enabled):
+        """Включает или выключает подсистему; включенная не догоняет время, пока была выключена."""
+        subsystem = self._subsystems.get(name)
+        if subsystem is None:
+            return
+        if enabled and not subsystem.enabled:
+            subsystem.next_time = max(subsystem.next_time, self.time + subsystem.interval)
+        subsystem.enabled = enabled
+
+    # --- Время ---
+
+    @property
+    def paused(self):
+        return self.scale <= 0
+
+    def reset(self):
+        """Отсчитывает реальное время заново, например перед запуском после простоя."""
+        self._last = self.clock()
+        self._backlog = 0.0
+
+    def _next(self):
+        """Включенная подсистема с самым ранним следующим шагом или None."""
+        enabled = [subsystem for subsystem in self._subsystems.values() if subsystem.enabled]
+        return min(enabled, key=lambda subsystem: subsystem.next_time, default=None)
+
+    def tick(self):
+        """
+        Переводит прошедшее реальное время в модельное и делает накопившиеся шаги.
+
+        :return: Словарь имя подсистемы -> число шагов за этот тик.
+        """
+        start = self.clock()
+        elapsed = start - self._last
+        self._last = start
+        steps = {}
+        if self.paused:
+            return steps
+
+        unlimited = math.isinf(self.scale)
+        target = math.inf if unlimited else self.time + self._backlog + elapsed * self.scale
+        if not unlimited:
+            # Шаги, отставшие больше чем на max_lag, пропускаются: под нагрузкой модель замедляется.
+            floor = target - self.max_lag * self.scale
+            for subsystem in self._subsystems.values():
+                # Выключенная подсистема не отстает: при включении она начинает с текущего времени.
+                if subsystem.enabled and subsystem.next_time < floor:
+                    skipped = math.ceil((floor - subsystem.next_time) / subsystem.interval)
+                    subsystem.next_time += skipped * subsystem.interval
+                    self.dropped += skipped
+        deadline = start + self.frame_budget
+        finished = True
+        while True:
+            subsystem = self._next()
+            if subsystem is None or subsystem.next_time > target:
+                break
+            self.time = max(self.time, subsystem.next_time)
+            subsystem.next_time += subsystem.interval
+            subsystem.steps += 1
+            steps[subsystem.name] = steps.get(subsystem.name, 0) + 1
+            subsystem.callback()
+            if self.clock() >= deadline:
+                finished = False
+                break
+        if not unlimited:
+            # Не успевший тик оставляет время на последнем шаге, а остаток переносит на следующий.
+            if finished:
+                self.time = target
+            self._backlog = target - self.time
+        return steps
+
+    def time_to_next(self):
+        """
+        Сколько реальных секунд до следующего шага: 0 - шаг уже пора делать,
+        None - ждать нечего (пауза или нет включенных подсистем).
+        """
+        subsystem = self._next()
+        if self.paused or subsystem is None:
+            return None
+        if math.isinf(self.scale):
+            return 0.0
+        waited = self.clock() - self._last
+        return max((subsystem.next_time - self.time - self._backlog) / self.scale - waited, 0.0)
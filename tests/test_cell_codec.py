@@ -0,0 +1,55 @@
+"""Двоичный формат клеток: обратимость на краях диапазона, со сжатием и без."""
+import numpy as np
+import pytest
+
+from modules.cell_codec import MAGIC, decode_cells, encode_cells, parse_text_cells
+from modules.cell_store import OFFSET
+
+# Крайние координаты, которые помещаются в CellStore.
+LOW, HIGH = -OFFSET, OFFSET - 1
+
+
+def _sorted(coords):
+    coords = np.asarray(coords, dtype=np.int64).reshape(-1, 2)
+    return coords[np.lexsort((coords[:, 0], coords[:, 1]))]
+
+
+@pytest.mark.parametrize("compress", [True, False])
+@pytest.mark.parametrize("cells", [
+    [],
+    [(5, -7)],
+    [(LOW, LOW), (HIGH, LOW), (LOW, HIGH), (HIGH, HIGH), (0, 0)],
+    [(HIGH, 3), (LOW, 3), (0, 4), (0, LOW)],
+])
+def test_round_trip(cells, compress):
+    data = encode_cells(cells, compress=compress)
+    assert data.startswith(MAGIC)
+    decoded = decode_cells(data)
+    assert decoded.dtype == np.int64 and decoded.shape == (len(cells), 2)
+    np.testing.assert_array_equal(decoded, _sorted(cells))
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip_random_soup(compress):
+    rng = np.random.default_rng(11)
+    rows, cols = np.nonzero(rng.random((300, 200)) < 0.3)
+    cells = np.stack((cols - 100, rows - 150), axis=1)
+    np.testing.assert_array_equal(decode_cells(encode_cells(cells, compress)), _sorted(cells))
+
+
+def test_compression_shrinks_dense_patterns():
+    block = [(col, row) for row in range(64) for col in range(64)]
+    assert len(encode_cells(block)) < len(encode_cells(block, compress=False)) // 10
+
+
+def test_damaged_data_is_rejected():
+    data = encode_cells([(1, 2), (3, 4)], compress=False)
+    with pytest.raises(ValueError):
+        decode_cells(b"XYZ" + data[3:])
+    with pytest.raises(ValueError):
+        decode_cells(data[:-4])
+
+
+def test_legacy_text_format():
+    np.testing.assert_array_equal(parse_text_cells("1,2;-3,4"), [(1, 2), (-3, 4)])
+    assert parse_text_cells("").shape == (0, 2)
@@ -0,0 +1,22 @@
+"""Безголовый запуск: ошибки файлов и базы сообщаются кодом возврата, а не трассировкой."""
+import sqlite3
+
+from modules import cli
+from modules.pattern_io import read_pattern
+
+
+def test_soup_reports_broken_database(tmp_path, capsys):
+    path = tmp_path / "broken.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE soups (x INTEGER)")
+    conn.close()
+    assert cli.main(["soup", "--count", "2", "--workers", "1", "--db", str(path), "--quiet"]) == 1
+    assert capsys.readouterr().err.startswith("Ошибка: ")
+
+
+def test_run_moves_glider(tmp_path):
+    source, result = tmp_path / "glider.rle", tmp_path / "out.rle"
+    source.write_text("x = 3, y = 3\nbo$2bo$3o!\n")
+    assert cli.main(["run", str(source), "-n", "4", "-o", str(result), "--quiet"]) == 0
+    glider = [(1, 0), (2, 1), (0, 2), (1, 2), (2, 2)]
+    assert sorted(map(tuple, read_pattern(str(result)).tolist())) == sorted((col + 1, row + 1) for col, row in glider)
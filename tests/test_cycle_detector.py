@@ -0,0 +1,62 @@
+"""Обнаружение вымирания и циклов по хешам состояний движков."""
+import pytest
+
+from modules.cell_store import CellStore
+from modules.cycle_detector import CycleDetector, hash_keys
+from modules.life_engine import ENGINES, create_engine
+
+BLOCK = [(0, 0), (1, 0), (0, 1), (1, 1)]
+BLINKER = [(0, 0), (1, 0), (2, 0)]
+GLIDER = [(1, 0), (2, 1), (0, 2), (1, 2), (2, 2)]
+# Два блинкера и блок: период 2, а не 1.
+MIXED = [(0, 0), (1, 0), (2, 0), (10, 10), (10, 11), (10, 12), (20, 0), (21, 0), (20, 1), (21, 1)]
+
+
+def _first_report(engine_name, cells, generations=40, capacity=4096):
+    """(поколение, период) первого сообщения детектора или None."""
+    engine = create_engine(engine_name)
+    engine.set_cells(cells)
+    detector = CycleDetector(capacity)
+    for _ in range(generations):
+        period = detector.observe(engine.generation, engine.state_hash(), len(engine))
+        if period is not None:
+            return engine.generation, period
+        engine.step()
+    return None
+
+
+@pytest.mark.parametrize("engine_name", sorted(ENGINES))
+def test_periods(engine_name):
+    assert _first_report(engine_name, BLOCK) == (1, 1)
+    assert _first_report(engine_name, BLINKER) == (2, 2)
+    assert _first_report(engine_name, MIXED) == (2, 2)
+    assert _first_report(engine_name, []) == (0, 0)
+    # Диагональ из двух клеток вымирает за одно поколение.
+    assert _first_report(engine_name, [(0, 0), (1, 1)]) == (1, 0)
+    # Планер повторяет форму, но не положение: цикла нет.
+    assert _first_report(engine_name, GLIDER) is None
+
+
+def test_history_shorter_than_period_misses_cycle():
+    assert _first_report("sparse", BLINKER, capacity=1) is None
+    assert _first_report("sparse", BLINKER, capacity=2) == (2, 2)
+
+
+def test_old_entries_are_evicted():
+    detector = CycleDetector(capacity=3)
+    for generation in range(5):
+        assert detector.observe(generation, generation, 1) is None
+    assert detector.observe(5, 0, 1) is None  # Поколение 0 уже забыто.
+    assert detector.observe(6, 4, 1) == 2
+    assert detector.observe(7, 4, 2) is None  # Другое население - коллизия хеша, а не цикл.
+    detector.reset()
+    assert detector.observe(8, 4, 1) is None
+
+
+def test_incremental_sparse_hash_matches_full_hash():
+    engine = create_engine("sparse")
+    engine.set_cells(GLIDER + [(col + 20, row) for col, row in MIXED])
+    engine.state_hash()  # Дальше хеш обновляется по изменениям.
+    for _ in range(30):
+        engine.step()
+        assert engine.state_hash() == hash_keys(CellStore(engine.coords()).keys())
@@ -0,0 +1,94 @@
+"""Библиотека паттернов на временной базе: перевод старых баз и пакетные операции."""
+import sqlite3
+import threading
+
+import numpy as np
+import pytest
+
+from database import PatternRepository
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = PatternRepository(str(tmp_path / "patterns.db"))
+    repository.init_db()
+    yield repository
+    repository.close()
+
+
+def test_legacy_text_database_is_migrated(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE patterns (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "name TEXT NOT NULL UNIQUE, cells TEXT NOT NULL)")
+        conn.executemany("INSERT INTO patterns (name, cells) VALUES (?, ?)",
+                         [("glider", "1,0;2,1;0,2;1,2;2,2"), ("empty", ""), ("far", "-1073741824,1073741823")])
+    conn.close()
+
+    repository = PatternRepository(path)
+    repository.init_db()
+    try:
+        rows = repository.connection().execute(
+            "SELECT name, cells, cells_blob IS NOT NULL, population, min_col, max_row FROM patterns ORDER BY id"
+        ).fetchall()
+        assert rows == [("glider", "", 1, 5, 0, 2), ("empty", "", 1, 0, None, None),
+                        ("far", "", 1, 1, -2 ** 30, 2 ** 30 - 1)]
+        ids = {name: pattern_id for pattern_id, name in repository.get_patterns()}
+        glider = repository.get_pattern_cells(ids["glider"])
+        assert sorted(map(tuple, glider.tolist())) == [(0, 2), (1, 0), (1, 2), (2, 1), (2, 2)]
+        assert repository.get_pattern_cells(ids["empty"]).shape == (0, 2)
+        assert repository.get_pattern_rule(ids["glider"]) == "B3/S23"
+        assert repository.migrate_text_cells() == 0  # Повторный запуск ничего не делает.
+    finally:
+        repository.close()
+
+
+def test_text_rows_read_before_migration(repository):
+    with repository.connection() as conn:
+        conn.execute("INSERT INTO patterns (name, cells) VALUES ('blinker', '0,0;1,0;2,0')")
+    pattern_id = repository.get_patterns()[0][0]
+    np.testing.assert_array_equal(repository.get_pattern_cells(pattern_id), [(0, 0), (1, 0), (2, 0)])
+    assert repository.migrate_text_cells() == 1
+    np.testing.assert_array_equal(repository.get_pattern_cells(pattern_id), [(0, 0), (1, 0), (2, 0)])
+
+
+def test_add_patterns_in_one_transaction_skips_duplicates(repository):
+    patterns = [(f"p{i}", [(i, 0), (i, 1)]) for i in range(1000)]
+    patterns += [("p5", [(0, 0)]), ("tagged", [(0, 0)], 2, "osc small", "B36/S23")]
+    assert repository.add_patterns(patterns) == 1001
+    assert repository.count_patterns() == 1001
+    # Дубликат не перезаписал исходный паттерн.
+    ids = {name: pattern_id for pattern_id, name in repository.get_patterns()}
+    np.testing.assert_array_equal(repository.get_pattern_cells(ids["p5"]), [(5, 0), (5, 1)])
+    assert repository.search_patterns("osc") == [(ids["tagged"], "tagged", 1, 1, 1, 2, "osc small", "B36/S23")]
+
+
+def test_add_patterns_rolls_back_on_error(repository):
+    with pytest.raises(ValueError):
+        repository.add_patterns([("ok", [(0, 0)]), ("bad", "not cells")])
+    assert repository.count_patterns() == 0
+
+
+def test_get_many_cells_across_batches_with_missing_ids(repository):
+    repository.add_patterns((f"p{i}", [(i, -i)]) for i in range(600))
+    ids = [pattern_id for pattern_id, _ in repository.get_patterns()]
+    requested = ids + [10 ** 6, -1]
+    result = repository.get_many_cells(requested)
+    assert sorted(result) == sorted(ids)
+    by_name = {name: pattern_id for pattern_id, name in repository.get_patterns()}
+    np.testing.assert_array_equal(result[by_name["p599"]], [(599, -599)])
+    assert repository.get_many_cells([]) == {}
+
+
+def test_each_thread_gets_its_own_connection(repository):
+    main = repository.connection()
+    assert repository.connection() is main
+    seen = []
+
+    def read():
+        seen.append((repository.connection(), repository.count_patterns()))
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+    assert seen[0][0] is not main and seen[0][1] == 0
@@ -0,0 +1,25 @@
+"""Рост плотного поля до предела max_size."""
+from modules.life_engine import DenseLifeEngine
+
+# Планер, летящий на северо-запад, и блок далеко справа от него.
+GLIDER = [(0, 0), (1, 0), (2, 0), (0, 1), (1, 2)]
+BLOCK = [(200, 100), (201, 100), (200, 101), (201, 101)]
+
+
+def test_growth_at_max_size_keeps_live_cells():
+    engine = DenseLifeEngine(max_size=320)
+    engine.set_cells(GLIDER + BLOCK)
+    for _ in range(400):
+        engine.step()
+        height, width = engine.grid.shape
+        assert height <= engine.max_size and width <= engine.max_size
+        # Блок внутри поля не должен пропасть, когда поле упирается в предел и растет влево.
+        assert all(cell in engine for cell in BLOCK), engine.generation
+
+
+def test_edit_beyond_max_size_keeps_live_cells():
+    engine = DenseLifeEngine(max_size=256)
+    engine.set_cells(BLOCK)
+    engine.add((-500, 100))
+    assert all(cell in engine for cell in BLOCK)
+    assert (-500, 100) not in engine
@@ -0,0 +1,46 @@
+"""HashLife: большие шаги совпадают с пошаговым счетом, а память узлов ограничена."""
+import numpy as np
+
+from modules.hashlife import HashLife
+from modules.life_engine import create_engine
+
+
+def _soup(seed, size=48, density=0.4):
+    rng = np.random.default_rng(seed)
+    rows, cols = np.nonzero(rng.random((size, size)) < density)
+    return list(zip(cols.tolist(), rows.tolist()))
+
+
+def test_node_cap_holds_during_a_step():
+    cells = _soup(3, size=24)
+    reference = HashLife()
+    reference.set_cells(cells)
+    reference.advance(1 << 8)
+
+    life = HashLife(max_nodes=3000)
+    life.set_cells(cells)
+    peak = 0
+    join = life.join
+
+    def counting_join(a, b, c, d):
+        nonlocal peak
+        node = join(a, b, c, d)
+        peak = max(peak, len(life._nodes) + len(life._results))
+        return node
+
+    life.join = counting_join
+    life.advance(1 << 8)
+    assert len(reference._nodes) > 4 * life.max_nodes
+    assert peak <= 2 * life.max_nodes
+    assert sorted(life.get_cells()) == sorted(reference.get_cells())
+
+
+def test_advance_matches_sparse_engine():
+    cells = _soup(5, size=32)
+    sparse = create_engine("sparse")
+    sparse.set_cells(cells)
+    sparse.advance(100)
+    life = HashLife()
+    life.set_cells(cells)
+    life.advance(100)
+    assert sorted(life.get_cells()) == sorted(map(tuple, sparse.coords().tolist()))
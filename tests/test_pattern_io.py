@@ -0,0 +1,38 @@
+"""Чтение и запись паттернов: клетки возвращаются на свои места."""
+import numpy as np
+import pytest
+
+from modules.hashlife import HashLife
+from modules.pattern_io import read_macrocell, read_pattern, write_pattern
+
+GLIDER = [(1, 0), (2, 1), (0, 2), (1, 2), (2, 2)]
+
+
+def _soup(seed, size=40, density=0.3, offset=(-7, 13)):
+    rng = np.random.default_rng(seed)
+    rows, cols = np.nonzero(rng.random((size, size)) < density)
+    return sorted(zip((cols + offset[0]).tolist(), (rows + offset[1]).tolist()))
+
+
+@pytest.mark.parametrize("extension", ["rle", "mc", "txt"])
+def test_round_trip_keeps_coordinates(tmp_path, extension):
+    path = str(tmp_path / f"soup.{extension}")
+    cells = _soup(1)
+    write_pattern(path, cells)
+    assert sorted(map(tuple, read_pattern(path).tolist())) == cells
+
+
+def test_macrocell_round_trip_keeps_glider_position(tmp_path):
+    path = str(tmp_path / "glider.mc")
+    write_pattern(path, GLIDER)
+    assert sorted(map(tuple, read_pattern(path).tolist())) == sorted(GLIDER)
+
+
+def test_macrocell_round_trip_of_advanced_root(tmp_path):
+    path = str(tmp_path / "advanced.mc")
+    life = HashLife()
+    life.set_cells(_soup(2))
+    life.advance(37)
+    expected = sorted(life.get_cells())
+    write_pattern(path, life.root, origin=(life.origin_x, life.origin_y))
+    assert sorted(read_macrocell(path).get_cells()) == expected
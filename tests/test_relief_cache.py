@@ -0,0 +1,57 @@
+"""Дисковый кэш карт высот: попадание, ключ по параметрам и вытеснение по размеру."""
+import os
+
+import numpy as np
+
+from modules import relief_cache
+from modules.relief_cache import cache_key, clear_cache, load_relief
+from modules.relief_generator import generate_relief
+
+
+def _files(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith(".npy"))
+
+
+def test_cache_hit_returns_same_map(tmp_path):
+    cache_dir = str(tmp_path)
+    first = load_relief(40, 30, 7, use_cache=True, cache_dir=cache_dir)
+    assert _files(cache_dir) == [cache_key(40, 30, 7) + ".npy"]
+    second = load_relief(40, 30, 7, use_cache=True, cache_dir=cache_dir)
+    assert isinstance(second, np.memmap) and not second.flags.writeable
+    np.testing.assert_array_equal(second, first)
+    np.testing.assert_array_equal(second, generate_relief(40, 30, 7))
+    # Другие параметры - другой ключ.
+    load_relief(40, 30, 7, amp=5.0, use_cache=True, cache_dir=cache_dir)
+    assert len(_files(cache_dir)) == 2
+
+
+def test_disabled_cache_writes_nothing(tmp_path):
+    relief = load_relief(20, 20, 3, use_cache=False, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(relief, generate_relief(20, 20, 3))
+    assert os.listdir(tmp_path) == []
+
+
+def test_tiled_maps_are_cached_too(tmp_path, monkeypatch):
+    monkeypatch.setattr(relief_cache, "TILED_THRESHOLD", 100)
+    relief = load_relief(30, 20, 5, use_cache=True, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(relief, generate_relief(30, 20, 5))
+    assert os.listdir(tmp_path) == [cache_key(30, 20, 5) + ".npy"]
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache_dir = str(tmp_path)
+    seeds = (1, 2, 3)
+    paths = [os.path.join(cache_dir, cache_key(32, 32, seed) + ".npy") for seed in seeds]
+    for i, seed in enumerate(seeds):
+        load_relief(32, 32, seed, use_cache=True, cache_dir=cache_dir)
+        os.utime(paths[i], (1000 + i, 1000 + i))
+    size = os.path.getsize(paths[0])
+    # Карта 1 использована последней: вытесняется самая старая из оставшихся - карта 2.
+    os.utime(paths[0], (2000, 2000))
+    load_relief(32, 32, 4, use_cache=True, cache_dir=cache_dir, max_bytes=3 * size)
+    assert not os.path.exists(paths[1])
+    assert os.path.exists(paths[0]) and os.path.exists(paths[2])
+    assert len(_files(cache_dir)) == 3
+
+    clear_cache(cache_dir)
+    assert _files(cache_dir) == []
@@ -0,0 +1,30 @@
+"""Векторный шум рельефа против поклеточного perlin_noise.PerlinNoise."""
+import numpy as np
+import pytest
+
+from modules.relief_generator import _relief_window, generate_relief
+
+PerlinNoise = pytest.importorskip("perlin_noise").PerlinNoise
+
+
+def _reference_relief(width, height, seed, octaves=4, amp=10.0, period=32):
+    """Прежняя поклеточная генерация: один вызов PerlinNoise на клетку."""
+    noise = PerlinNoise(octaves=octaves, seed=seed)
+    relief_map = np.zeros((height, width), dtype=np.float32)
+    for y in range(height):
+        for x in range(width):
+            relief_map[y][x] = noise([x / period, y / period]) * amp
+    return relief_map
+
+
+@pytest.mark.parametrize("seed, octaves, period", [(42, 4, 32), (7, 3, 20), (1234, 6, 50)])
+def test_matches_per_cell_perlin_noise(seed, octaves, period):
+    expected = _reference_relief(40, 30, seed, octaves, period=period)
+    relief = generate_relief(40, 30, seed, octaves, period=period)
+    assert relief.dtype == np.float32 and relief.shape == (30, 40)
+    np.testing.assert_allclose(relief, expected, rtol=0, atol=1e-4)
+
+
+def test_windows_join_without_seams():
+    relief = generate_relief(48, 36, 5)
+    np.testing.assert_array_equal(_relief_window(16, 12, 20, 18, 5, 4, 10.0, 32), relief[12:30, 16:36])
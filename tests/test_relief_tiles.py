@@ -0,0 +1,51 @@
+"""Тайловая генерация рельефа: совпадение с генерацией целиком, в том числе на швах."""
+import json
+
+import numpy as np
+import pytest
+
+from modules.relief_generator import generate_relief
+from modules.relief_tiles import generate_relief_tiled, iter_tiles, regenerate_tile
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_tiled_map_matches_whole_map(tmp_path, workers):
+    path = str(tmp_path / "relief.npy")
+    # Размеры не кратны тайлу: крайние тайлы неполные.
+    relief = generate_relief_tiled(path, 90, 70, seed=9, tile_size=32, workers=workers)
+    assert isinstance(relief, np.memmap) and relief.shape == (70, 90)
+    np.testing.assert_array_equal(relief, generate_relief(90, 70, 9))
+
+
+def test_regenerate_tile_restores_only_that_tile(tmp_path):
+    path = str(tmp_path / "relief.npy")
+    generate_relief_tiled(path, 90, 70, seed=4, tile_size=32, workers=1)
+    expected = generate_relief(90, 70, 4)
+    damaged = np.load(path, mmap_mode="r+")
+    damaged[:] = 0
+    damaged.flush()
+    del damaged
+
+    regenerate_tile(path, 2, 1)  # Неполный тайл справа: колонки 64..89, ряды 32..63.
+    relief = np.load(path)
+    np.testing.assert_array_equal(relief[32:64, 64:90], expected[32:64, 64:90])
+    relief[32:64, 64:90] = 0
+    assert not relief.any()
+
+    for _, _, x0, y0, w, h in iter_tiles(90, 70, 32):
+        regenerate_tile(path, x0 // 32, y0 // 32)
+    np.testing.assert_array_equal(np.load(path), expected)
+
+
+def test_regenerate_tile_checks_bounds_and_version(tmp_path):
+    path = str(tmp_path / "relief.npy")
+    generate_relief_tiled(path, 40, 40, seed=1, tile_size=32, workers=1)
+    with pytest.raises(IndexError):
+        regenerate_tile(path, 2, 0)
+    with open(path + ".json") as f:
+        params = json.load(f)
+    params["version"] = -1
+    with open(path + ".json", "w") as f:
+        json.dump(params, f)
+    with pytest.raises(ValueError):
+        regenerate_tile(path, 0, 0)
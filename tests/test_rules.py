@@ -0,0 +1,69 @@
+"""Правила B/S и Generations: разбор и смена правила на ходу."""
+import numpy as np
+import pytest
+
+from modules.life_engine import create_engine
+from modules.rules import parse_rule
+
+
+def _soup(seed, size=64, density=0.4):
+    rng = np.random.default_rng(seed)
+    rows, cols = np.nonzero(rng.random((size, size)) < density)
+    return np.stack((cols, rows), axis=1)
+
+
+def test_parse_rule_notations():
+    assert str(parse_rule("B36/S23")) == "B36/S23"
+    assert str(parse_rule("b36s23")) == "B36/S23"
+    assert str(parse_rule("23/36")) == "B36/S23"
+    assert str(parse_rule("Brian's Brain")) == "B2/S/C3"
+    assert parse_rule("23/3/3").states == 3
+    for text in ("B0/S1", "junk"):
+        with pytest.raises(ValueError):
+            parse_rule(text)
+
+
+def test_generations_to_two_state_drops_dying_cells():
+    dense = create_engine("dense")
+    dense.set_rule(parse_rule("Star Wars"))
+    dense.set_cells(_soup(1))
+    for _ in range(5):
+        dense.step()
+    assert (dense.grid >= 2).any()
+    population = len(dense)
+
+    dense.set_rule(parse_rule("B3/S23"))
+    assert dense.grid.max() <= 1
+    assert len(dense) == population
+    reference = create_engine("sparse")
+    reference.set_cells(dense.coords())
+    assert dense.state_hash() == reference.state_hash()
+    dense.step()
+    reference.step()
+    assert sorted(map(tuple, dense.coords().tolist())) == sorted(map(tuple, reference.coords().tolist()))
+
+
+def test_generations_to_fewer_states_clears_missing_states():
+    dense = create_engine("dense")
+    dense.set_rule(parse_rule("Star Wars"))
+    dense.set_cells(_soup(2))
+    for _ in range(5):
+        dense.step()
+    assert (dense.grid == 3).any()
+
+    dense.set_rule(parse_rule("Brian's Brain"))
+    assert dense.grid.max() <= 2
+    states = dense.grid.copy()
+    dense.step()  # Раньше падало с IndexError: состояния 3 нет в таблице C3.
+
+    # Шаг совпадает со свежим движком, заполненным теми же состояниями.
+    fresh = create_engine("dense")
+    fresh.set_rule(parse_rule("Brian's Brain"))
+    rows, cols = np.nonzero(states == 1)
+    fresh.set_cells(np.stack((cols + dense.col0, rows + dense.row0), axis=1))
+    rows, cols = np.nonzero(states == 2)
+    fresh_rows, fresh_cols = rows + dense.row0 - fresh.row0, cols + dense.col0 - fresh.col0
+    fresh.grid[fresh_rows, fresh_cols] = 2
+    fresh.step()
+    assert fresh.snapshot().bitmap_in_rect(-50, -50, 150, 150).tolist() == \
+        dense.snapshot().bitmap_in_rect(-50, -50, 150, 150).tolist()
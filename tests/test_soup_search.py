@@ -0,0 +1,16 @@
+"""Классификация объектов: период и смещение за период, в том числе при другом правиле."""
+from modules.rules import parse_rule
+from modules.soup_search import KNOWN_OBJECTS, classify_object
+
+
+def test_periods_of_known_objects():
+    assert classify_object(KNOWN_OBJECTS["block"])[1:] == (1, (0, 0))
+    assert classify_object(KNOWN_OBJECTS["blinker"])[1:] == (2, (0, 0))
+    code, period, shift = classify_object(KNOWN_OBJECTS["glider"])
+    assert code.startswith("xq4_") and period == 4 and abs(shift[0]) == abs(shift[1]) == 1
+
+
+def test_period_under_another_rule():
+    # В "Жизни без смерти" (S012345678) блинкер растет и не повторяется, а в B36/S23 он тот же.
+    assert classify_object(KNOWN_OBJECTS["blinker"], rule=parse_rule("B3/S012345678"))[1] is None
+    assert classify_object(KNOWN_OBJECTS["blinker"], rule=parse_rule("B36/S23"))[1] == 2
@@ -0,0 +1,86 @@
+"""Подложка рельефа: LRU-кэш тайлов с пределом памяти и тайлы пирамиды у краев карты."""
+import numpy as np
+import pytest
+
+from modules.terrain_layer import TerrainLayer, TileCache, level_for_zoom, to_argb
+
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    cache = TileCache(max_bytes=100)
+    cache.put("a", 1, 40)
+    cache.put("b", 2, 40)
+    assert cache.get("a") == 1  # "a" становится самой свежей.
+    cache.put("c", 3, 40)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.nbytes == 80 and len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_cache_replaces_key_and_keeps_oversized_newest():
+    cache = TileCache(max_bytes=100)
+    cache.put("a", 1, 40)
+    cache.put("a", 2, 60)
+    assert cache.nbytes == 60 and cache.get("a") == 2
+    cache.put("big", 3, 500)
+    # Запись крупнее предела остается одна: иначе ее пришлось бы рисовать заново каждый кадр.
+    assert len(cache) == 1 and cache.get("big") == 3 and cache.nbytes == 500
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def _layer(height=37, width=45, tile_size=16, max_bytes=1 << 20):
+    rng = np.random.default_rng(4)
+    return TerrainLayer(rng.normal(0, 3, (height, width)).astype(np.float32), tile_size=tile_size,
+                        max_bytes=max_bytes)
+
+
+def test_magnified_tiles_repeat_pixels():
+    layer = _layer()
+    pixels, rect = layer.tile(1, 5, 4)
+    # Уровень 1: 8 клеток на тайл, последний тайл по ширине обрезан картой (колонки 40..44).
+    assert rect == (40, 32, 5, 5)
+    assert pixels.shape == (10, 10) and pixels.dtype == np.uint32
+    np.testing.assert_array_equal(pixels[::2, ::2], layer._argb[32:37, 40:45])
+    np.testing.assert_array_equal(pixels[1::2, 1::2], layer._argb[32:37, 40:45])
+
+
+@pytest.mark.parametrize("level", [-1, -2, -3])
+def test_downsampled_edge_tiles_average_partial_blocks(level):
+    layer = _layer()
+    factor = 1 << -level
+    cells = layer.tile_cells(level)
+    tiles = layer.visible_tiles(level, 0, 0, layer.width, layer.height)
+    for tx, ty in tiles:
+        pixels, (col0, row0, cols, rows) = layer.tile(level, tx, ty)
+        assert pixels.shape == (-(-rows // factor), -(-cols // factor))
+        assert cols == min(cells, layer.width - col0) and rows == min(cells, layer.height - row0)
+        # Пиксель у края - среднее только по клеткам, которые есть на карте.
+        block = layer._rgb[row0 + (pixels.shape[0] - 1) * factor:row0 + rows,
+                           col0 + (pixels.shape[1] - 1) * factor:col0 + cols]
+        expected = to_argb(block.reshape(-1, 3).mean(axis=0))
+        assert pixels[-1, -1] == expected
+    # Тайлы вместе накрывают карту ровно один раз.
+    covered = sum(layer.tile(level, tx, ty)[1][2] * layer.tile(level, tx, ty)[1][3] for tx, ty in tiles)
+    assert covered == layer.width * layer.height
+
+
+def test_tiles_are_cached_and_memory_is_capped():
+    converted = []
+    layer = _layer(tile_size=16, max_bytes=3 * 16 * 16 * 4)
+    layer.convert = lambda pixels: converted.append(pixels.shape) or pixels
+    first = layer.tile(0, 0, 0)
+    assert layer.tile(0, 0, 0) is first and len(converted) == 1
+    tiles = layer.visible_tiles(0, 0, 0, layer.width, layer.height)
+    for tx, ty in tiles:
+        layer.tile(0, tx, ty)
+    assert layer.cache.nbytes <= layer.cache.max_bytes
+    assert 3 <= len(layer.cache) < len(tiles)
+    assert layer.cache.get((0, 0, 0)) is None  # Первый тайл вытеснен.
+
+
+def test_level_for_zoom():
+    assert level_for_zoom(1) == 0
+    assert level_for_zoom(3) == 2
+    assert level_for_zoom(0.3) == -1
+    assert level_for_zoom(1e-9) < 0 and level_for_zoom(1e9) > 0
@@ -0,0 +1,92 @@
+"""Правила по рельефу: полосы высот и крутизны дают задуманные правила клеток."""
+import numpy as np
+import pytest
+
+from modules.life_engine import create_engine
+from modules.terrain_rules import MODES, terrain_rules
+
+MAP_SIZE = 24
+
+
+def _altitude():
+    rng = np.random.default_rng(2)
+    # Плавный наклон плюс шум: на карте есть все полосы высот и крутизны.
+    rows, cols = np.mgrid[0:MAP_SIZE, 0:MAP_SIZE]
+    return (cols - MAP_SIZE / 2) * 0.5 + rng.normal(0, 1.2, (MAP_SIZE, MAP_SIZE))
+
+
+def _naive_slope(altitude):
+    """Модуль градиента: центральные разности внутри карты, односторонние на краях."""
+    height, width = altitude.shape
+
+    def diff(values, i, size):
+        if i == 0:
+            return values(1) - values(0)
+        if i == size - 1:
+            return values(i) - values(i - 1)
+        return (values(i + 1) - values(i - 1)) / 2
+
+    result = np.empty_like(altitude)
+    for row in range(height):
+        for col in range(width):
+            d_row = diff(lambda r: altitude[r, col], row, height)
+            d_col = diff(lambda c: altitude[row, c], col, width)
+            result[row, col] = (d_row ** 2 + d_col ** 2) ** 0.5
+    return result
+
+
+def _naive_rules(altitude, mode):
+    """Словарь (колонка, ряд) -> (рождение, выживание) для клеток карты."""
+    bands, _ = MODES[mode]
+    values = _naive_slope(altitude) if mode == "slope" else altitude
+    rules = {}
+    for row in range(MAP_SIZE):
+        for col in range(MAP_SIZE):
+            for bound, birth, survival, _ in bands:
+                if bound is None or values[row, col] < bound:
+                    rules[col, row] = (set(birth), set(survival))
+                    break
+    return rules
+
+
+def _naive_step(cells, rules):
+    counts = {}
+    for col, row in cells:
+        for dc in (-1, 0, 1):
+            for dr in (-1, 0, 1):
+                if dc or dr:
+                    counts[col + dc, row + dr] = counts.get((col + dc, row + dr), 0) + 1
+    born = set()
+    for cell, count in counts.items():
+        birth, survival = rules.get(cell, ({3}, {2, 3}))  # Вне карты - правило Конвея.
+        if count in (survival if cell in cells else birth):
+            born.add(cell)
+    return born
+
+
+@pytest.mark.parametrize("mode", sorted(MODES))
+def test_bands_cover_the_map(mode):
+    altitude = _altitude()
+    rules = _naive_rules(altitude, mode)
+    used = {(tuple(sorted(birth)), tuple(sorted(survival))) for birth, survival in rules.values()}
+    assert len(used) == len(MODES[mode][0])
+
+
+@pytest.mark.parametrize("engine_name", ["sparse", "dense"])
+@pytest.mark.parametrize("mode", sorted(MODES))
+def test_engines_follow_per_cell_rules(engine_name, mode):
+    altitude = _altitude()
+    rules = _naive_rules(altitude, mode)
+    rng = np.random.default_rng(7)
+    # Суп выходит за края карты: там действует правило поля.
+    rows, cols = np.nonzero(rng.random((MAP_SIZE + 12, MAP_SIZE + 12)) < 0.35)
+    cells = set(zip((cols - 6).tolist(), (rows - 6).tolist()))
+
+    engine = create_engine(engine_name)
+    engine.set_cells(cells)
+    engine.set_terrain(terrain_rules(altitude, mode))
+    for _ in range(12):
+        cells = _naive_step(cells, rules)
+        engine.step()
+        assert set(map(tuple, engine.coords().tolist())) == cells
+    assert cells  # Поле не вымерло, и сравнение что-то проверяет.
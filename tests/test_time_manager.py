@@ -0,0 +1,115 @@
+"""Планировщик с фиксированным шагом на подставных часах: без Qt и без ожидания."""
+import pytest
+
+from modules.time_manager import MAX_SCALE, TimeManager
+
+
+class FakeClock:
+    """Часы, которые идут только по команде (шаги - двоичные дроби, без ошибок округления)."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _manager(clock, **kwargs):
+    kwargs.setdefault("max_lag", 100.0)
+    return TimeManager(clock, **kwargs)
+
+
+def test_subsystems_step_at_their_own_rates_in_time_order():
+    clock = FakeClock()
+    manager = _manager(clock)
+    order = []
+    manager.register("life", 8, lambda: order.append("life"))
+    manager.register("climate", 2, lambda: order.append("climate"))
+    for _ in range(8):
+        clock.now += 0.125
+        manager.tick()
+    assert manager.subsystem("life").steps == 8
+    assert manager.subsystem("climate").steps == 2
+    # Климат на 0.5 с идет после четвертого шага 'Жизни' (при равном времени - порядок регистрации).
+    assert order[:5] == ["life", "life", "life", "life", "climate"]
+    assert manager.time == 1.0
+
+
+@pytest.mark.parametrize("scale, expected", [(0, 0), (1, 4), (10, 40)])
+def test_scale_multiplies_model_time(scale, expected):
+    clock = FakeClock()
+    manager = _manager(clock, scale=scale)
+    manager.register("life", 8, lambda: None)
+    clock.now = 0.5
+    assert manager.tick().get("life", 0) == expected
+    assert manager.time == 0.5 * scale
+    assert manager.paused == (scale == 0)
+
+
+def test_max_scale_steps_until_frame_budget():
+    clock = FakeClock()
+    manager = _manager(clock, scale=MAX_SCALE, frame_budget=1 / 64)
+
+    def step():
+        clock.now += 1 / 256
+
+    manager.register("life", 10, step)
+    assert manager.tick() == {"life": 4}
+    assert manager.time_to_next() == 0.0
+
+
+def test_one_tick_batches_all_due_steps():
+    clock = FakeClock()
+    manager = _manager(clock)
+    manager.register("life", 8, lambda: None)
+    manager.register("climate", 4, lambda: None)
+    clock.now = 0.5
+    assert manager.tick() == {"life": 4, "climate": 2}
+    assert manager.time_to_next() == 0.125
+
+
+def test_frame_budget_carries_unfinished_steps_over():
+    clock = FakeClock()
+    manager = _manager(clock, frame_budget=1 / 64)
+
+    def step():
+        clock.now += 1 / 256
+
+    manager.register("life", 64, step)
+    clock.now = 0.25
+    assert manager.tick() == {"life": 4}
+    # Модельное время остановилось на последнем шаге: остаток не потерян, а ждет следующих тиков.
+    assert manager.time == 4 / 64
+    assert manager.time_to_next() == 0.0
+    total = 4
+    for _ in range(20):
+        total += manager.tick().get("life", 0)
+    assert manager.dropped == 0
+    assert total == manager.subsystem("life").steps == round(manager.time * 64)
+    assert manager.time == clock.now
+
+
+def test_lag_beyond_max_lag_is_dropped():
+    clock = FakeClock()
+    manager = _manager(clock, max_lag=0.25)
+    manager.register("life", 8, lambda: None)
+    clock.now = 1.0
+    # Шаги раньше 0.75 с пропускаются (5 шагов), делаются только 0.75, 0.875 и 1.0.
+    assert manager.tick() == {"life": 3}
+    assert manager.dropped == 5
+
+
+def test_disabled_subsystem_is_not_counted_as_dropped():
+    clock = FakeClock()
+    manager = _manager(clock, max_lag=0.25)
+    manager.register("life", 8, lambda: None)
+    manager.register("climate", 8, lambda: None)
+    manager.set_enabled("climate", False)
+    clock.now = 1.0
+    assert manager.tick() == {"life": 3}
+    assert manager.dropped == 5
+    # Включенная подсистема не догоняет пропущенное: первый шаг - через интервал.
+    manager.set_enabled("climate", True)
+    clock.now = 1.125
+    assert manager.tick() == {"life": 1, "climate": 1}
+    assert manager.dropped == 5